@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Game, Tariff, Feature, MainPageGame, Promocode, Room
+from .models import User, Game, Tariff, Feature, MainPageGame, Promocode, Room, RoomArchive
+from .search import search_query
 from adminsortable2.admin import SortableAdminMixin
 from django.utils.safestring import mark_safe
 from django import forms
@@ -32,15 +33,30 @@ class FeatureInline(admin.TabularInline):
 
 class TariffAdmin(admin.ModelAdmin):
     inlines = [FeatureInline]
-    list_display = ('name', 'price', 'preview_html')
+    list_display = ('name', 'price', 'max_games', 'max_players', 'preview_html')
 
     def preview_html(self, obj):
         features = "<ul>" + "".join(f"<li>{f.name}</li>" for f in obj.features.all()) + "</ul>"
         return mark_safe(f"<div style='padding:8px;border:1px solid #ccc'><b>{obj.name}</b><br>Price: {obj.price}<br>Features:{features}</div>")
     preview_html.short_description = "Preview"
 
-class MainPageGameAdmin(SortableAdminMixin, admin.ModelAdmin):
+class SearchVectorAdminMixin:
+    """Admin search through the indexed ``search_vector`` instead of LIKE scans."""
+
+    def get_search_results(self, request, queryset, search_term):
+        query = search_query(search_term)
+        if query is None:
+            return queryset, False
+        return queryset.filter(search_vector=query), False
+
+class GameAdmin(SearchVectorAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'user', 'date_created')
+    raw_id_fields = ('user', 'forked_from')
+    search_fields = ('name', 'description')
+
+class MainPageGameAdmin(SearchVectorAdminMixin, SortableAdminMixin, admin.ModelAdmin):
     model = MainPageGame
+    search_fields = ('name', 'author')
     list_display = ('name', 'author', 'author_link', 'preview_html')
     ordering = ('order',)
     
@@ -86,10 +102,18 @@ class PromocodeForm(forms.ModelForm):
 
 class PromocodeAdmin(admin.ModelAdmin):
     form = PromocodeForm
+    list_display = ('name', 'type', 'max_users', 'redeemed_count', 'end_date')
+    readonly_fields = ('redeemed_count',)
+
+class RoomArchiveAdmin(admin.ModelAdmin):
+    list_display = ('room_id', 'name', 'user_id', 'date_created', 'last_activity', 'archived_at')
+    search_fields = ('room_id',)
+    exclude = ('payload',)
 
 admin.site.register(User, UserAdmin)
-admin.site.register(Game)
+admin.site.register(Game, GameAdmin)
 admin.site.register(Room)
+admin.site.register(RoomArchive, RoomArchiveAdmin)
 admin.site.register(Tariff, TariffAdmin)
 admin.site.register(MainPageGame, MainPageGameAdmin)
 admin.site.register(Promocode, PromocodeAdmin)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from core.models import User
+
+VERSION_KEY = 'entitlements:version'
+
+
+@dataclass(frozen=True)
+class Entitlements:
+    """What a user may do right now; ``None`` limits mean unlimited."""
+    user_id: int
+    tariff_id: Optional[int]
+    tariff_name: Optional[str]
+    max_games: Optional[int]
+    max_players: Optional[int]
+    features: frozenset
+    trial: bool
+    expires_at: Optional[float]
+
+    def has(self, feature):
+        return feature in self.features
+
+    def allows_players(self, count):
+        return self.max_players is None or count is None or count <= self.max_players
+
+    def cap_players(self, count):
+        if self.max_players is None:
+            return count
+        return self.max_players if count is None else min(count, self.max_players)
+
+
+def resolve(user_id):
+    """Compute entitlements from the database in one query; None for an unknown user.
+
+    An active subscription (no ``end_date`` or one in the future) grants its
+    tariff's limits and features; otherwise the free tier from settings applies.
+    """
+    row = (
+        User.objects.filter(pk=user_id)
+        .annotate(feature_names=ArrayAgg(
+            'subscription__features__name',
+            filter=Q(subscription__features__isnull=False),
+            distinct=True,
+            default=Value([]),
+        ))
+        .values(
+            'subscription_id', 'subscription__name', 'subscription__max_games', 'subscription__max_players',
+            'end_date', 'free_trial', 'feature_names',
+        )
+        .first()
+    )
+    if row is None:
+        return None
+    end_date = row['end_date']
+    if row['subscription_id'] and (end_date is None or end_date > timezone.now()):
+        return Entitlements(
+            user_id=user_id,
+            tariff_id=row['subscription_id'],
+            tariff_name=row['subscription__name'],
+            max_games=row['subscription__max_games'],
+            max_players=row['subscription__max_players'],
+            features=frozenset(row['feature_names']),
+            trial=row['free_trial'],
+            expires_at=end_date.timestamp() if end_date else None,
+        )
+    return Entitlements(
+        user_id=user_id,
+        tariff_id=None,
+        tariff_name=None,
+        max_games=settings.FREE_MAX_GAMES,
+        max_players=settings.FREE_MAX_PLAYERS,
+        features=frozenset(settings.FREE_FEATURES),
+        trial=False,
+        expires_at=None,
+    )
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def _key(user_id):
+    return f"entitlements:{_version()}:{user_id}"
+
+
+def get_entitlements(user_id):
+    """Cached ``resolve``.
+
+    Entries are dropped when the user is saved and all of them are
+    invalidated when a tariff or feature changes (see ``core.signals``).
+    The TTL bounds staleness for workers that did not see the save, and it
+    makes an entitlement that expires by date lapse on time.
+    """
+    key = _key(user_id)
+    entitlements = cache.get(key)
+    if entitlements is None:
+        entitlements = resolve(user_id)
+        if entitlements is None:
+            return None
+        timeout = settings.ENTITLEMENT_CACHE_SECONDS
+        if entitlements.expires_at is not None:
+            timeout = max(1, min(timeout, int(entitlements.expires_at - time.time())))
+        cache.set(key, entitlements, timeout)
+    return entitlements
+
+
+def invalidate_user(user_id):
+    cache.delete(_key(user_id))
+
+
+def invalidate_all():
+    # Bumping the version orphans every cached entry at once; they age out.
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
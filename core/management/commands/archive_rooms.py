@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.room_lifecycle import archive_idle_rooms, purge_archives
+
+
+class Command(BaseCommand):
+    help = 'Archive idle rooms into compact cold storage and purge old archives, in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idle-hours', type=float, default=settings.ROOM_IDLE_TTL_HOURS,
+                            help='Archive rooms with no activity for this many hours.')
+        parser.add_argument('--purge-days', type=float, default=settings.ROOM_ARCHIVE_RETENTION_DAYS,
+                            help='Delete archives older than this many days (0 keeps them forever).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between batches to leave room for live traffic.')
+        parser.add_argument('--loop', type=float, default=0,
+                            help='Keep running, starting a new pass every N seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_pass(options)
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def run_pass(self, options):
+        cutoff = timezone.now() - timedelta(hours=options['idle_hours'])
+        archived = self.drain(lambda: archive_idle_rooms(cutoff, options['batch_size']), options['pause'])
+        purged = 0
+        if options['purge_days']:
+            before = timezone.now() - timedelta(days=options['purge_days'])
+            purged = self.drain(lambda: purge_archives(before, options['batch_size']), options['pause'])
+        self.stdout.write(f'Archived {archived} idle rooms, purged {purged} old archives')
+
+    def drain(self, run_batch, pause):
+        total = 0
+        while True:
+            done = run_batch()
+            total += done
+            if not done:
+                return total
+            time.sleep(pause)
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fastapi_app.utils.uploads import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable uploads that were never finished, with their staged files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=settings.UPLOAD_EXPIRY_HOURS,
+                            help='Remove unfinished uploads started more than this many hours ago.')
+
+    def handle(self, *args, **options):
+        purged = purge_expired(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(f'Purged {purged} unfinished uploads')
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from fastapi_app.utils.popularity import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trending games list from the time-decayed play counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=settings.TRENDING_SIZE,
+                            help='Number of games to keep in the list.')
+        parser.add_argument('--loop', type=float, default=0,
+                            help='Keep running, rebuilding the list every N seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            count = refresh_trending(options['size'])
+            self.stdout.write(f'Trending list rebuilt with {count} games')
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
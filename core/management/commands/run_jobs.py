@@ -0,0 +1,83 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from fastapi_app.utils.jobs import claim, reap_stale, run, worker_id
+
+
+class StopFlag:
+    """Signal handler that only records the request; loops check it between jobs."""
+
+    def __init__(self):
+        self.requested = False
+
+    def __call__(self, *args):
+        self.requested = True
+
+
+def work(poll_interval):
+    """Worker process: claim and run jobs until SIGTERM, finishing the current one."""
+    stop = StopFlag()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop)
+    name = worker_id()
+    while not stop.requested:
+        close_old_connections()
+        job = claim(name)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run(job)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (asset processing) in local worker processes; no broker needed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes.')
+        parser.add_argument('--poll', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds an idle worker waits before polling again.')
+        parser.add_argument('--once', action='store_true',
+                            help='Run queued jobs in this process until none are left, then exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            reap_stale()
+            done = 0
+            while (job := claim(worker_id())) is not None:
+                run(job)
+                done += 1
+            self.stdout.write(f'Ran {done} jobs')
+            return
+
+        stop = StopFlag()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        workers = {}
+        next_reap = 0
+        self.stdout.write(f"Starting {options['workers']} job workers")
+        while not stop.requested:
+            # Children must not inherit the parent's database connection.
+            connections.close_all()
+            for slot in range(options['workers']):
+                process = workers.get(slot)
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        self.stderr.write(f'Worker {process.pid} exited with {process.exitcode}, restarting')
+                    workers[slot] = multiprocessing.Process(target=work, args=(options['poll'],), daemon=True)
+                    workers[slot].start()
+            if time.monotonic() >= next_reap:
+                requeued, failed = reap_stale()
+                if requeued or failed:
+                    self.stdout.write(f'Reaped stale jobs: {requeued} requeued, {failed} failed')
+                next_reap = time.monotonic() + settings.JOB_STALE_SECONDS / 2
+            time.sleep(1.0)
+        self.stdout.write('Stopping job workers after their current job')
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join()
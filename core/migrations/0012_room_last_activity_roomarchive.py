@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:41
+
+import django.contrib.postgres.indexes
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_activity(apps, schema_editor):
+    Room = apps.get_model('core', 'Room')
+    Room.objects.update(last_activity=F('date_created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_alter_game_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_id', models.CharField(db_index=True, max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('payload', models.BinaryField(help_text='zlib-compressed JSON of the room content fields')),
+                ('date_created', models.DateTimeField()),
+                ('last_activity', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='last_activity',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['date_created'], name='core_room_created_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='roomarchive',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['archived_at'], name='core_roomarchive_at_brin'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_room_last_activity_roomarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomState',
+            fields=[
+                ('room', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_state', serialize=False, to='core.room')),
+                ('chips_coords', models.JSONField(blank=True, default=dict)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='durability',
+            field=models.CharField(choices=[('volatile', 'Volatile (memory only)'), ('buffered', 'Buffered (write-behind)'), ('sync', 'Synchronous (every change)')], default='buffered', help_text='How live table state is persisted', max_length=16),
+        ),
+    ]
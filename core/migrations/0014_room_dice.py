@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_room_durability_roomstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='dice_counter',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='dice_seed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DiceRoll',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('expression', models.CharField(max_length=255)),
+                ('result', models.JSONField(default=dict)),
+                ('total', models.IntegerField()),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dice_rolls', to='core.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'seq'), name='core_diceroll_room_seq_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_room_dice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDeck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deck_key', models.CharField(max_length=255)),
+                ('draw_pile', models.BinaryField(default=bytes, help_text='Packed little-endian card indices, top of deck last')),
+                ('discard_pile', models.BinaryField(default=bytes)),
+                ('hands', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deck_states', to='core.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'deck_key'), name='core_roomdeck_room_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_roomdeck'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('move', 'Chip moved'), ('roll', 'Dice rolled'), ('shuffle', 'Deck shuffled'), ('draw', 'Cards drawn'), ('discard', 'Cards discarded'), ('deal', 'Cards dealt'), ('join', 'Player joined'), ('leave', 'Player left')], max_length=16)),
+                ('user_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'seq'), name='core_roomevent_room_seq_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(help_text='Sequence number of the last event included in the snapshot')),
+                ('state', models.JSONField(default=dict)),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'seq'), name='core_roomsnapshot_room_seq_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_room_event_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='forked_from',
+            field=models.ForeignKey(blank=True, help_text='Game this one was cloned from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='forks', to='core.game'),
+        ),
+    ]
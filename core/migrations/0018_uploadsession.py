@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:57
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_game_forked_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('kind', models.CharField(choices=[('cover', 'Cover image'), ('map', 'Field image'), ('chip', 'Chip image'), ('deck', 'Deck image'), ('object', 'Game object file'), ('rules', 'Rules file')], max_length=16)),
+                ('filename', models.CharField(max_length=255)),
+                ('length', models.BigIntegerField(help_text='Total size in bytes')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes received so far')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='uploading', max_length=16)),
+                ('asset', models.CharField(blank=True, default='', help_text='Stored name once processed', max_length=255)),
+                ('error', models.TextField(blank=True, default='')),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_room_games(apps, schema_editor):
+    # Rooms only copied the game's fields; link those whose (name, owner)
+    # identifies exactly one game and seed the counters from them.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE core_room AS r SET game_id = g.id
+            FROM (
+                SELECT min(id) AS id, name, user_id FROM core_game
+                GROUP BY name, user_id HAVING count(*) = 1
+            ) AS g
+            WHERE r.game_id IS NULL AND r.name = g.name AND r.user_id IS NOT DISTINCT FROM g.user_id
+        """)
+        cursor.execute("""
+            INSERT INTO core_gamestats (game_id, sessions_count, trend_score, trend_updated_at)
+            SELECT game_id, count(*), sum(power(0.5, extract(epoch FROM now() - date_created) / %s)), now()
+            FROM core_room WHERE game_id IS NOT NULL
+            GROUP BY game_id
+            ON CONFLICT (game_id) DO NOTHING
+        """, [settings.TRENDING_HALF_LIFE_HOURS * 3600])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameStats',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.game')),
+                ('sessions_count', models.BigIntegerField(default=0)),
+                ('trend_score', models.FloatField(default=0)),
+                ('trend_updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='game',
+            field=models.ForeignKey(blank=True, help_text='Game this room was started from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rooms', to='core.game'),
+        ),
+        migrations.CreateModel(
+            name='TrendingGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True)),
+                ('score', models.FloatField()),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.game')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.RunPython(backfill_room_games, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:08
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def session_room_id(entry):
+    if isinstance(entry, dict):
+        entry = entry.get('room_id') or entry.get('id')
+    if entry is None or isinstance(entry, (list, dict)):
+        return None
+    return str(entry)
+
+
+def normalize_links(apps, schema_editor):
+    # sessions becomes a flat list of room id strings (what the containment
+    # lookups expect) and linked_game_ids loses duplicates.
+    User = apps.get_model('core', 'User')
+    users = User.objects.exclude(sessions=[], linked_game_ids=[]).only('sessions', 'linked_game_ids')
+    for user in users.iterator(chunk_size=500):
+        sessions = user.sessions
+        if isinstance(sessions, dict):
+            sessions = list(sessions)
+        elif not isinstance(sessions, list):
+            sessions = [sessions] if sessions else []
+        room_ids = list(dict.fromkeys(r for r in map(session_room_id, sessions) if r))
+        game_ids = list(dict.fromkeys(user.linked_game_ids or []))
+        if room_ids != user.sessions or game_ids != user.linked_game_ids:
+            User.objects.filter(pk=user.pk).update(sessions=room_ids, linked_game_ids=game_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0021_room_game_popularity'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_links, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='sessions',
+            field=models.JSONField(blank=True, default=list, help_text='Room ids (strings) the user is in'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['linked_game_ids'], name='core_user_linked_games_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['sessions'], name='core_user_sessions_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_orphan_owners(apps, schema_editor):
+    # Owner ids were never checked; ids of users that no longer exist would
+    # make the foreign key constraint fail, so they become NULL (no owner).
+    User = apps.get_model('core', 'User')
+    for model_name in ('Game', 'Room'):
+        model = apps.get_model('core', model_name)
+        model.objects.filter(user_id__isnull=False).exclude(user_id__in=User.objects.values('pk')).update(user_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_user_link_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_orphan_owners, migrations.RunPython.noop),
+        # Rename the fields in Django's state only; the column stays user_id.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(model_name='game', old_name='user_id', new_name='user'),
+                migrations.AlterField(
+                    model_name='game',
+                    name='user',
+                    field=models.IntegerField(blank=True, null=True, db_column='user_id'),
+                ),
+                migrations.RenameField(model_name='room', old_name='user_id', new_name='user'),
+                migrations.AlterField(
+                    model_name='room',
+                    name='user',
+                    field=models.IntegerField(blank=True, null=True, db_column='user_id'),
+                ),
+            ],
+        ),
+        # Then turn the columns into indexed foreign keys in place.
+        migrations.AlterField(
+            model_name='game',
+            name='user',
+            field=models.ForeignKey(blank=True, db_column='user_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='games', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='user',
+            field=models.ForeignKey(blank=True, db_column='user_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rooms', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_game_room_user_fk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tariff',
+            name='max_games',
+            field=models.PositiveIntegerField(blank=True, help_text='Games a subscriber may own; empty means unlimited', null=True),
+        ),
+        migrations.AddField(
+            model_name='tariff',
+            name='max_players',
+            field=models.PositiveIntegerField(blank=True, help_text='Players per room; empty means unlimited', null=True),
+        ),
+    ]
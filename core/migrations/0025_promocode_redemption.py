@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_tariff_limits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromocodeRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('discount_amount', models.DecimalField(blank=True, decimal_places=2, help_text='Discount granted, for discount codes', max_digits=8, null=True)),
+                ('redeemed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='redeemed_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Redemptions so far; never exceeds max_users'),
+        ),
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(fields=['name'], name='core_promocode_name_idx'),
+        ),
+        migrations.AddField(
+            model_name='promocoderedemption',
+            name='promocode',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='core.promocode'),
+        ),
+        migrations.AddField(
+            model_name='promocoderedemption',
+            name='tariff',
+            field=models.ForeignKey(blank=True, help_text='Subscription granted, for subscription codes', null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.tariff'),
+        ),
+        migrations.AddField(
+            model_name='promocoderedemption',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promocode_redemptions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='promocoderedemption',
+            constraint=models.UniqueConstraint(fields=('promocode', 'user'), name='core_redemption_code_user_uniq'),
+        ),
+    ]
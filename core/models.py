@@ -1,10 +1,15 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models.expressions import RawSQL
+import json
 import re
+import uuid
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -29,6 +34,55 @@ class UserManager(BaseUserManager):
         local = re.sub(r'\+.*', '', local)
         return f"{local}@{domain}"
 
+    # Reverse lookups and bulk edits of ``linked_game_ids`` / ``sessions``.
+    # Lookups are containment queries served by the GIN indexes on User; edits
+    # are one UPDATE computed by Postgres, so concurrent edits do not overwrite
+    # each other and nothing is read back into Python first.
+
+    def linked_to_game(self, game_id):
+        return self.filter(linked_game_ids__contains=[game_id])
+
+    def in_room(self, room_id):
+        return self.filter(sessions__contains=[str(room_id)])
+
+    def link_games(self, user_ids, game_ids):
+        """Add ``game_ids`` to every user in ``user_ids``; returns the rows updated."""
+        game_ids = sorted({int(game_id) for game_id in game_ids})
+        if not game_ids:
+            return 0
+        return self.filter(pk__in=user_ids).update(linked_game_ids=RawSQL(
+            "ARRAY(SELECT g FROM unnest(linked_game_ids) AS g WHERE g <> ALL(%s::integer[])) || %s::integer[]",
+            [game_ids, game_ids],
+        ))
+
+    def unlink_games(self, user_ids, game_ids):
+        game_ids = sorted({int(game_id) for game_id in game_ids})
+        if not game_ids:
+            return 0
+        return self.filter(pk__in=user_ids, linked_game_ids__overlap=game_ids).update(linked_game_ids=RawSQL(
+            "ARRAY(SELECT g FROM unnest(linked_game_ids) AS g WHERE g <> ALL(%s::integer[]))",
+            [game_ids],
+        ))
+
+    def join_rooms(self, user_ids, room_ids):
+        """Add ``room_ids`` to ``sessions`` of every user in ``user_ids``."""
+        room_ids = sorted({str(room_id) for room_id in room_ids})
+        if not room_ids:
+            return 0
+        return self.filter(pk__in=user_ids).update(sessions=RawSQL(
+            "(sessions - %s::text[]) || %s::jsonb",
+            [room_ids, json.dumps(room_ids)],
+        ))
+
+    def leave_rooms(self, user_ids, room_ids):
+        room_ids = sorted({str(room_id) for room_id in room_ids})
+        if not room_ids:
+            return 0
+        return self.filter(pk__in=user_ids, sessions__has_any_keys=room_ids).update(sessions=RawSQL(
+            "sessions - %s::text[]",
+            [room_ids],
+        ))
+
 class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     profile_picture = models.ImageField(upload_to='users/', blank=True, null=True)
@@ -38,7 +92,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     end_date = models.DateTimeField(blank=True, null=True, help_text='Subscription end date')
     free_trial = models.BooleanField(default=False)
     linked_game_ids = ArrayField(models.IntegerField(), default=list, blank=True)
-    sessions = models.JSONField(default=list, blank=True)
+    sessions = models.JSONField(default=list, blank=True, help_text='Room ids (strings) the user is in')
     active = models.BooleanField(default=True)
     role = models.CharField(max_length=50, default='user')
     is_staff = models.BooleanField(default=False)
@@ -53,6 +107,12 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['linked_game_ids'], name='core_user_linked_games_gin'),
+            GinIndex(fields=['sessions'], name='core_user_sessions_gin', opclasses=['jsonb_path_ops']),
+        ]
+
     def save(self, *args, **kwargs):
         self.email = UserManager().clean_email(self.email)
         super().save(*args, **kwargs)
@@ -62,7 +122,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Game(models.Model):
     name = models.CharField(max_length=255)
-    user_id = models.IntegerField(null=True, blank=True)
+    user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, db_column='user_id', related_name='games')
     description = models.TextField(blank=True, null=True)
     max_users = models.IntegerField(null=True, blank=True)
     picture = models.ImageField(upload_to='games/', blank=True, null=True)
@@ -73,14 +133,33 @@ class Game(models.Model):
     objects_json = models.JSONField(default=dict, blank=True, null=True, help_text='Example: {"photo": "url", "copies": 1}')
     rules = models.FileField(upload_to='rules/', null=True, blank=True)
     date_created = models.DateTimeField(default=timezone.now)
+    forked_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='forks', help_text='Game this one was cloned from')
+    # Computed by Postgres on every insert/update; see core/search.py.
+    search_vector = models.GeneratedField(
+        expression=SearchVector('name', weight='A', config='simple') + SearchVector('description', weight='B', config='simple'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_game_search_gin'),
+        ]
 
     def __str__(self):
         return self.name
 
 class Room(models.Model):
+    DURABILITY_CHOICES = [
+        ('volatile', 'Volatile (memory only)'),
+        ('buffered', 'Buffered (write-behind)'),
+        ('sync', 'Synchronous (every change)'),
+    ]
+
     room_id = models.CharField(max_length=255, unique=True)
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True, related_name='rooms', help_text='Game this room was started from')
     name = models.CharField(max_length=255)
-    user_id = models.IntegerField(null=True, blank=True)
+    user = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, db_column='user_id', related_name='rooms')
     description = models.TextField(blank=True, null=True)
     max_users = models.IntegerField(null=True, blank=True)
     picture = models.ImageField(upload_to='games/', blank=True, null=True)
@@ -91,10 +170,221 @@ class Room(models.Model):
     objects_json = models.JSONField(default=dict, blank=True, null=True, help_text='Example: {"photo": "url", "copies": 1}')
     rules = models.URLField(null=True)
     date_created = models.DateTimeField(default=timezone.now)
+    last_activity = models.DateTimeField(default=timezone.now, db_index=True)
+    durability = models.CharField(max_length=16, choices=DURABILITY_CHOICES, default='buffered', help_text='How live table state is persisted')
+    dice_seed = models.BinaryField(null=True, blank=True, editable=False)
+    dice_counter = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            BrinIndex(fields=['date_created'], name='core_room_created_brin'),
+        ]
 
     def __str__(self):
         return self.name
-    
+
+class GameStats(models.Model):
+    """Play counters per game, updated in batches from the API workers.
+
+    ``trend_score`` decays with a half-life of ``TRENDING_HALF_LIFE_HOURS``;
+    the stored value is as of ``trend_updated_at``.
+    """
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    sessions_count = models.BigIntegerField(default=0)
+    trend_score = models.FloatField(default=0)
+    trend_updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.game_id}: {self.sessions_count}"
+
+class TrendingGame(models.Model):
+    """Materialized trending list, rebuilt by `manage.py refresh_trending`."""
+    rank = models.PositiveIntegerField(unique=True)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"{self.rank}. {self.game_id}"
+
+class DiceRoll(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='dice_rolls')
+    seq = models.BigIntegerField()
+    user_id = models.IntegerField(null=True, blank=True)
+    expression = models.CharField(max_length=255)
+    result = models.JSONField(default=dict)
+    total = models.IntegerField()
+    date_created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'seq'], name='core_diceroll_room_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id}#{self.seq} {self.expression} = {self.total}"
+
+class RoomDeck(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='deck_states')
+    deck_key = models.CharField(max_length=255)
+    draw_pile = models.BinaryField(default=bytes, help_text='Packed little-endian card indices, top of deck last')
+    discard_pile = models.BinaryField(default=bytes)
+    hands = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'deck_key'], name='core_roomdeck_room_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id}:{self.deck_key}"
+
+class RoomEvent(models.Model):
+    KIND_CHOICES = [
+        ('move', 'Chip moved'),
+        ('roll', 'Dice rolled'),
+        ('shuffle', 'Deck shuffled'),
+        ('draw', 'Cards drawn'),
+        ('discard', 'Cards discarded'),
+        ('deal', 'Cards dealt'),
+        ('join', 'Player joined'),
+        ('leave', 'Player left'),
+    ]
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='events')
+    seq = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    user_id = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    date_created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'seq'], name='core_roomevent_room_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id}#{self.seq} {self.kind}"
+
+class RoomSnapshot(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='snapshots')
+    seq = models.BigIntegerField(help_text='Sequence number of the last event included in the snapshot')
+    state = models.JSONField(default=dict)
+    date_created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'seq'], name='core_roomsnapshot_room_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id}@{self.seq}"
+
+class RoomState(models.Model):
+    room = models.OneToOneField(Room, on_delete=models.CASCADE, primary_key=True, related_name='live_state')
+    chips_coords = models.JSONField(default=dict, blank=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.room_id} v{self.version}"
+
+class RoomMember(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='members')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='room_seats')
+    joined_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(help_text='Seat is free once this passes without a heartbeat')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'user'], name='core_roommember_room_user_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id}:{self.user_id}"
+
+class RoomArchive(models.Model):
+    room_id = models.CharField(max_length=255, db_index=True)
+    name = models.CharField(max_length=255)
+    user_id = models.IntegerField(null=True, blank=True)
+    payload = models.BinaryField(help_text='zlib-compressed JSON of the room content fields')
+    date_created = models.DateTimeField()
+    last_activity = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            BrinIndex(fields=['archived_at'], name='core_roomarchive_at_brin'),
+        ]
+
+    def __str__(self):
+        return self.room_id
+
+class UploadSession(models.Model):
+    KIND_CHOICES = [
+        ('cover', 'Cover image'),
+        ('map', 'Field image'),
+        ('chip', 'Chip image'),
+        ('deck', 'Deck image'),
+        ('object', 'Game object file'),
+        ('rules', 'Rules file'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user_id = models.IntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    length = models.BigIntegerField(help_text='Total size in bytes')
+    offset = models.BigIntegerField(default=0, help_text='Bytes received so far')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='uploading')
+    asset = models.CharField(max_length=255, blank=True, default='', help_text='Stored name once processed')
+    error = models.TextField(blank=True, default='')
+    date_created = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    batch = models.UUIDField(default=uuid.uuid4, db_index=True, help_text='Jobs enqueued together share a batch id')
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    callback_url = models.URLField(blank=True, default='', help_text='Notified once when the whole batch has finished')
+    date_created = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='core_job_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
 class Feature(models.Model):
     name = models.CharField(max_length=255)
     tariff = models.ForeignKey('Tariff', on_delete=models.CASCADE, related_name='features')
@@ -105,6 +395,8 @@ class Feature(models.Model):
 class Tariff(models.Model):
     name = models.CharField(max_length=255)
     price = models.IntegerField()
+    max_games = models.PositiveIntegerField(null=True, blank=True, help_text='Games a subscriber may own; empty means unlimited')
+    max_players = models.PositiveIntegerField(null=True, blank=True, help_text='Players per room; empty means unlimited')
 
     def __str__(self):
         return self.name
@@ -116,7 +408,17 @@ class MainPageGame(models.Model):
     author_link = models.URLField(blank=True, null=True)
     description = models.TextField(blank=True)
     picture = models.ImageField(upload_to='main_page_games/', blank=True, null=True)
-    
+    search_vector = models.GeneratedField(
+        expression=SearchVector('name', weight='A', config='simple') + SearchVector('author', weight='B', config='simple'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_mainpagegame_search_gin'),
+        ]
+
     def __str__(self):
         return self.name
     
@@ -127,6 +429,12 @@ class Promocode(models.Model):
     discount_amount = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     max_users = models.IntegerField()
     end_date = models.DateTimeField()
+    redeemed_count = models.PositiveIntegerField(default=0, editable=False, help_text='Redemptions so far; never exceeds max_users')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='core_promocode_name_idx'),
+        ]
 
     def clean(self):
         if self.type == 'option1' and not self.subscription:
@@ -135,4 +443,19 @@ class Promocode(models.Model):
             raise ValidationError("Discount amount is required when type is Discount.")
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class PromocodeRedemption(models.Model):
+    promocode = models.ForeignKey(Promocode, on_delete=models.CASCADE, related_name='redemptions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='promocode_redemptions')
+    tariff = models.ForeignKey('Tariff', on_delete=models.SET_NULL, null=True, blank=True, help_text='Subscription granted, for subscription codes')
+    discount_amount = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Discount granted, for discount codes')
+    redeemed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['promocode', 'user'], name='core_redemption_code_user_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.promocode_id} -> {self.user_id}"
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.entitlements import invalidate_user
+from core.models import Promocode, PromocodeRedemption, User
+
+
+class PromocodeError(ValueError):
+    """Raised when a promocode cannot be redeemed."""
+
+
+class PromocodeNotFound(PromocodeError):
+    pass
+
+
+class PromocodeExpired(PromocodeError):
+    pass
+
+
+class PromocodeExhausted(PromocodeError):
+    """Every one of the code's ``max_users`` redemptions is taken."""
+
+
+class PromocodeConflict(PromocodeError):
+    """The user has an active subscription to another tariff."""
+
+
+def find_promocode(code):
+    promocode = Promocode.objects.filter(name=code.strip()).order_by('-end_date').first()
+    if promocode is None:
+        raise PromocodeNotFound(f"Promocode {code} not found")
+    return promocode
+
+
+def redeem(code, user_id):
+    """Redeem ``code`` for ``user_id``; returns ``(redemption, created)``.
+
+    Redeeming the same code again returns the existing redemption. The
+    redemption row, the user's new subscription and the counter bump commit
+    together. The counter is bumped last with a guarded UPDATE
+    (``redeemed_count < max_users``), so the promocode row is locked only for
+    the moment before commit: concurrent redemptions queue on it briefly
+    instead of for the whole transaction, and it can never be oversold.
+
+    A subscription code starts the tariff for a user with no active
+    subscription and extends it for a user already on the same tariff; one
+    without an end date stays without. It is refused while another tariff is
+    active, so a code can never downgrade or shorten what the user paid for.
+    """
+    promocode = find_promocode(code)
+    existing = PromocodeRedemption.objects.filter(promocode=promocode, user_id=user_id).first()
+    if existing is not None:
+        return existing, False
+    now = timezone.now()
+    if promocode.end_date <= now:
+        raise PromocodeExpired(f"Promocode {code} has expired")
+    grants_tariff = promocode.type == 'option1' and promocode.subscription_id
+    try:
+        with transaction.atomic():
+            redemption = PromocodeRedemption.objects.create(
+                promocode=promocode,
+                user_id=user_id,
+                tariff_id=promocode.subscription_id if grants_tariff else None,
+                discount_amount=promocode.discount_amount if promocode.type == 'option2' else None,
+                redeemed_at=now,
+            )
+            if grants_tariff:
+                same_tariff = Q(subscription_id=promocode.subscription_id)
+                applied = User.objects.filter(
+                    same_tariff | Q(subscription__isnull=True) | Q(end_date__lte=now),
+                    pk=user_id,
+                ).update(
+                    subscription_id=promocode.subscription_id,
+                    # Extends a running subscription instead of cutting it short.
+                    end_date=Case(
+                        When(same_tariff, end_date__isnull=True, then=F('end_date')),
+                        default=Greatest(F('end_date'), now) + timedelta(days=settings.PROMOCODE_SUBSCRIPTION_DAYS),
+                    ),
+                )
+                if not applied:
+                    raise PromocodeConflict(f"Promocode {code} is for another tariff than your active subscription")
+                transaction.on_commit(lambda: invalidate_user(user_id))
+            claimed = Promocode.objects.filter(
+                pk=promocode.pk,
+                redeemed_count__lt=F('max_users'),
+                end_date__gt=now,
+            ).update(redeemed_count=F('redeemed_count') + 1)
+            if not claimed:
+                raise PromocodeExhausted(f"Promocode {code} has been fully redeemed")
+    except IntegrityError:
+        # The same user redeemed concurrently and won; return their redemption.
+        existing = PromocodeRedemption.objects.filter(promocode=promocode, user_id=user_id).first()
+        if existing is None:
+            raise
+        return existing, False
+    return redemption, True
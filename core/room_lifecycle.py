@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from core.models import DiceRoll, Room, RoomArchive, RoomDeck, RoomEvent, RoomSnapshot, RoomState
+
+# Room fields that make up the archived payload; the rest are kept as columns.
+ARCHIVED_FIELDS = ('description', 'max_users', 'picture', 'map', 'chips', 'cube', 'decks', 'objects_json', 'rules')
+
+_touched = {}
+_touched_lock = threading.Lock()
+
+
+def touch_due(key):
+    """Return True at most once per ``ROOM_TOUCH_INTERVAL`` seconds for ``key``.
+
+    Cheap enough to call on every chip move; callers only go to the database
+    (``touch_room``) when it says so.
+    """
+    now = time.monotonic()
+    with _touched_lock:
+        if now - _touched.get(key, float('-inf')) < settings.ROOM_TOUCH_INTERVAL:
+            return False
+        _touched[key] = now
+    return True
+
+
+def touch_room(**lookup):
+    """Bump ``Room.last_activity`` for the room matching ``lookup``.
+
+    The conditional UPDATE skips rows touched within the last interval, so
+    several workers touching the same room still write it about once.
+    """
+    stamp = timezone.now()
+    Room.objects.filter(
+        last_activity__lt=stamp - timedelta(seconds=settings.ROOM_TOUCH_INTERVAL),
+        **lookup,
+    ).update(last_activity=stamp)
+
+
+def pack_room(room, live_state=None, deck_states=(), events=(), snapshots=(), dice_rolls=()):
+    """Compress ``room``'s content plus its live rows into an archive payload.
+
+    ``deck_states``, ``events``, ``snapshots`` and ``dice_rolls`` are value
+    dicts of the room's ``RoomDeck``, ``RoomEvent``, ``RoomSnapshot`` and
+    ``DiceRoll`` rows. Bytes (deck piles, the dice seed) are stored as hex
+    since JSON has none; with the seed and counter the rolls can still be
+    replayed.
+    """
+    data = {
+        'live_state': live_state or {},
+        'dice_seed': bytes(room.dice_seed).hex() if room.dice_seed is not None else None,
+        'dice_counter': room.dice_counter,
+        'dice_rolls': list(dice_rolls),
+        'deck_states': [
+            {**deck, 'draw_pile': bytes(deck['draw_pile']).hex(), 'discard_pile': bytes(deck['discard_pile']).hex()}
+            for deck in deck_states
+        ],
+        'events': list(events),
+        'snapshots': list(snapshots),
+    }
+    for field in ARCHIVED_FIELDS:
+        value = getattr(room, field)
+        data[field] = value.name if isinstance(value, FieldFile) else value
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode(), 6)
+
+
+def unpack_archive(archive):
+    return json.loads(zlib.decompress(bytes(archive.payload)))
+
+
+def archive_idle_rooms(cutoff, batch_size):
+    """Move one batch of rooms idle since ``cutoff`` into ``RoomArchive``.
+
+    Rows are claimed with SKIP LOCKED so the batch never waits on rooms that
+    are being written, and each batch is its own short transaction. Returns
+    the number of rooms archived.
+    """
+    with transaction.atomic():
+        rooms = list(
+            Room.objects.select_for_update(skip_locked=True)
+            .filter(last_activity__lt=cutoff)
+            .order_by('last_activity')[:batch_size]
+        )
+        if not rooms:
+            return 0
+        room_pks = [room.pk for room in rooms]
+        live_states = dict(RoomState.objects.filter(room_id__in=room_pks).values_list('room_id', 'chips_coords'))
+        related = defaultdict(lambda: defaultdict(list))
+        for name, queryset, fields in (
+            ('deck_states', RoomDeck.objects.order_by('deck_key'), ('deck_key', 'draw_pile', 'discard_pile', 'hands')),
+            ('events', RoomEvent.objects.order_by('seq'), ('seq', 'kind', 'user_id', 'payload', 'date_created')),
+            ('snapshots', RoomSnapshot.objects.order_by('seq'), ('seq', 'state', 'date_created')),
+            ('dice_rolls', DiceRoll.objects.order_by('seq'),
+             ('seq', 'user_id', 'expression', 'result', 'total', 'date_created')),
+        ):
+            for row in queryset.filter(room_id__in=room_pks).values('room_id', *fields):
+                related[row.pop('room_id')][name].append(row)
+        RoomArchive.objects.bulk_create([
+            RoomArchive(
+                room_id=room.room_id,
+                name=room.name,
+                user_id=room.user_id,
+                payload=pack_room(room, live_states.get(room.pk), **related[room.pk]),
+                date_created=room.date_created,
+                last_activity=room.last_activity,
+            )
+            for room in rooms
+        ])
+        Room.objects.filter(pk__in=[room.pk for room in rooms]).delete()
+    return len(rooms)
+
+
+def purge_archives(before, batch_size):
+    """Delete one batch of archives older than ``before``; returns the count."""
+    with transaction.atomic():
+        ids = list(
+            RoomArchive.objects.filter(archived_at__lt=before)
+            .order_by('archived_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            RoomArchive.objects.filter(pk__in=ids).delete()
+    return len(ids)
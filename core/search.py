@@ -0,0 +1,84 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from core.models import Game, MainPageGame
+
+_WORD = re.compile(r'\w+')
+MAX_WORDS = 16
+
+_trigram_installed = None
+
+
+def trigram_available():
+    """Whether pg_trgm is installed; checked once per process."""
+    global _trigram_installed
+    if _trigram_installed is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_installed = cursor.fetchone() is not None
+    return _trigram_installed
+
+
+def search_query(text):
+    """A tsquery matching every word of ``text`` as a prefix, or None if it has no words.
+
+    Words are extracted here rather than passed through ``websearch`` so that
+    a half-typed last word ("catan sett") still matches.
+    """
+    words = _WORD.findall(text.lower())[:MAX_WORDS]
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f"{word}:*" for word in words), search_type='raw', config='simple')
+
+
+def _ranked(queryset, query, text, trigram_fields):
+    """Filter ``queryset`` to rows matching ``query`` (or similar by name) and rank them."""
+    rank = SearchRank(F('search_vector'), query)
+    matches = Q(search_vector=query)
+    if trigram_available():
+        similarities = [TrigramSimilarity(field, text) for field in trigram_fields]
+        queryset = queryset.annotate(similarity=Greatest(*similarities) if len(similarities) > 1 else similarities[0])
+        close = Q()
+        for field in trigram_fields:
+            # ``%`` can use the trigram index; the threshold check narrows it to our setting.
+            close |= Q(**{f"{field}__trigram_similar": text})
+        matches |= close & Q(similarity__gte=settings.SEARCH_TRIGRAM_THRESHOLD)
+        rank = rank + F('similarity')
+    return queryset.filter(matches).annotate(rank=rank).order_by('-rank', '-id')
+
+
+def search_games(text, limit=20, offset=0, user_id=None):
+    """Ranked search over user games and main-page games.
+
+    Returns ``(total, results)`` where results are dicts with a ``type`` of
+    ``game`` or ``main_page_game``. With ``user_id`` only that user's games
+    are searched. Each table returns its own top ``offset + limit`` rows and
+    the two lists are merged by rank, which gives the same page as ranking
+    the union.
+    """
+    query = search_query(text)
+    if query is None:
+        return 0, []
+    window = offset + limit
+    games = _ranked(Game.objects.all(), query, text, ['name'])
+    if user_id is not None:
+        games = games.filter(user_id=user_id)
+    results = [
+        {"type": "game", "id": g.id, "name": g.name, "description": g.description, "author": None, "picture": g.picture, "rank": g.rank}
+        for g in games.only('id', 'name', 'description', 'picture')[:window]
+    ]
+    total = games.count()
+    if user_id is None:
+        featured = _ranked(MainPageGame.objects.all(), query, text, ['name', 'author'])
+        results += [
+            {"type": "main_page_game", "id": g.id, "name": g.name, "description": g.description, "author": g.author, "picture": g.picture, "rank": g.rank}
+            for g in featured.only('id', 'name', 'author', 'description', 'picture')[:window]
+        ]
+        total += featured.count()
+    results.sort(key=lambda result: result["rank"], reverse=True)
+    return total, results[offset:window]
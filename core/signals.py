@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.entitlements import invalidate_all, invalidate_user
+from core.models import Feature, Tariff, User
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Tariff)
+@receiver([post_save, post_delete], sender=Feature)
+def tariff_changed(sender, instance, **kwargs):
+    invalidate_all()
@@ -0,0 +1,83 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from core.models import Promocode, PromocodeRedemption, Tariff, User
+from core.promocodes import PromocodeConflict, PromocodeExhausted, redeem
+
+
+class RedeemTests(TransactionTestCase):
+    def setUp(self):
+        self.tariff = Tariff.objects.create(name='Pro', price=10)
+        self.promocode = Promocode.objects.create(
+            name='PRO30', type='option1', subscription=self.tariff,
+            max_users=3, end_date=timezone.now() + timedelta(days=1),
+        )
+
+    def make_user(self, n, **fields):
+        return User.objects.create_user(email=f'user{n}@example.com', password='x', name=f'User {n}', **fields)
+
+    def test_concurrent_redemptions_never_exceed_max_users(self):
+        users = [self.make_user(n) for n in range(12)]
+        barrier = threading.Barrier(len(users))
+        outcomes = []
+
+        def attempt(user_id):
+            try:
+                barrier.wait()
+                redeem(self.promocode.name, user_id)
+                outcomes.append('redeemed')
+            except PromocodeExhausted:
+                outcomes.append('exhausted')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user.pk,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.promocode.refresh_from_db()
+        self.assertEqual(outcomes.count('redeemed'), 3)
+        self.assertEqual(outcomes.count('exhausted'), len(users) - 3)
+        self.assertEqual(self.promocode.redeemed_count, 3)
+        self.assertEqual(PromocodeRedemption.objects.filter(promocode=self.promocode).count(), 3)
+        self.assertEqual(User.objects.filter(subscription=self.tariff).count(), 3)
+
+    def test_extends_same_tariff(self):
+        end_date = timezone.now() + timedelta(days=10)
+        user = self.make_user(1, subscription=self.tariff, end_date=end_date)
+        redeem(self.promocode.name, user.pk)
+        user.refresh_from_db()
+        self.assertEqual(user.end_date, end_date + timedelta(days=settings.PROMOCODE_SUBSCRIPTION_DAYS))
+
+    def test_keeps_subscription_without_end_date(self):
+        user = self.make_user(1, subscription=self.tariff, end_date=None)
+        redeem(self.promocode.name, user.pk)
+        user.refresh_from_db()
+        self.assertIsNone(user.end_date)
+
+    def test_refuses_while_another_tariff_is_active(self):
+        other = Tariff.objects.create(name='Studio', price=30)
+        user = self.make_user(1, subscription=other, end_date=None)
+        with self.assertRaises(PromocodeConflict):
+            redeem(self.promocode.name, user.pk)
+        user.refresh_from_db()
+        self.promocode.refresh_from_db()
+        self.assertEqual(user.subscription_id, other.pk)
+        self.assertIsNone(user.end_date)
+        self.assertEqual(self.promocode.redeemed_count, 0)
+        self.assertFalse(PromocodeRedemption.objects.exists())
+
+    def test_replaces_expired_tariff(self):
+        other = Tariff.objects.create(name='Studio', price=30)
+        user = self.make_user(1, subscription=other, end_date=timezone.now() - timedelta(days=1))
+        redeem(self.promocode.name, user.pk)
+        user.refresh_from_db()
+        self.assertEqual(user.subscription_id, self.tariff.pk)
+        self.assertGreater(user.end_date, timezone.now() + timedelta(days=settings.PROMOCODE_SUBSCRIPTION_DAYS - 1))
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import DiceRoll, Room, RoomArchive
+from core.room_lifecycle import archive_idle_rooms, unpack_archive
+from fastapi_app.utils.dice import DiceStream, evaluate, parse_expression, roll_for_room
+
+
+class ArchiveTests(TestCase):
+    def test_archive_keeps_replayable_dice_rolls(self):
+        room = Room.objects.create(room_id='dice-room', name='Dice')
+        rolls = roll_for_room(room.pk, ['2d6+1', '1d20'], user_id=7)
+        Room.objects.filter(pk=room.pk).update(last_activity=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(archive_idle_rooms(timezone.now() - timedelta(days=1), 10), 1)
+        self.assertFalse(DiceRoll.objects.exists())
+
+        payload = unpack_archive(RoomArchive.objects.get(room_id='dice-room'))
+        self.assertEqual(payload['dice_counter'], 2)
+        archived = payload['dice_rolls']
+        self.assertEqual(
+            [(roll['seq'], roll['expression'], roll['total'], roll['user_id']) for roll in archived],
+            [(roll.seq, roll.expression, roll.total, 7) for roll in rolls],
+        )
+        seed = bytes.fromhex(payload['dice_seed'])
+        for roll in archived:
+            total, result = evaluate(parse_expression(roll['expression']), DiceStream(seed, roll['seq']))
+            self.assertEqual((total, result), (roll['total'], roll['result']))
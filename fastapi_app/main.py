@@ -1,32 +1,67 @@
 import os
 import sys
+import asyncio
 import socket
 import platform
-import psutil
-from fastapi import FastAPI
-from importlib.util import find_spec
-from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gameorbit.settings')
-import django
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-django.setup()
+from fastapi_app.utils.startup import LazyApp, startup_profile
 
-from django.contrib.auth.models import User
-from fastapi_app.routes.payment_routes import router as payment_router
-from fastapi_app.routes.auth_routes import router as auth_router
-from fastapi_app.routes.game_routes import router as game_router
-from fastapi_app.routes.info_routes import router as info_router
+with startup_profile.phase("fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+
+# The one place the API process sets up Django; every module imported below
+# relies on it having run.
+with startup_profile.phase("django"):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gameorbit.settings')
+    import django
+    django.setup()
+
+with startup_profile.phase("routers"):
+    from fastapi_app.routes.payment_routes import router as payment_router
+    from fastapi_app.routes.auth_routes import router as auth_router
+    from fastapi_app.routes.game_routes import router as game_router
+    from fastapi_app.routes.info_routes import router as info_router
+    from fastapi_app.routes.upload_routes import router as upload_router
+    from fastapi_app.routes.diagnostics_routes import router as diagnostics_router
+
+from django.conf import settings
 from django.db import connections, OperationalError
-from fastapi.middleware.wsgi import WSGIMiddleware
-from fastapi.staticfiles import StaticFiles
+from asgiref.sync import sync_to_async
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gameorbit.settings")
+from fastapi_app.utils.compression import CompressionMiddleware
+from fastapi_app.utils.diagnostics import start_tracing
+from fastapi_app.utils.metrics import metrics
+from fastapi_app.schemas.common_schemas import DetailOut
+from fastapi_app.schemas.health_schemas import HealthOut, MetricsOut
+from fastapi_app.utils.room_state import room_state_store
+from fastapi_app.utils.popularity import popularity_counter
+from fastapi_app.utils.presence import presence_registry
 
-from gameorbit.wsgi import application
+@asynccontextmanager
+async def lifespan(app):
+    if settings.STARTUP_REPORT:
+        print(startup_profile.summary())
+    metrics.gauge("startup.seconds", startup_profile.mark_ready)
+    if settings.DIAGNOSTICS_TRACEMALLOC_FRAMES:
+        start_tracing(settings.DIAGNOSTICS_TRACEMALLOC_FRAMES)
+    background = [
+        asyncio.create_task(room_state_store.run()),
+        asyncio.create_task(popularity_counter.run()),
+        asyncio.create_task(presence_registry.run()),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    # Persist whatever the write-behind layer still holds before exiting.
+    await room_state_store.flush()
+    await sync_to_async(popularity_counter.flush)()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,9 +70,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    cacheable_paths=settings.COMPRESSION_CACHEABLE_PATHS,
+    cache_entries=settings.COMPRESSION_CACHE_ENTRIES,
+)
 
 app.mount("/mkjffkxgxd/static", StaticFiles(directory=os.path.abspath("../app/staticfiles"), html=True), name="static")
-app.mount("/mkjffkxgxd", WSGIMiddleware(application))
+# The admin (Django's ASGI handler and its middleware) loads on first visit.
+app.mount("/mkjffkxgxd", LazyApp("gameorbit.asgi:admin_application"))
 app.mount("/images/images/images", StaticFiles(directory=os.path.abspath("../app/images")), name="images")
 app.mount("/images/images", StaticFiles(directory=os.path.abspath("../app/images")), name="images")
 app.mount("/images", StaticFiles(directory=os.path.abspath("../app/images")), name="images")
@@ -46,12 +88,19 @@ app.include_router(payment_router, prefix="/email", tags=["users"])
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(game_router, prefix="/game", tags=["game"])
 app.include_router(info_router, prefix="/info", tags=["info"])
+app.include_router(upload_router, prefix="/upload", tags=["upload"])
+if settings.DIAGNOSTICS_ENABLED:
+    app.include_router(diagnostics_router, prefix="/diagnostics", tags=["diagnostics"])
 
-@app.get("/")
+@app.get("/", response_model=DetailOut)
 def root():
     return {"detail":"Not Found"}
 
-@app.get("/health", tags=["health"])
+@app.get("/metrics", tags=["health"], response_model=MetricsOut)
+def get_metrics():
+    return metrics.snapshot()
+
+@app.get("/health", tags=["health"], response_model=HealthOut)
 def health_check():
     health = {"status": "ok"}
     # DB check
@@ -68,6 +117,7 @@ def health_check():
     health["os"] = platform.system()
     health["os_version"] = platform.version()
     # Memory usage
+    import psutil  # only needed here; keeps it out of worker startup
     mem = psutil.virtual_memory()
     health["memory_total_mb"] = round(mem.total / 1024 / 1024, 2)
     health["memory_used_mb"] = round(mem.used / 1024 / 1024, 2)
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Depends, Form
-from fastapi_app.schemas.auth_schemas import AuthRegister, VerificationEmailSchema, AuthLogin, ResendVerificationEmailSchema
+from fastapi_app.schemas.auth_schemas import AuthRegister, VerificationEmailSchema, AuthLogin, ResendVerificationEmailSchema, TokenOut, SignupOut, UserOut
+from fastapi_app.schemas.common_schemas import MessageOut
 import random
 from fastapi_app.utils.mail import send_message
 from django.db import IntegrityError
-import django
 import os
 from django.utils import timezone
 from datetime import timedelta, datetime
@@ -12,10 +12,7 @@ from django.core.cache import cache
 import jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import re
-from PIL import Image  # Add this import
-
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gameorbit.settings")
-django.setup()
+from fastapi_app.utils.images import save_image, IMAGE_SPECS
 from core.models import User
 from fastapi import File, UploadFile
 
@@ -36,7 +33,7 @@ def clean_email(email):
     local = re.sub(r'\+.*', '', local)
     return f"{local}@{domain}"
 
-@router.post("/login/")
+@router.post("/login/", response_model=TokenOut)
 def login(data: AuthLogin):
     email = clean_email(data.email.lower())
     cache_key = f"login_attempts:{email}"
@@ -64,7 +61,7 @@ def login(data: AuthLogin):
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return {"access_token": token, "token_type": "bearer"}
 
-@router.post("/signup/")
+@router.post("/signup/", response_model=SignupOut, response_model_exclude_none=True)
 def register(data: AuthRegister, background_tasks: BackgroundTasks):
     verification_code = str(random.randint(100000, 999999))
     email = clean_email(data.email.lower())
@@ -93,7 +90,7 @@ def register(data: AuthRegister, background_tasks: BackgroundTasks):
     background_tasks.add_task(send_message, email_data)
     return {"message": "Verification code sent to email"}
 
-@router.post("/verify-email/")
+@router.post("/verify-email/", response_model=MessageOut)
 def verify_email(data: VerificationEmailSchema):
     email = clean_email(data.email.lower())
     try:
@@ -108,7 +105,26 @@ def verify_email(data: VerificationEmailSchema):
     user.save()
     return {"message": "Email verified successfully."}
 
-@router.get("/user/")
+def current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Dependency: the user id from a valid bearer token, else 401."""
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired.")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token.")
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token.")
+    return user_id
+
+def staff_user_id(user_id: int = Depends(current_user_id)):
+    """Dependency: the user id of an active staff member, else 403."""
+    if not User.objects.filter(pk=user_id, is_staff=True, is_active=True).exists():
+        raise HTTPException(status_code=403, detail="Staff only.")
+    return user_id
+
+@router.get("/user/", response_model=UserOut)
 def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
@@ -117,31 +133,13 @@ def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token.")
         user = User.objects.get(id=user_id)
-        # Return all user info (customize as needed)
-        return {
-            "id": user.id,
-            "username": user.name,
-            "email": user.email,
-            "phone": user.phone,
-            "profile_picture": user.profile_picture.url if user.profile_picture else None,
-            "subscription": user.subscription_id,
-            "end_date": user.end_date,
-            "free_trial": user.free_trial,
-            "linked_game_ids": user.linked_game_ids,
-            "sessions": user.sessions,
-            "active": user.active,
-            "role": user.role,
-            "is_staff": user.is_staff,
-            "is_active": user.is_active,
-            "is_verified": user.is_verified,
-            "date_joined": user.date_joined,
-        }
+        return UserOut.model_validate(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired.")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token.")
 
-@router.post("/resend-verification/")
+@router.post("/resend-verification/", response_model=MessageOut)
 def resend_verification(data: ResendVerificationEmailSchema, background_tasks: BackgroundTasks):
     email = clean_email(data.email.lower())
     try:
@@ -158,7 +156,7 @@ def resend_verification(data: ResendVerificationEmailSchema, background_tasks: B
     background_tasks.add_task(send_message, email_data)
     return {"message": "Verification code resent to email."}
 
-@router.patch("/user/update-profile/")
+@router.patch("/user/update-profile/", response_model=MessageOut)
 def update_profile(
     email: str = Form(...),
     username: str = Form(...),
@@ -190,10 +188,7 @@ def update_profile(
             os.makedirs(dir_path, exist_ok=True)
             file_path = f"{dir_path}/{user_id}.jpg"
             # Compress, resize, and save image
-            image = Image.open(profile_image.file)
-            image = image.convert("RGB")  # Ensure compatibility
-            image.thumbnail((512, 512))  # Resize to max 512x512, keeping aspect ratio
-            image.save(file_path, format="JPEG", quality=70, optimize=True)
+            save_image(profile_image.file, file_path, *IMAGE_SPECS['profile'])
             user.profile_picture = file_path
         user.save()
         return {"message": "Profile updated successfully."}
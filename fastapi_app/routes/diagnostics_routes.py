@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_app.routes.auth_routes import staff_user_id
+from fastapi_app.schemas.diagnostics_schemas import GroupBy, MemoryOut, SnapshotDiffOut, TracingIn, TracingOut
+from fastapi_app.utils import diagnostics
+
+# Every answer describes the worker that served the request (see ``pid``);
+# behind the launcher each worker has to be asked, or switched, separately.
+router = APIRouter(dependencies=[Depends(staff_user_id)])
+
+@router.get("/memory/", response_model=MemoryOut)
+def memory(
+    top: int = Query(20, ge=1, le=200),
+    group_by: GroupBy = 'lineno',
+    objects: bool = Query(False, description="Count live objects by type (walks every tracked object)."),
+    stores: bool = True,
+):
+    status = diagnostics.tracing_status()
+    return {
+        **diagnostics.process_memory(),
+        "pid": status["pid"],
+        "tracing": status,
+        "allocations": diagnostics.top_allocations(top, group_by),
+        "objects": diagnostics.object_counts(top) if objects else [],
+        "stores": diagnostics.store_sizes() if stores else {},
+    }
+
+@router.get("/tracemalloc/", response_model=TracingOut)
+def tracing_status():
+    return diagnostics.tracing_status()
+
+@router.post("/tracemalloc/", response_model=TracingOut)
+def switch_tracing(data: TracingIn):
+    if data.enabled:
+        diagnostics.start_tracing(data.frames)
+    else:
+        diagnostics.stop_tracing()
+    return diagnostics.tracing_status()
+
+@router.post("/snapshot/", response_model=TracingOut)
+def take_snapshot():
+    try:
+        diagnostics.take_baseline()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return diagnostics.tracing_status()
+
+@router.get("/snapshot/diff/", response_model=SnapshotDiffOut)
+def snapshot_diff(top: int = Query(20, ge=1, le=200), group_by: GroupBy = 'lineno'):
+    try:
+        allocations = diagnostics.diff_baseline(top, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    status = diagnostics.tracing_status()
+    return {"pid": status["pid"], "baseline_taken_at": status["baseline_taken_at"], "allocations": allocations}
@@ -1,44 +1,146 @@
 from fastapi import APIRouter
 from fastapi import HTTPException, status
 from fastapi import File, UploadFile
-from core.models import Game, User, Room
+from core.models import Game, User, Room, DiceRoll
+from core.search import search_games
+from core.entitlements import Entitlements, get_entitlements
+from core.room_lifecycle import touch_due, touch_room
+from fastapi_app.utils.room_ids import room_id_allocator, RoomIdExhausted
+from fastapi_app.utils.room_state import room_state_store
+from fastapi_app.utils.dice import roll_for_room, DiceError
+from fastapi_app.utils.decks import DeckError
+from fastapi_app.utils.event_log import catch_up, iter_replay
+from fastapi_app.utils.encoding import negotiate, sync_dictionaries, wants_msgpack, DICTIONARY_HEADER
+from fastapi_app.utils.game_archive import iter_export, import_archive, ArchiveError
+from fastapi_app.utils.game_assets import AssetError, extension
+from fastapi_app.utils.game_forks import clone_game, replace_asset
+from fastapi_app.utils.jobs import enqueue, batch_status, check_callback_url, stage_file, CallbackURLError
+from fastapi_app.utils.popularity import popularity_counter
+from fastapi_app.utils.presence import presence_registry, RoomFull
+from fastapi_app.utils.broadcast import stream_room
+from fastapi_app.routes.auth_routes import current_user_id
+from fastapi_app.utils.uploads import collect_upload_ids, resolve_uploads, UploadError
+from fastapi_app.schemas.common_schemas import DetailOut, file_url
+from fastapi_app.schemas.game_schemas import (
+    GameListItemOut, GameDetailOut, DashboardOut, DashboardGameOut, SearchOut, GameSavedOut, GameUpdatedOut, JobStatusOut, GameClonedOut, AssetReplacedOut, SessionOut, SessionCreatedOut, ChipCoordsSetOut,
+    DiceRollIn, DiceRollOut, DiceRollsOut, DeckShuffleIn, DeckDrawIn, DeckDiscardIn, DeckDealIn,
+    CardsOut, DeckSummaryOut, DecksOut, DeckDrawOut, DeckDealOut, RoomEventsOut, PresenceOut,
+)
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, Q, Value
+from django.db.models.functions import Coalesce, JSONObject
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.utils import timezone
+from datetime import timedelta
 from starlette.requests import ClientDisconnect
 from asgiref.sync import sync_to_async
 import time
 
-from fastapi import Form, Request
-from fastapi.responses import JSONResponse
-from PIL import Image
-from typing import Optional, List
+from fastapi import Depends, Form, Query, Request, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Any, Dict, Optional, List
+from uuid import UUID, uuid4
 
+import logging
 import os
 import json
 
-import random
-import string
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory store for chips coordinates (replace with DB in production)
-chips_coords_store = {}
-
-@router.get("/games/")
+@router.get("/games/", response_model=List[GameListItemOut])
 async def get_games(user_id: int):
     games = await sync_to_async(list)(Game.objects.filter(user_id=user_id))
-    return [
-        {
-            "id": game.id,
-            "name": game.name,
-            "description": game.description,
-            "date_created": game.date_created,
-            "cover_image": game.picture.url,
-            # add other fields as needed
-        }
-        for game in games
-    ]
-
-@router.get("/game/{game_id}/")
-async def get_game(game_id: int):
+    return [GameListItemOut.model_validate(game) for game in games]
+
+def get_owned_game(game_id, user_id, action, fields=None):
+    """Fetch a game and check that ``user_id`` owns it, in one query.
+
+    Raises 404 for an unknown game or user and 403 when the game belongs to
+    someone else.
+    """
+    games = Game.objects.filter(pk=game_id).annotate(user_exists=Exists(User.objects.filter(pk=user_id)))
+    if fields:
+        games = games.only(*fields)
+    game = games.first()
+    if game is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Game with id {game_id} not found"
+        )
+    if game.user_id != user_id:
+        if not game.user_exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} not found"
+            )
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Only the game owner can {action}")
+    return game
+
+async def load_entitlements(user_id):
+    entitlements = await sync_to_async(get_entitlements)(user_id)
+    if entitlements is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found"
+        )
+    return entitlements
+
+async def query_entitlements(user_id: int):
+    """Entitlements of the ``user_id`` query parameter; usually served from cache."""
+    return await load_entitlements(user_id)
+
+async def form_entitlements(user_id: str = Form(...)):
+    """Entitlements of the ``user_id`` form field; usually served from cache."""
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="user_id must be an integer")
+    return await load_entitlements(user_id)
+
+def owner_dashboard(user_id):
+    # One query: the owner's games joined with their rooms and play counters.
+    active = Q(rooms__last_activity__gte=timezone.now() - timedelta(hours=settings.ROOM_IDLE_TTL_HOURS))
+    return list(
+        Game.objects.filter(user_id=user_id)
+        .annotate(
+            room_count=Count('rooms'),
+            active_room_count=Count('rooms', filter=active),
+            last_played=Max('rooms__last_activity'),
+            sessions_count=Coalesce(F('stats__sessions_count'), 0),
+            active_rooms=JSONBAgg(
+                JSONObject(session_id='rooms__id', room_id='rooms__room_id', last_activity='rooms__last_activity'),
+                filter=active,
+                default=Value([]),
+            ),
+        )
+        .only('id', 'name', 'description', 'picture', 'date_created')
+        .order_by('-date_created')
+    )
+
+@router.get("/dashboard/", response_model=DashboardOut)
+async def get_dashboard(user_id: int):
+    games = await sync_to_async(owner_dashboard)(user_id)
+    for game in games:
+        for room in game.active_rooms:
+            room["online"] = presence_registry.occupancy(room["session_id"])
+    return DashboardOut(user_id=user_id, games=[DashboardGameOut.model_validate(game) for game in games])
+
+@router.get("/search/", response_model=SearchOut)
+async def search(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1), offset: int = Query(0, ge=0), user_id: Optional[int] = None):
+    limit = min(limit, settings.SEARCH_MAX_LIMIT)
+    if offset > settings.SEARCH_MAX_OFFSET:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"offset must not exceed {settings.SEARCH_MAX_OFFSET}"
+        )
+    total, results = await sync_to_async(search_games)(q, limit, offset, user_id)
+    return SearchOut(query=q, total=total, limit=limit, offset=offset, results=results)
+
+@router.get("/game/{game_id}/", response_model=GameDetailOut)
+async def get_game(game_id: int, request: Request):
     try:
         game = await sync_to_async(Game.objects.get)(id=game_id)
     except Game.DoesNotExist:
@@ -46,62 +148,108 @@ async def get_game(game_id: int):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Game with id {game_id} not found"
         )
-    return {
-        "game_id": game.id,
-        "user_id": game.user_id,
-        "title": game.name,
-        "description": game.description,
-        "max_users": game.max_users,
-        'cover_image': game.picture.url,
-        'field_image': game.map.url,
-        "chips": game.chips,
-        "cube": game.cube,
-        "decks": game.decks,
-        "objects_json": game.objects_json,
-        "rules_file": game.rules.url,
-    }
+    return negotiate(request, GameDetailOut.model_validate(game))
 
-@router.get("/create-session/")
-async def create_session(game_id: int, user_id: int):
+@router.get("/game/{game_id}/export/", response_class=StreamingResponse)
+async def export_game(game_id: int):
     try:
-        try:
-            game = await sync_to_async(Game.objects.get)(id=game_id)
-        except Game.DoesNotExist:
+        game = await sync_to_async(Game.objects.get)(id=game_id)
+    except Game.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Game with id {game_id} not found"
+        )
+    return StreamingResponse(
+        iter_export(game),
+        media_type="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="game-{game.id}.tar"'},
+    )
+
+@router.post("/game/import/", response_model=GameSavedOut)
+async def import_game(user_id: int = Form(...), archive: UploadFile = File(...)):
+    try:
+        await sync_to_async(User.objects.get)(id=user_id)
+    except User.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found"
+        )
+    try:
+        game = await sync_to_async(import_archive)(archive.file, user_id)
+    except (ArchiveError, AssetError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"game_id": game.id, "detail": "Game imported successfully"}
+
+@router.post("/game/{game_id}/clone/", response_model=GameClonedOut)
+async def fork_game(game_id: int, user_id: int = Form(...), title: Optional[str] = Form(None)):
+    try:
+        source = await sync_to_async(Game.objects.get)(id=game_id)
+    except Game.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Game with id {game_id} not found"
+        )
+    try:
+        await sync_to_async(User.objects.get)(id=user_id)
+    except User.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found"
+        )
+    game = await sync_to_async(clone_game)(source, user_id, title)
+    return {"game_id": game.id, "forked_from": source.id, "detail": "Game cloned successfully"}
+
+@router.post("/game/{game_id}/assets/replace/", response_model=AssetReplacedOut)
+async def replace_game_asset(game_id: int, user_id: int = Form(...), ref: str = Form(...), file: UploadFile = File(...)):
+    await sync_to_async(get_owned_game)(game_id, user_id, "replace its assets", fields=['id', 'user_id'])
+    result = await sync_to_async(replace_asset)(game_id, ref, file.file, extension(file.filename))
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Game with id {game_id} not found"
+        )
+    game, name, replaced = result
+    if not replaced:
+        raise HTTPException(status_code=400, detail=f"Game {game_id} does not reference {ref}")
+    return {"game_id": game.id, "asset": name, "replaced": replaced}
+
+@router.get("/create-session/", response_model=SessionCreatedOut)
+async def create_session(game_id: int, user_id: int, durability: Optional[str] = None, entitlements: Entitlements = Depends(query_entitlements)):
+    try:
+        if durability and durability not in dict(Room.DURABILITY_CHOICES):
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Game with id {game_id} not found"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown durability: {durability}"
             )
         if not user_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Missing required fields: user_id or title"
             )
-        # Validate creator
+        game = await sync_to_async(get_owned_game)(game_id, user_id, "start a session")
         try:
-            creator = await sync_to_async(User.objects.get)(id=user_id)
-        except User.DoesNotExist:
+            room = await sync_to_async(room_id_allocator.create_room)(
+                name=game.name,
+                description=game.description,
+                max_users=entitlements.cap_players(game.max_users),
+                picture=file_url(game.picture),
+                map=file_url(game.map),
+                chips=game.chips,
+                cube=game.cube,
+                decks=game.decks,
+                objects_json=game.objects_json,
+                rules=file_url(game.rules),
+                user_id=game.user_id,
+                game=game,
+                durability=durability or 'buffered',
+            )
+        except RoomIdExhausted:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with id {user_id} not found"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Could not allocate a room id, please retry"
             )
-        # Generate a random room ID
-        room_id = f"{''.join(random.choices(string.ascii_letters + string.digits, k=4))}-{''.join(random.choices(string.ascii_letters + string.digits, k=4))}"
-        room = await sync_to_async(Room.objects.create)(
-            room_id=room_id,
-            name=game.name,
-            description=game.description,
-            max_users=game.max_users,
-            picture=game.picture.url,
-            map=game.map.url,
-            chips=game.chips,
-            cube=game.cube,
-            decks=game.decks,
-            objects_json=game.objects_json,
-            rules=game.rules.url,
-            user_id=game.user_id,
-        )
-        await sync_to_async(room.save)()
-        return {"room_id": room_id, "detail": "Room created successfully"}
+        popularity_counter.incr(game.id)
+        return {"room_id": room.room_id, "detail": "Room created successfully"}
     except HTTPException:
         raise
     except Exception as e:
@@ -113,8 +261,8 @@ async def create_session(game_id: int, user_id: int):
             detail=str(e)
         )
 
-@router.get("/session/{room_id}/")
-async def get_session(room_id: str):
+@router.get("/session/{room_id}/", response_model=SessionOut)
+async def get_session(room_id: str, request: Request):
     try:
         room = await sync_to_async(Room.objects.get)(room_id=room_id)
     except Room.DoesNotExist:
@@ -122,46 +270,43 @@ async def get_session(room_id: str):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session with id {room_id} not found"
         )
-    return {
-        "room_id": room.id,
-        "name": room.name,
-        "description": room.description,
-        "max_users": room.max_users,
-        "picture": room.picture.url,
-        "map": room.map.url,
-        "chips": room.chips,
-        "cube": room.cube,
-        "decks": room.decks,
-        "objects_json": room.objects_json,
-        "rules": room.rules,
-        "user_id": room.user_id,
-        "date_created": room.date_created,
-    }
+    if touch_due(room.pk):
+        await sync_to_async(touch_room)(pk=room.pk)
+    dictionary_id = None
+    if request.headers.get(DICTIONARY_HEADER):
+        dictionary_id, _ = await sync_to_async(sync_dictionaries.for_content)(room.chips, room.decks, room.objects_json)
+    session = SessionOut.model_validate(room)
+    session.online = presence_registry.occupancy(room.pk)
+    return negotiate(request, session, dictionary_id)
 
-@router.get("/delete-game/")
+@router.get("/session/{session_id}/sync-dictionary/", response_class=Response)
+async def get_sync_dictionary(session_id: int):
+    try:
+        room = await sync_to_async(Room.objects.only('chips', 'decks', 'objects_json').get)(id=session_id)
+    except Room.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    dictionary_id, dictionary = await sync_to_async(sync_dictionaries.for_content)(room.chips, room.decks, room.objects_json)
+    return Response(
+        content=dictionary.as_bytes(),
+        media_type="application/octet-stream",
+        headers={DICTIONARY_HEADER: dictionary_id, "Cache-Control": "public, max-age=86400"},
+    )
+
+@router.get("/delete-game/", response_model=DetailOut)
 async def delete_game(game_id: int, user_id: int):
     try:
-        try:
-            game = await sync_to_async(Game.objects.get)(id=game_id)
-        except Game.DoesNotExist:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Game with id {game_id} not found"
-            )
         if not user_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Missing required fields: user_id or title"
             )
-        # Validate creator
-        try:
-            creator = await sync_to_async(User.objects.get)(id=user_id)
-        except User.DoesNotExist:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with id {user_id} not found"
-            )
+        game = await sync_to_async(get_owned_game)(game_id, user_id, "delete the game", fields=['id', 'user_id'])
         await sync_to_async(game.delete)()
+        # Drop the dangling id from every user that linked the game.
+        await sync_to_async(User.objects.unlink_games)(User.objects.linked_to_game(game_id).values('pk'), [game_id])
         return {"detail": f"Game with id {game_id} deleted successfully"}
     except HTTPException:
         raise
@@ -174,7 +319,24 @@ async def delete_game(game_id: int, user_id: int):
             detail=str(e)
         )
     
-@router.post("/create-game/")
+def game_image_path(user_id, kind):
+    # One name per image: cover and field jobs of the same request must not
+    # write the same file.
+    return f"images/games/{user_id}_{kind}_{uuid4().hex}.jpg"
+
+async def stage_image(upload, destination, kind):
+    """Stage an uploaded image and describe the job that will write ``destination``."""
+    source = await sync_to_async(stage_file)(upload.file)
+    return ('save_image', {"source": source, "destination": destination, "kind": kind})
+
+def save_game(game, jobs, callback_url=None):
+    # The game already points at the final paths, so it must not be saved
+    # without the jobs that will write them.
+    with transaction.atomic():
+        game.save()
+        return enqueue(jobs, callback_url) if jobs else None
+
+@router.post("/create-game/", response_model=GameUpdatedOut)
 async def create_or_update_game(
     user_id: str = Form(...),
     title: str = Form(...),
@@ -190,8 +352,13 @@ async def create_or_update_game(
     game_objects_metadata: Optional[str] = Form(None),
     game_object_files: List[UploadFile] = File([]),
     rules_file: Optional[UploadFile] = File(None),
-    game_id: Optional[str] = Form(None)):
-    print("Creating or updating game...")
+    cover_upload_id: Optional[str] = Form(None),
+    field_upload_id: Optional[str] = Form(None),
+    rules_upload_id: Optional[str] = Form(None),
+    callback_url: Optional[str] = Form(None),
+    game_id: Optional[str] = Form(None),
+    entitlements: Entitlements = Depends(form_entitlements)):
+    logger.debug("Creating or updating game %s for user %s", game_id, user_id)
     try:
         if not user_id or not title or title.strip() == "":
             raise HTTPException(
@@ -199,13 +366,17 @@ async def create_or_update_game(
                 detail="Missing required fields: user_id or title"
             )
 
-        # Validate creator
-        try:
-            creator = await sync_to_async(User.objects.get)(id=user_id)
-        except User.DoesNotExist:
+        if callback_url:
+            try:
+                await sync_to_async(check_callback_url)(callback_url)
+            except CallbackURLError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        # The creator was validated by the entitlements dependency.
+        if not entitlements.allows_players(max_players):
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with id {user_id} not found"
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Your plan allows at most {entitlements.max_players} players per game"
             )
 
         if game_id:
@@ -217,8 +388,7 @@ async def create_or_update_game(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Game with id {game_id} not found"
                 )
-            
-            print(rules_file)
+
             game.name = title
             game.description = description
             game.max_users = max_players
@@ -226,39 +396,44 @@ async def create_or_update_game(
             game.decks = decks_metadata
             game.objects_json = game_objects_metadata
             game.user_id = user_id
-            if rules_file:
+            # Image work runs in the job queue (run_jobs); the game is saved
+            # with the final paths right away and the response carries a job id.
+            image_jobs = []
+            # Assets sent ahead of time through /upload/ are referenced by id,
+            # either in the *_upload_id fields or as {"type": "upload", "upload_id": ...}
+            # entries in the metadata.
+            referenced = {cover_upload_id, field_upload_id, rules_upload_id} - {None}
+            try:
+                for metadata in (chips_metadata, decks_metadata, game_objects_metadata):
+                    try:
+                        referenced |= collect_upload_ids(json.loads(metadata)) if metadata else set()
+                    except json.JSONDecodeError:
+                        pass  # reported below by the section that parses it
+                uploads = await sync_to_async(resolve_uploads)(referenced, user_id)
+            except UploadError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if rules_upload_id:
+                game.rules = uploads[rules_upload_id]
+            elif rules_file:
                 dir_path = "images/games/rules"
                 os.makedirs(dir_path, exist_ok=True)
                 file_path = os.path.join(dir_path, f"{user_id}_{int(time.time())}_{rules_file.filename}")
                 with open(file_path, "wb") as out_file:
                     out_file.write(await rules_file.read())
                 game.rules = file_path
-            if cover_image:
-                dir_path = "images/games"
-                os.makedirs(dir_path, exist_ok=True)
-                # Generate a unique filename
-                file_name = f"{user_id}_{int(time.time())}.jpg"
-                file_path = f"{dir_path}/{file_name}.jpg"
-                # Compress, resize, and save image
-                image = Image.open(cover_image.file)
-                image = image.convert("RGB")  # Ensure compatibility
-                image.thumbnail((512, 512))  # Resize to max 512x512, keeping aspect ratio
-                image.save(file_path, format="JPEG", quality=70, optimize=True)
+            if cover_upload_id:
+                game.picture = uploads[cover_upload_id]
+            elif cover_image:
+                file_path = game_image_path(user_id, 'cover')
+                image_jobs.append(await stage_image(cover_image, file_path, 'cover'))
                 game.picture = file_path
-            if field_image:
-                dir_path = "images/games"
-                os.makedirs(dir_path, exist_ok=True)
-                # Generate a unique filename
-                file_name = f"{user_id}_{int(time.time())}.jpg"
-                file_path = f"{dir_path}/{file_name}.jpg"
-                # Compress, resize, and save image
-                image = Image.open(field_image.file)
-                image = image.convert("RGB")  # Ensure compatibility
-                image.thumbnail((1024, 1024))  # Resize to max 512x512, keeping aspect ratio
-                image.save(file_path, format="JPEG", quality=70, optimize=True)
+            if field_upload_id:
+                game.map = uploads[field_upload_id]
+            elif field_image:
+                file_path = game_image_path(user_id, 'map')
+                image_jobs.append(await stage_image(field_image, file_path, 'map'))
                 game.map = file_path
-            print("Chips metadata:", chips_metadata)
-            print("Chips files:", chip_files)
+            logger.debug("Chips metadata: %s, files: %s", chips_metadata, [f.filename for f in chip_files])
             if chips_metadata:
                 try:
                     chips = json.loads(chips_metadata)
@@ -266,6 +441,8 @@ async def create_or_update_game(
                     for chip_id, chip_info in chips.items():
                         if chip_info.get("type") == "url":
                             chip_data.append({"value": chip_info.get("value")})
+                        elif chip_info.get("type") == "upload":
+                            chip_data.append({"value": uploads[str(chip_info["upload_id"])]})
                         elif chip_info.get("type") == "file":
                             # Find the corresponding file in chip_files by name
                             file_obj = next((f for f in chip_files if f.filename == chip_info.get("name")), None)
@@ -273,10 +450,7 @@ async def create_or_update_game(
                                 dir_path = "images/games/chips"
                                 os.makedirs(dir_path, exist_ok=True)
                                 file_path = os.path.join(dir_path, f"{user_id}_{int(time.time())}_{file_obj.filename}")
-                                image = Image.open(file_obj.file)
-                                image = image.convert("RGB")  # Ensure compatibility
-                                image.thumbnail((512, 512))  # Resize to max 512x512, keeping aspect ratio
-                                image.save(file_path, format="PNG", quality=70, optimize=True)
+                                image_jobs.append(await stage_image(file_obj, file_path, 'chip'))
                                 chip_data.append({
                                     "value":file_path
                                 })
@@ -299,11 +473,10 @@ async def create_or_update_game(
                                 dir_path = 'images/games/decks'
                                 os.makedirs(dir_path, exist_ok=True)
                                 file_path = os.path.join(dir_path, f"{user_id}_{int(time.time())}_{file_obj.filename}")
-                                image = Image.open(file_obj.file)
-                                image = image.convert("RGB")  # Ensure compatibility
-                                image.thumbnail((512, 512))  # Resize to max 512x512, keeping aspect ratio
-                                image.save(file_path, format="PNG", quality=70, optimize=True)
+                                image_jobs.append(await stage_image(file_obj, file_path, 'deck'))
                                 deck_info['backImage'] = {'type': 'file', 'path': file_path}
+                        elif deck_info.get('backImage', {}).get('type') == 'upload':
+                            deck_info['backImage'] = {'type': 'file', 'path': uploads[str(deck_info['backImage']['upload_id'])]}
                         # Handle cards
                         for idx, card in enumerate(deck_info.get('cards', [])):
                             if card.get('type') == 'file':
@@ -312,11 +485,10 @@ async def create_or_update_game(
                                     dir_path = 'images/games/decks/cards'
                                     os.makedirs(dir_path, exist_ok=True)
                                     file_path = os.path.join(dir_path, f"{user_id}_{int(time.time())}_{file_obj.filename}")
-                                    image = Image.open(file_obj.file)
-                                    image = image.convert("RGB")  # Ensure compatibility
-                                    image.thumbnail((512, 512))  # Resize to max 512x512, keeping aspect ratio
-                                    image.save(file_path, format="PNG", quality=70, optimize=True)
+                                    image_jobs.append(await stage_image(file_obj, file_path, 'deck'))
                                     deck_info['cards'][idx] = {'type': 'file', 'path': file_path}
+                            elif card.get('type') == 'upload':
+                                deck_info['cards'][idx] = {'type': 'file', 'path': uploads[str(card['upload_id'])]}
                     game.decks = json.dumps(decks)
                 except Exception as e:
                     raise HTTPException(status_code=400, detail=f"Invalid decks metadata: {e}")
@@ -335,6 +507,8 @@ async def create_or_update_game(
                                 with open(file_path, 'wb') as out_file:
                                     out_file.write(await file_obj.read())
                                 obj_info['image'] = {'type': 'file', 'path': file_path}
+                        elif obj_info.get('image', {}).get('type') == 'upload':
+                            obj_info['image'] = {'type': 'file', 'path': uploads[str(obj_info['image']['upload_id'])]}
                     game.objects_json = json.dumps(game_objects)
                 except Exception as e:
                     raise HTTPException(status_code=400, detail=f"Invalid game objects metadata: {e}")
@@ -347,9 +521,16 @@ async def create_or_update_game(
                 except Exception as e:
                     raise HTTPException(status_code=400, detail=f"Invalid cubes metadata: {e}")
 
-            await sync_to_async(game.save)()
-            return {"game_id": game.id, "detail": "Game updated successfully"}
+            job_id = await sync_to_async(save_game)(game, image_jobs, callback_url)
+            return {"game_id": game.id, "detail": "Game updated successfully", "job_id": job_id and str(job_id)}
         else:
+            if entitlements.max_games is not None:
+                owned = await sync_to_async(Game.objects.filter(user_id=user_id).count)()
+                if owned >= entitlements.max_games:
+                    raise HTTPException(
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail=f"Your plan allows at most {entitlements.max_games} games"
+                    )
             # Create the game object with possible null fields
             game = await sync_to_async(Game.objects.create)(
                 user_id=user_id,
@@ -363,29 +544,227 @@ async def create_or_update_game(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print("Exception occurred:", str(e))
-        traceback.print_exc()
+        logger.exception("Creating or updating game %s failed", game_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
-@router.get("/session/{session_id}/chips/coords/")
-async def get_chips_coords(session_id: int):
+@router.get("/jobs/{job_id}/", response_model=JobStatusOut)
+async def get_job_status(job_id: UUID):
+    job = await sync_to_async(batch_status)(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    return job
+
+@router.get("/session/{session_id}/chips/coords/", response_model=Dict[str, Dict[str, Any]])
+async def get_chips_coords(session_id: int, request: Request):
     # Return coordinates for all chips in this session
-    return chips_coords_store.get(session_id, {})
+    room = await room_state_store.get(session_id)
+    return negotiate(request, room.chips_coords if room else {})
 
-@router.post("/session/{session_id}/chips/coords/")
+@router.post("/session/{session_id}/chips/coords/", response_model=ChipCoordsSetOut)
 async def set_chip_coords(session_id: int, request: Request):
-    print(chips_coords_store)
     data = await request.json()
     idx = data.get("idx")
     left = data.get("left")
     bottom = data.get("bottom")
     if idx is None or left is None or bottom is None:
         return JSONResponse({"error": "Missing idx, left, or bottom"}, status_code=400)
-    if session_id not in chips_coords_store:
-        chips_coords_store[session_id] = {}
-    chips_coords_store[session_id][idx] = {"left": left, "bottom": bottom}
-    return {"ok": True, "coords": chips_coords_store[session_id]}
\ No newline at end of file
+    room = await room_state_store.get(session_id)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    await room_state_store.set_chip(room, idx, {"left": left, "bottom": bottom}, data.get("user_id"))
+    if touch_due(session_id):
+        await sync_to_async(touch_room)(pk=session_id)
+    return {"ok": True, "coords": room.chips_coords}
+
+@router.post("/session/{session_id}/dice/roll/", response_model=DiceRollsOut)
+async def roll_dice(session_id: int, data: DiceRollIn):
+    expressions = ([data.expression] if data.expression else []) + data.expressions
+    if not expressions:
+        raise HTTPException(status_code=400, detail="Missing expression")
+    if len(expressions) > settings.DICE_MAX_EXPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.DICE_MAX_EXPRESSIONS} expressions per request")
+    try:
+        rolls = await sync_to_async(roll_for_room)(session_id, expressions, data.user_id)
+    except DiceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rolls is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    room = await room_state_store.get(session_id)
+    if room is not None:
+        for roll in rolls:
+            await room_state_store.record(room, 'roll', {"roll_seq": roll.seq, "expression": roll.expression, "total": roll.total, "result": roll.result}, data.user_id)
+    return DiceRollsOut(rolls=[DiceRollOut.model_validate(roll) for roll in rolls])
+
+@router.get("/session/{session_id}/dice/log/", response_model=DiceRollsOut)
+async def get_dice_log(session_id: int, after: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500)):
+    rolls = await sync_to_async(list)(
+        DiceRoll.objects.filter(room_id=session_id, seq__gt=after).order_by('seq')[:limit]
+    )
+    return DiceRollsOut(rolls=[DiceRollOut.model_validate(roll) for roll in rolls])
+
+async def get_live_room(session_id):
+    room = await room_state_store.get(session_id)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    return room
+
+async def get_live_deck(session_id, deck_key):
+    room = await get_live_room(session_id)
+    decks = await room_state_store.get_decks(room)
+    if deck_key not in decks:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deck {deck_key} not found in session {session_id}"
+        )
+    return room, decks[deck_key]
+
+def with_cards(room, deck, indices):
+    cards = room.cards[deck.key]
+    return [{"index": i, "card": cards[i]} for i in indices]
+
+@router.get("/session/{session_id}/decks/", response_model=DecksOut)
+async def get_decks(session_id: int):
+    room = await room_state_store.get(session_id)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    decks = await room_state_store.get_decks(room)
+    return {"decks": [deck.summary() for deck in decks.values()]}
+
+@router.post("/session/{session_id}/decks/{deck_key}/shuffle/", response_model=DeckSummaryOut)
+async def shuffle_deck(session_id: int, deck_key: str, data: DeckShuffleIn):
+    room, deck = await get_live_deck(session_id, deck_key)
+    deck.shuffle(include_discard=data.include_discard)
+    await room_state_store.mark_deck_dirty(room, deck_key, 'shuffle', {"include_discard": data.include_discard})
+    return deck.summary()
+
+@router.post("/session/{session_id}/decks/{deck_key}/draw/", response_model=DeckDrawOut)
+async def draw_cards(session_id: int, deck_key: str, data: DeckDrawIn):
+    room, deck = await get_live_deck(session_id, deck_key)
+    try:
+        drawn = deck.draw(data.count, data.player)
+    except DeckError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await room_state_store.mark_deck_dirty(room, deck_key, 'draw', {"cards": drawn}, data.player)
+    return {"cards": with_cards(room, deck, drawn), **deck.summary()}
+
+@router.get("/session/{session_id}/decks/{deck_key}/peek/", response_model=CardsOut)
+async def peek_cards(session_id: int, deck_key: str, count: int = 1):
+    room, deck = await get_live_deck(session_id, deck_key)
+    return {"cards": with_cards(room, deck, deck.peek(count))}
+
+@router.post("/session/{session_id}/decks/{deck_key}/discard/", response_model=DeckSummaryOut)
+async def discard_cards(session_id: int, deck_key: str, data: DeckDiscardIn):
+    room, deck = await get_live_deck(session_id, deck_key)
+    try:
+        deck.discard(data.cards, data.player)
+    except DeckError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await room_state_store.mark_deck_dirty(room, deck_key, 'discard', {"cards": data.cards}, data.player)
+    return deck.summary()
+
+@router.post("/session/{session_id}/decks/{deck_key}/deal/", response_model=DeckDealOut)
+async def deal_cards(session_id: int, deck_key: str, data: DeckDealIn):
+    room, deck = await get_live_deck(session_id, deck_key)
+    try:
+        dealt = deck.deal(data.players, data.count)
+    except DeckError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await room_state_store.mark_deck_dirty(room, deck_key, 'deal', {"dealt": dealt})
+    return {"dealt": {player: with_cards(room, deck, cards) for player, cards in dealt.items()}, **deck.summary()}
+
+@router.get("/session/{session_id}/decks/{deck_key}/hand/{player}/", response_model=CardsOut)
+async def get_hand(session_id: int, deck_key: str, player: str):
+    room, deck = await get_live_deck(session_id, deck_key)
+    return {"cards": with_cards(room, deck, deck.hands.get(player, []))}
+
+@router.get("/session/{session_id}/events/", response_model=RoomEventsOut)
+async def get_events(session_id: int, request: Request, since: Optional[int] = None):
+    room = await room_state_store.get(session_id)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    # Make sure buffered events are in the log before reading it back.
+    await room_state_store.flush([session_id])
+    return negotiate(request, {"seq": room.event_seq, **await sync_to_async(catch_up)(session_id, since)})
+
+@router.get("/session/{session_id}/events/replay/", response_class=StreamingResponse)
+async def replay_events(session_id: int):
+    room = await room_state_store.get(session_id)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session with id {session_id} not found"
+        )
+    await room_state_store.flush([session_id])
+    return StreamingResponse(iter_replay(session_id), media_type="application/x-ndjson")
+
+def presence_out(room):
+    return {
+        "session_id": room.room_pk,
+        "room_id": room.room_id,
+        "online": presence_registry.occupancy(room.room_pk),
+        "max_users": room.max_users,
+        "heartbeat_ttl": presence_registry.ttl,
+        "members": [{"user_id": user_id, "joined_at": joined_at} for user_id, joined_at in presence_registry.members(room.room_pk)],
+    }
+
+@router.get("/session/{session_id}/presence/", response_model=PresenceOut)
+async def get_presence(session_id: int):
+    return presence_out(await get_live_room(session_id))
+
+@router.post("/session/{session_id}/presence/join/", response_model=PresenceOut)
+async def join_room(session_id: int, user_id: int = Depends(current_user_id)):
+    room = await get_live_room(session_id)
+    try:
+        joined = await presence_registry.join(room, user_id)
+    except RoomFull as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if joined:
+        await room_state_store.record(room, 'join', {}, user_id)
+    return presence_out(room)
+
+@router.post("/session/{session_id}/presence/heartbeat/", response_model=PresenceOut)
+async def heartbeat(session_id: int, user_id: int = Depends(current_user_id)):
+    room = await get_live_room(session_id)
+    if not await presence_registry.heartbeat(room, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User {user_id} is not in session {session_id}; join again"
+        )
+    return presence_out(room)
+
+@router.post("/session/{session_id}/presence/leave/", response_model=PresenceOut)
+async def leave_room(session_id: int, user_id: int = Depends(current_user_id)):
+    room = await get_live_room(session_id)
+    if await presence_registry.leave(room, user_id):
+        await room_state_store.record(room, 'leave', {"reason": "left"}, user_id)
+    return presence_out(room)
+
+@router.websocket("/session/{session_id}/ws/")
+async def room_updates(websocket: WebSocket, session_id: int, encoding: Optional[str] = None):
+    # Live table updates; send ?encoding=msgpack (or Accept) for binary frames.
+    if await room_state_store.get(session_id) is None:
+        await websocket.close(code=1008, reason=f"Session with id {session_id} not found")
+        return
+    await websocket.accept()
+    await stream_room(websocket, session_id, binary=encoding == "msgpack" or wants_msgpack(websocket))
@@ -1,31 +1,29 @@
+from typing import List
 from fastapi import APIRouter
-from django.forms.models import model_to_dict
 from core.models import Tariff, MainPageGame
+from fastapi_app.schemas.common_schemas import DetailOut
+from fastapi_app.schemas.info_schemas import TariffOut, MainPageGameOut, TrendingGameOut
+from fastapi_app.utils.popularity import trending_games
 
 router = APIRouter()
 
-@router.get("/")
+@router.get("/", response_model=DetailOut)
 def info():
     return {"detail":"Not Found"}
 
-@router.get("/tariffs/")
+@router.get("/tariffs/", response_model=List[TariffOut])
 def get_tariffs():
-    tariffs = Tariff.objects.all()
-    result = []
-    for t in tariffs:
-        d = model_to_dict(t)
-        # Add features as a list of feature names (or dicts if you want more detail)
-        d['features'] = [f.name for f in t.features.all()]
-        result.append(d)
-    return result
+    tariffs = Tariff.objects.prefetch_related('features')
+    return [
+        TariffOut(id=t.id, name=t.name, price=t.price, features=[f.name for f in t.features.all()])
+        for t in tariffs
+    ]
 
-@router.get("/main-page-games/")
+@router.get("/main-page-games/", response_model=List[MainPageGameOut])
 def get_main_page_games():
     games = MainPageGame.objects.all().order_by('order')
-    result = []
-    for g in games:
-        d = model_to_dict(g)
-        # Convert picture field to URL or None
-        d['picture'] = g.picture.url if g.picture else None
-        result.append(d)
-    return result
\ No newline at end of file
+    return [MainPageGameOut.model_validate(g) for g in games]
+
+@router.get("/trending-games/", response_model=List[TrendingGameOut])
+def get_trending_games():
+    return trending_games()
@@ -1,10 +1,42 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, HTTPException, status
+from asgiref.sync import sync_to_async
+from core.models import User
+from core.promocodes import redeem, PromocodeError, PromocodeNotFound, PromocodeExpired, PromocodeExhausted, PromocodeConflict
+from fastapi_app.routes.auth_routes import current_user_id
 from fastapi_app.schemas.auth_schemas import FeedbackEmailSchema
+from fastapi_app.schemas.common_schemas import MessageOut
+from fastapi_app.schemas.payment_schemas import PromocodeRedeemIn, RedemptionOut
 from fastapi_app.utils.mail import send_feedback_email
 
 router = APIRouter()
 
-@router.post("/send-feedback/", status_code=status.HTTP_200_OK)
+@router.post("/send-feedback/", status_code=status.HTTP_200_OK, response_model=MessageOut)
 async def send_feedback(feedback: FeedbackEmailSchema):
     await send_feedback_email(feedback)
-    return {"message": "Feedback sent successfully"}
\ No newline at end of file
+    return {"message": "Feedback sent successfully"}
+
+PROMOCODE_ERRORS = {
+    PromocodeNotFound: status.HTTP_404_NOT_FOUND,
+    PromocodeExpired: status.HTTP_410_GONE,
+    PromocodeExhausted: status.HTTP_409_CONFLICT,
+    PromocodeConflict: status.HTTP_409_CONFLICT,
+}
+
+@router.post("/promocode/redeem/", response_model=RedemptionOut)
+async def redeem_promocode(data: PromocodeRedeemIn, user_id: int = Depends(current_user_id)):
+    try:
+        redemption, created = await sync_to_async(redeem)(data.code, user_id)
+    except PromocodeError as e:
+        raise HTTPException(status_code=PROMOCODE_ERRORS.get(type(e), status.HTTP_400_BAD_REQUEST), detail=str(e))
+    end_date = None
+    if redemption.tariff_id:
+        end_date = await sync_to_async(User.objects.filter(pk=user_id).values_list('end_date', flat=True).first)()
+    return RedemptionOut(
+        code=data.code,
+        type='subscription' if redemption.tariff_id else 'discount',
+        tariff_id=redemption.tariff_id,
+        discount_amount=redemption.discount_amount,
+        subscription_end_date=end_date,
+        redeemed_at=redemption.redeemed_at,
+        already_redeemed=not created,
+    )
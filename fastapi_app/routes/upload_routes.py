@@ -0,0 +1,105 @@
+from uuid import UUID
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import Response
+from asgiref.sync import sync_to_async
+from typing import Optional
+
+from core.models import User, UploadSession
+from fastapi_app.schemas.upload_schemas import UploadOut
+from fastapi_app.utils.jobs import enqueue
+from fastapi_app.utils.uploads import (
+    TUS_VERSION, create_upload, parse_checksum, receive_chunk, staging_path,
+    UploadError, UploadConflict, ChecksumMismatch,
+)
+
+import os
+
+router = APIRouter()
+
+# tus uses 460 for a chunk that failed its checksum.
+CHECKSUM_MISMATCH = 460
+
+async def get_upload(upload_id):
+    try:
+        return await sync_to_async(UploadSession.objects.get)(upload_id=upload_id)
+    except UploadSession.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload {upload_id} not found"
+        )
+
+def offset_headers(upload):
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.length),
+        "Tus-Resumable": TUS_VERSION,
+        "Cache-Control": "no-store",
+    }
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=UploadOut)
+async def start_upload(
+    request: Request,
+    response: Response,
+    user_id: int,
+    kind: str,
+    filename: str,
+    upload_length: int = Header(...),
+):
+    try:
+        await sync_to_async(User.objects.get)(id=user_id)
+    except User.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found"
+        )
+    try:
+        upload = await sync_to_async(create_upload)(user_id, kind, filename, upload_length)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["Location"] = str(request.url_for("upload_status", upload_id=upload.upload_id))
+    response.headers.update(offset_headers(upload))
+    return UploadOut.model_validate(upload)
+
+@router.head("/{upload_id}/")
+async def upload_offset(upload_id: UUID):
+    upload = await get_upload(upload_id)
+    return Response(status_code=status.HTTP_200_OK, headers=offset_headers(upload))
+
+@router.patch("/{upload_id}/", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+async def upload_chunk(
+    upload_id: UUID,
+    request: Request,
+    upload_offset: int = Header(...),
+    upload_checksum: Optional[str] = Header(None),
+):
+    if request.headers.get("content-type", "").split(";")[0].strip() != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Chunks must be sent as application/offset+octet-stream"
+        )
+    upload = await get_upload(upload_id)
+    try:
+        checksum = parse_checksum(upload_checksum)
+        await receive_chunk(upload, upload_offset, request.stream(), checksum)
+    except UploadConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e), headers=offset_headers(upload))
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=CHECKSUM_MISMATCH, detail=str(e), headers=offset_headers(upload))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if upload.status == 'processing':
+        # Process this asset right away instead of waiting for the game save.
+        await sync_to_async(enqueue)([('process_upload', {"upload_pk": upload.pk})])
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=offset_headers(upload))
+
+@router.get("/{upload_id}/", name="upload_status", response_model=UploadOut)
+async def upload_status(upload_id: UUID):
+    return UploadOut.model_validate(await get_upload(upload_id))
+
+@router.delete("/{upload_id}/", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+async def cancel_upload(upload_id: UUID):
+    upload = await get_upload(upload_id)
+    if upload.status == 'uploading' and os.path.exists(staging_path(upload)):
+        os.unlink(staging_path(upload))
+    await sync_to_async(upload.delete)()
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Tus-Resumable": TUS_VERSION})
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from typing import Any, List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from fastapi_app.schemas.common_schemas import ORMModel, FileUrl, Timestamp
 
 class AuthLogin(BaseModel):
     email: str
@@ -28,4 +30,30 @@ class FeedbackEmailSchema(BaseModel):
 class UpdateProfileSchema(BaseModel):
     username: str
     phone: str
-    email: EmailStr
\ No newline at end of file
+    email: EmailStr
+
+class TokenOut(BaseModel):
+    access_token: str
+    token_type: str
+
+class SignupOut(BaseModel):
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class UserOut(ORMModel):
+    id: int
+    username: str = Field(validation_alias='name')
+    email: str
+    phone: Optional[str] = None
+    profile_picture: FileUrl = None
+    subscription: Optional[int] = Field(None, validation_alias='subscription_id')
+    end_date: Optional[Timestamp] = None
+    free_trial: bool
+    linked_game_ids: List[int] = []
+    sessions: Any = None
+    active: bool
+    role: str
+    is_staff: bool
+    is_active: bool
+    is_verified: bool
+    date_joined: Timestamp
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Annotated, Optional
+
+from django.db.models.fields.files import FieldFile
+from pydantic import BaseModel, BeforeValidator, ConfigDict, PlainSerializer
+
+
+def file_url(value):
+    """``FileField``/``ImageField`` value -> its URL, or None when empty."""
+    if isinstance(value, FieldFile):
+        return value.url if value else None
+    return value or None
+
+
+# Stored paths and uploaded files both come out as a URL string (or null).
+FileUrl = Annotated[Optional[str], BeforeValidator(file_url)]
+
+# Same ISO 8601 form the API has always returned ("+00:00", not "Z").
+Timestamp = Annotated[datetime, PlainSerializer(lambda value: value.isoformat(), return_type=str, when_used='json')]
+
+
+class ORMModel(BaseModel):
+    """Response models read straight from Django model instances."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DetailOut(BaseModel):
+    detail: str
+
+
+class MessageOut(BaseModel):
+    message: str
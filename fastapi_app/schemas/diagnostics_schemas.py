@@ -0,0 +1,56 @@
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class TracingIn(BaseModel):
+    enabled: bool
+    frames: int = Field(1, ge=1, le=64)
+
+
+class TracingOut(BaseModel):
+    pid: int
+    tracing: bool
+    frames: int
+    traced_bytes: int
+    traced_peak_bytes: int
+    baseline_taken_at: Optional[float] = None
+
+
+class AllocationOut(BaseModel):
+    location: str
+    traceback: List[str]
+    size_bytes: int
+    count: int
+    size_diff_bytes: Optional[int] = None
+    count_diff: Optional[int] = None
+
+
+class ObjectCountOut(BaseModel):
+    type: str
+    count: int
+
+
+class StoreSizeOut(BaseModel):
+    entries: Optional[int] = None
+    bytes: Optional[int] = None
+    complete: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class MemoryOut(BaseModel):
+    pid: int
+    rss_mb: Optional[float]
+    private_mb: Optional[float]
+    tracing: TracingOut
+    allocations: List[AllocationOut]
+    objects: List[ObjectCountOut]
+    stores: Dict[str, StoreSizeOut]
+
+
+class SnapshotDiffOut(BaseModel):
+    pid: int
+    baseline_taken_at: float
+    allocations: List[AllocationOut]
+
+
+GroupBy = Literal['lineno', 'filename', 'traceback']
@@ -1,13 +1,107 @@
-from typing import Dict
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+from fastapi_app.schemas.common_schemas import ORMModel, FileUrl, Timestamp
 
-class GameOut(BaseModel):
+class GameOut(ORMModel):
     id: int
     name: str
-    description: str
+    description: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+class GameListItemOut(GameOut):
+    date_created: Timestamp
+    cover_image: FileUrl = Field(None, validation_alias='picture')
+
+class GameDetailOut(ORMModel):
+    game_id: int = Field(validation_alias='id')
+    user_id: Optional[int] = None
+    title: str = Field(validation_alias='name')
+    description: Optional[str] = None
+    max_users: Optional[int] = None
+    cover_image: FileUrl = Field(None, validation_alias='picture')
+    field_image: FileUrl = Field(None, validation_alias='map')
+    chips: Any = None
+    cube: Any = None
+    decks: Any = None
+    objects_json: Any = None
+    rules_file: FileUrl = Field(None, validation_alias='rules')
+
+class GameSavedOut(BaseModel):
+    game_id: int
+    detail: str
+
+class GameUpdatedOut(GameSavedOut):
+    job_id: Optional[str] = None
+
+class JobStatusOut(BaseModel):
+    job_id: str
+    status: str
+    progress: float
+    total: int
+    queued: int
+    running: int
+    done: int
+    failed: int
+
+class DashboardRoomOut(BaseModel):
+    session_id: int
+    room_id: str
+    last_activity: Timestamp
+    online: int = 0
+
+class DashboardGameOut(GameListItemOut):
+    room_count: int
+    active_room_count: int
+    sessions_count: int
+    last_played: Optional[Timestamp] = None
+    active_rooms: List[DashboardRoomOut] = []
+
+class DashboardOut(BaseModel):
+    user_id: int
+    games: List[DashboardGameOut]
+
+class SearchResultOut(BaseModel):
+    type: str
+    id: int
+    name: str
+    description: Optional[str] = None
+    author: Optional[str] = None
+    picture: FileUrl = None
+    rank: float
+
+class SearchOut(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[SearchResultOut]
+
+class GameClonedOut(GameSavedOut):
+    forked_from: int
+
+class AssetReplacedOut(BaseModel):
+    game_id: int
+    asset: str
+    replaced: int
+
+class SessionOut(ORMModel):
+    room_id: int = Field(validation_alias='id')
+    name: str
+    description: Optional[str] = None
+    max_users: Optional[int] = None
+    picture: FileUrl = None
+    map: FileUrl = None
+    chips: Any = None
+    cube: Any = None
+    decks: Any = None
+    objects_json: Any = None
+    rules: Optional[str] = None
+    user_id: Optional[int] = None
+    date_created: Timestamp
+    online: int = 0
+
+class SessionCreatedOut(BaseModel):
+    room_id: str
+    detail: str
 
 class ChipCoordsIn(BaseModel):
     idx: int
@@ -16,3 +110,90 @@ class ChipCoordsIn(BaseModel):
 
 class ChipCoordsOut(BaseModel):
     coords: Dict[int, Dict[str, float]]
+
+class ChipCoordsSetOut(BaseModel):
+    ok: bool
+    coords: Dict[str, Dict[str, Any]]
+
+class DiceRollIn(BaseModel):
+    user_id: Optional[int] = None
+    expression: Optional[str] = None
+    expressions: List[str] = []
+
+class DiceRollOut(ORMModel):
+    seq: int
+    user_id: Optional[int] = None
+    expression: str
+    total: int
+    result: List[Dict[str, Any]]
+    date_created: Timestamp
+
+class DiceRollsOut(BaseModel):
+    rolls: List[DiceRollOut]
+
+class DeckShuffleIn(BaseModel):
+    include_discard: bool = False
+
+class DeckDrawIn(BaseModel):
+    count: int = 1
+    player: Optional[str] = None
+
+class DeckDiscardIn(BaseModel):
+    cards: List[int]
+    player: Optional[str] = None
+
+class DeckDealIn(BaseModel):
+    players: List[str]
+    count: int = 1
+
+class CardOut(BaseModel):
+    index: int
+    card: Any = None
+
+class CardsOut(BaseModel):
+    cards: List[CardOut]
+
+class DeckSummaryOut(BaseModel):
+    deck: str
+    size: int
+    remaining: int
+    discarded: int
+    discard_top: Optional[int] = None
+    hands: Dict[str, int]
+
+class DecksOut(BaseModel):
+    decks: List[DeckSummaryOut]
+
+class DeckDrawOut(DeckSummaryOut):
+    cards: List[CardOut]
+
+class DeckDealOut(DeckSummaryOut):
+    dealt: Dict[str, List[CardOut]]
+
+class PresenceMemberOut(BaseModel):
+    user_id: int
+    joined_at: Timestamp
+
+class PresenceOut(BaseModel):
+    session_id: int
+    room_id: str
+    online: int
+    max_users: Optional[int] = None
+    heartbeat_ttl: float
+    members: List[PresenceMemberOut]
+
+class RoomEventOut(BaseModel):
+    seq: int
+    kind: str
+    user_id: Optional[str] = None
+    payload: Any = None
+    date_created: Timestamp
+
+class RoomSnapshotOut(BaseModel):
+    seq: int
+    state: Dict[str, Any]
+
+class RoomEventsOut(BaseModel):
+    seq: int
+    snapshot: Optional[RoomSnapshotOut] = None
+    events: List[RoomEventOut]
@@ -0,0 +1,18 @@
+from typing import Any, Dict
+from pydantic import BaseModel
+
+class HealthOut(BaseModel):
+    status: str
+    db: str
+    hostname: str
+    os: str
+    os_version: str
+    memory_total_mb: float
+    memory_used_mb: float
+    memory_percent: float
+    cpu_percent: float
+
+class MetricsOut(BaseModel):
+    counters: Dict[str, int]
+    histograms: Dict[str, Dict[str, Any]]
+    gauges: Dict[str, Any]
@@ -1,5 +1,31 @@
+from typing import List, Optional
 from pydantic import BaseModel
+from fastapi_app.schemas.common_schemas import ORMModel, FileUrl
 
-class InfoOut(BaseModel):
+class InfoOut(ORMModel):
     name: str
     description: str
+
+class TariffOut(ORMModel):
+    id: int
+    name: str
+    price: int
+    features: List[str] = []
+
+class MainPageGameOut(ORMModel):
+    id: int
+    order: int
+    name: str
+    author: str
+    author_link: Optional[str] = None
+    description: str
+    picture: FileUrl = None
+
+class TrendingGameOut(BaseModel):
+    rank: int
+    game_id: int
+    name: str
+    description: Optional[str] = None
+    picture: FileUrl = None
+    score: float
+    sessions_count: int
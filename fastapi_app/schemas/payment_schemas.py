@@ -1,2 +1,16 @@
 from pydantic import BaseModel, EmailStr
+from decimal import Decimal
+from typing import Optional
+from fastapi_app.schemas.common_schemas import Timestamp
 
+class PromocodeRedeemIn(BaseModel):
+    code: str
+
+class RedemptionOut(BaseModel):
+    code: str
+    type: str
+    tariff_id: Optional[int] = None
+    discount_amount: Optional[Decimal] = None
+    subscription_end_date: Optional[Timestamp] = None
+    redeemed_at: Timestamp
+    already_redeemed: bool
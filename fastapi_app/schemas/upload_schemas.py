@@ -0,0 +1,14 @@
+from typing import Optional
+from uuid import UUID
+from fastapi_app.schemas.common_schemas import ORMModel, Timestamp
+
+class UploadOut(ORMModel):
+    upload_id: UUID
+    kind: str
+    filename: str
+    length: int
+    offset: int
+    status: str
+    asset: Optional[str] = None
+    error: Optional[str] = None
+    date_created: Timestamp
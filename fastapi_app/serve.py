@@ -0,0 +1,190 @@
+"""Production entrypoint for the API: one preloaded master, forked workers.
+
+    python -m fastapi_app.serve --host 0.0.0.0 --port 8001
+
+The master imports the app (Django, every router and the admin) once, freezes
+the garbage collector so those objects stay on copy-on-write pages shared by
+all workers, binds the listening socket and forks the workers, which accept
+on it directly, one per available CPU unless SERVER_WORKERS says otherwise.
+A worker is replaced after SERVER_MAX_REQUESTS requests (with jitter, so
+they don't all restart together) or once its private memory passes
+SERVER_MAX_MEMORY_MB. SIGTERM or SIGINT stops accepting and lets
+in-flight requests finish for up to SERVER_GRACEFUL_TIMEOUT seconds.
+SIGUSR1 switches tracemalloc on or off in every worker (see /diagnostics).
+
+Room seats and upload locks are held in the database, so every worker sees
+them. Live room state and WebSocket subscribers are still kept per worker;
+see "Multiple workers" in the README.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from importlib import import_module
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi_app.utils.startup import startup_profile
+
+
+def default_workers():
+    try:
+        cpus = len(os.sched_getaffinity(0))  # honours container CPU pinning
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus)
+
+
+class SignalFlag:
+    """Signal handler that only records the signal; the master loop acts on it."""
+
+    def __init__(self):
+        self.requested = False
+
+    def __call__(self, *args):
+        self.requested = True
+
+
+def private_memory_mb():
+    """Memory this process does not share with the master (or None if unknown).
+
+    RSS would count the preloaded pages every worker shares, so a worker is
+    judged on what it alone costs: its private clean and dirty pages.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            kb = sum(int(line.split()[1]) for line in f if line.startswith(("Private_Clean:", "Private_Dirty:")))
+        return kb / 1024
+    except OSError:
+        return None
+
+
+def memory_limit(server, limit_mb):
+    """uvicorn ``callback_notify``: drain and exit the worker once it exceeds ``limit_mb``."""
+    async def check():
+        used = private_memory_mb()
+        if used is not None and used > limit_mb and not server.should_exit:
+            print(f"Worker {os.getpid()} uses {used:.0f}MB private memory (limit {limit_mb}MB), recycling")
+            server.should_exit = True
+    return check
+
+
+def bind(host, port, backlog):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_worker(sock, app, options):
+    """Worker process: serve ``app`` on the shared socket until recycled or stopped."""
+    import uvicorn
+    from django.conf import settings
+
+    from fastapi_app.utils.diagnostics import toggle_tracing
+
+    signal.signal(signal.SIGUSR1, toggle_tracing)
+    gc.enable()
+    startup_profile.restart()
+    max_requests = settings.SERVER_MAX_REQUESTS
+    if max_requests:
+        max_requests += random.randint(0, settings.SERVER_MAX_REQUESTS_JITTER)
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_TIMEOUT,
+        access_log=options.access_log,
+        timeout_notify=settings.SERVER_MEMORY_CHECK_INTERVAL,
+    )
+    server = uvicorn.Server(config)
+    if settings.SERVER_MAX_MEMORY_MB:
+        config.callback_notify = memory_limit(server, settings.SERVER_MAX_MEMORY_MB)
+    server.run(sockets=[sock])
+
+
+def preload(module):
+    """Import the app and everything workers would otherwise import lazily."""
+    app = import_module(module).app
+    import_module("gameorbit.asgi")  # the admin, mounted lazily in main.py
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with preloaded, forked workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes; defaults to SERVER_WORKERS, or one per CPU.")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--module", default="fastapi_app.main", help="Module holding the ASGI `app`.")
+    parser.add_argument("--access-log", action="store_true")
+    options = parser.parse_args(argv)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gameorbit.settings")
+    from django.conf import settings
+
+    workers_count = options.workers or settings.SERVER_WORKERS or default_workers()
+
+    # No collections while preloading: they would touch (and later unshare)
+    # every object. Whatever is alive at fork time is frozen into the
+    # permanent generation, which workers' collections never scan or write.
+    gc.disable()
+    app = preload(options.module)
+    from django.db import connections
+
+    sock = bind(options.host, options.port, options.backlog)
+    # Workers must not inherit the master's database connections.
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+    stop = SignalFlag()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    toggle_tracing = SignalFlag()
+    signal.signal(signal.SIGUSR1, toggle_tracing)
+    context = multiprocessing.get_context("fork")
+    workers = {}
+    print(f"Serving {options.module} on {options.host}:{options.port} with {workers_count} workers "
+          f"(preloaded in {startup_profile.mark_ready():.2f}s)")
+    while not stop.requested:
+        for slot in range(workers_count):
+            process = workers.get(slot)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    reason = "recycled" if process.exitcode == 0 else f"exited with {process.exitcode}"
+                    print(f"Worker {process.pid} {reason}, starting a new one")
+                workers[slot] = context.Process(target=serve_worker, args=(sock, app, options), daemon=True)
+                workers[slot].start()
+        if toggle_tracing.requested:
+            toggle_tracing.requested = False
+            for process in workers.values():
+                os.kill(process.pid, signal.SIGUSR1)
+        time.sleep(0.5)
+
+    print("Stopping workers after their in-flight requests")
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT + 5
+    for process in workers.values():
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            print(f"Worker {process.pid} did not drain in time, killing it")
+            process.kill()
+            process.join()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import asyncio
+import io
+import json
+import os
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.test import TransactionTestCase
+from fastapi.testclient import TestClient
+
+from PIL import Image
+
+from core.models import Game, Job, User
+from fastapi_app.main import app
+
+
+class UploadReferenceTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='x', name='Owner')
+        self.game = Game.objects.create(user=self.user, name='Game')
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        # Views query from sync_to_async's own thread; its connection would
+        # keep the test database from being dropped.
+        asyncio.run(sync_to_async(connections.close_all)())
+
+    def update_game(self, **metadata):
+        data = {"user_id": str(self.user.pk), "title": "Game", "game_id": str(self.game.pk)}
+        data.update({key: json.dumps(value) for key, value in metadata.items()})
+        return self.client.post("/game/create-game/", data=data)
+
+    def test_upload_entry_without_id_is_rejected(self):
+        for metadata in (
+            {"chips_metadata": [{"type": "upload"}]},
+            {"decks_metadata": {"main": {"backImage": {"type": "upload", "upload_id": ""}, "cards": []}}},
+            {"game_objects_metadata": {"token": {"image": {"type": "upload", "upload_id": None}}}},
+        ):
+            with self.subTest(metadata=metadata):
+                response = self.update_game(**metadata)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["detail"], "Upload entry is missing its upload_id")
+
+    def test_cover_and_field_images_get_their_own_files(self):
+        image = io.BytesIO()
+        Image.new("RGB", (4, 4)).save(image, "PNG")
+        files = [
+            ("cover_image", ("cover.png", image.getvalue(), "image/png")),
+            ("field_image", ("field.png", image.getvalue(), "image/png")),
+        ]
+        data = {"user_id": str(self.user.pk), "title": "Game", "game_id": str(self.game.pk)}
+        response = self.client.post("/game/create-game/", data=data, files=files)
+        self.assertEqual(response.status_code, 200)
+
+        self.game.refresh_from_db()
+        jobs = list(Job.objects.filter(kind="save_image"))
+        for job in jobs:
+            self.addCleanup(os.unlink, job.payload["source"])
+        destinations = sorted(job.payload["destination"] for job in jobs)
+        self.assertEqual(destinations, sorted([self.game.picture.name, self.game.map.name]))
+        self.assertNotEqual(self.game.picture.name, self.game.map.name)
+        for name in destinations:
+            self.assertFalse(name.endswith(".jpg.jpg"), name)
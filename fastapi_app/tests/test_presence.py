@@ -0,0 +1,63 @@
+import threading
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from core.models import Room, RoomMember, User
+from fastapi_app.utils.presence import RoomFull, claim_seat, release_seats
+
+
+class SeatTests(TransactionTestCase):
+    def setUp(self):
+        self.room = Room.objects.create(room_id='seats', name='Seats', max_users=3)
+        self.users = [
+            User.objects.create_user(email=f'player{n}@example.com', password='x', name=f'Player {n}')
+            for n in range(10)
+        ]
+
+    def test_concurrent_joins_never_exceed_max_users(self):
+        barrier = threading.Barrier(len(self.users))
+        outcomes = []
+
+        def attempt(user_id):
+            try:
+                barrier.wait()
+                claim_seat(self.room.pk, user_id, ttl=30)
+                outcomes.append('seated')
+            except RoomFull:
+                outcomes.append('full')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user.pk,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('seated'), 3)
+        self.assertEqual(RoomMember.objects.filter(room=self.room).count(), 3)
+        self.assertEqual(User.objects.filter(sessions__contains=['seats']).count(), 3)
+
+    def test_lapsed_seat_goes_to_the_next_join(self):
+        first, second, third, fourth = (user.pk for user in self.users[:4])
+        for user_id in (first, second, third):
+            claim_seat(self.room.pk, user_id, ttl=30)
+        with self.assertRaises(RoomFull):
+            claim_seat(self.room.pk, fourth, ttl=30)
+        self.assertEqual(claim_seat(self.room.pk, first, ttl=30)[1], False)
+
+        RoomMember.objects.filter(user_id=first).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_seat(self.room.pk, fourth, ttl=30)[1], True)
+        self.assertFalse(User.objects.get(pk=first).sessions)
+
+    def test_release_only_frees_lapsed_seats(self):
+        first, second = (user.pk for user in self.users[:2])
+        claim_seat(self.room.pk, first, ttl=30)
+        claim_seat(self.room.pk, second, ttl=30)
+        RoomMember.objects.filter(user_id=first).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        released, seated = release_seats(self.room.pk, 'seats', [first, second], lapsed_by=timezone.now())
+        self.assertEqual((released, seated), ([first], {second}))
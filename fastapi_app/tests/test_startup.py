@@ -0,0 +1,27 @@
+import json
+import subprocess
+import sys
+from unittest import TestCase
+
+# Imported on first use, not at startup (see fastapi_app.utils.startup).
+LAZY_MODULES = (
+    'gameorbit.asgi',            # the admin, mounted through LazyApp
+    'django.core.handlers.asgi',
+    'PIL',
+    'psutil',
+    'msgpack',
+    'zstandard',
+    'brotli',
+)
+
+
+class StartupImportTests(TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        # A fresh interpreter: this test process may have imported them already.
+        script = (
+            "import json, sys, fastapi_app.main; "
+            f"print(json.dumps([name for name in {list(LAZY_MODULES)!r} if name in sys.modules]))"
+        )
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [])
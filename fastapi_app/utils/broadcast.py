@@ -0,0 +1,217 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+
+from django.conf import settings
+
+from fastapi_app.utils.diagnostics import register_store
+from fastapi_app.utils.encoding import packb
+from fastapi_app.utils.metrics import metrics
+from fastapi_app.utils.presence import presence_registry
+from fastapi_app.utils.room_state import room_state_store
+
+# WebSocket close code for a client dropped for falling behind ("try again later").
+CLOSE_TOO_SLOW = 1013
+
+
+class Subscriber:
+    """One connected client: a bounded queue of updates not yet sent to it.
+
+    A chip move replaces the queued move of the same chip (only the latest
+    position matters), so a client that is briefly slow receives fewer
+    messages instead of more. When the queue is full it is cleared and the
+    client gets one ``resync`` message with the current state instead; a
+    client that overflows again after ``max_resyncs`` resyncs within
+    ``resync_window`` seconds is dropped.
+    """
+
+    __slots__ = ('room_pk', 'max_queue', 'max_resyncs', 'resync_window', 'resync', 'closed',
+                 '_queue', '_ready', '_overflows')
+
+    def __init__(self, room_pk, max_queue, max_resyncs, resync_window):
+        self.room_pk = room_pk
+        self.max_queue = max_queue
+        self.max_resyncs = max_resyncs
+        self.resync_window = resync_window
+        # Start with the full state, then follow the updates.
+        self.resync = True
+        self.closed = False
+        self._queue = OrderedDict()
+        self._ready = asyncio.Event()
+        self._ready.set()
+        self._overflows = deque(maxlen=max_resyncs)
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, key, message):
+        """Queue ``message``; returns what happened to it, for the metrics."""
+        if self.closed or self.resync:
+            return 'skipped'  # the coming resync includes it
+        if key in self._queue:
+            self._queue[key] = message
+            self._queue.move_to_end(key)  # keeps delivery in seq order
+            return 'coalesced'
+        if len(self._queue) >= self.max_queue:
+            self._queue.clear()
+            now = time.monotonic()
+            # With max_resyncs=0 the first overflow drops the client.
+            if len(self._overflows) == self.max_resyncs and (
+                not self._overflows or now - self._overflows[0] < self.resync_window
+            ):
+                self.closed = True
+                outcome = 'dropped'
+            else:
+                self.resync = True
+                outcome = 'overflowed'
+            self._overflows.append(now)
+            self._ready.set()
+            return outcome
+        self._queue[key] = message
+        self._ready.set()
+        return 'queued'
+
+    async def next_batch(self):
+        """Wait for updates; returns them in order, or None when a resync is due."""
+        await self._ready.wait()
+        self._ready.clear()
+        if self.resync:
+            self.resync = False
+            self._queue.clear()
+            return None
+        batch = list(self._queue.values())
+        self._queue.clear()
+        return batch
+
+
+class Broadcaster:
+    """Fans room events out to the WebSocket subscribers of each room.
+
+    ``publish`` is a ``RoomStateStore`` listener: it only appends to each
+    subscriber's queue and never waits on a socket, so a slow client costs
+    the table nothing but its own bounded queue.
+    """
+
+    def __init__(self, queue_size, max_resyncs, resync_window):
+        self.queue_size = queue_size
+        self.max_resyncs = max_resyncs
+        self.resync_window = resync_window
+        self._rooms = {}
+
+    def subscribe(self, room_pk):
+        subscriber = Subscriber(room_pk, self.queue_size, self.max_resyncs, self.resync_window)
+        self._rooms.setdefault(room_pk, set()).add(subscriber)
+        metrics.incr("broadcast.subscribed")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscribers = self._rooms.get(subscriber.room_pk)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._rooms[subscriber.room_pk]
+
+    def subscriber_count(self):
+        return sum(len(subscribers) for subscribers in self._rooms.values())
+
+    def queued(self):
+        return [len(subscriber) for subscribers in self._rooms.values() for subscriber in subscribers]
+
+    def publish(self, room, seq, kind, payload, user_id):
+        subscribers = self._rooms.get(room.room_pk)
+        if not subscribers:
+            return
+        started = time.perf_counter()
+        message = {
+            "type": "event",
+            "seq": seq,
+            "kind": kind,
+            "user_id": None if user_id is None else str(user_id),
+            "payload": payload or {},
+        }
+        key = ('move', payload.get('idx')) if kind == 'move' else ('seq', seq)
+        outcomes = Counter(subscriber.put(key, message) for subscriber in list(subscribers))
+        metrics.observe("broadcast.fanout_seconds", time.perf_counter() - started)
+        metrics.incr("broadcast.published")
+        for outcome, count in outcomes.items():
+            metrics.incr(f"broadcast.{outcome}", count)
+
+
+broadcaster = Broadcaster(
+    queue_size=settings.BROADCAST_QUEUE_SIZE,
+    max_resyncs=settings.BROADCAST_MAX_RESYNCS,
+    resync_window=settings.BROADCAST_RESYNC_WINDOW,
+)
+room_state_store.add_listener(broadcaster.publish)
+
+metrics.gauge("broadcast.subscribers", broadcaster.subscriber_count)
+metrics.gauge("broadcast.queue_depth", lambda: sum(broadcaster.queued()))
+metrics.gauge("broadcast.queue_depth_max", lambda: max(broadcaster.queued(), default=0))
+register_store("broadcast.rooms", lambda: broadcaster._rooms)
+
+
+async def resync_message(room_pk):
+    """The room's public state (chips and decks) as of its latest ``seq``."""
+    room = await room_state_store.get(room_pk)
+    if room is None:
+        return None
+    return {
+        "type": "resync",
+        **await room_state_store.public_state(room),
+        "online": presence_registry.occupancy(room_pk),
+    }
+
+
+async def _send_updates(websocket, subscriber, binary):
+    send = (lambda message: websocket.send_bytes(packb(message))) if binary else websocket.send_json
+    while True:
+        batch = await subscriber.next_batch()
+        if subscriber.closed:
+            await websocket.close(code=CLOSE_TOO_SLOW, reason="Too far behind")
+            return
+        if batch is None:
+            message = await resync_message(subscriber.room_pk)
+            if message is None:
+                await websocket.close(code=1008, reason="Session closed")
+                return
+            metrics.incr("broadcast.resyncs")
+            batch = [message]
+        metrics.observe("broadcast.batch_size", len(batch))
+        for message in batch:
+            try:
+                await asyncio.wait_for(send(message), settings.BROADCAST_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                metrics.incr("broadcast.dropped")
+                await websocket.close(code=CLOSE_TOO_SLOW, reason="Too far behind")
+                return
+
+
+async def _receive_until_closed(websocket):
+    # Clients only send keepalives; anything they send is ignored.
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+async def stream_room(websocket, room_pk, binary=False):
+    """Push ``room_pk``'s updates to an accepted ``websocket`` until either side closes.
+
+    The client first gets a ``resync`` with the current state, then ``event``
+    messages in ``seq`` order, and a new ``resync`` whenever it fell behind;
+    chip and deck changes up to the resync's ``seq`` are already reflected in
+    it. Events that leave no state behind (rolls, joins and leaves) are not:
+    a client that wants them fetches ``/game/session/<id>/events/?since=<the
+    last seq it received>``.
+    """
+    subscriber = broadcaster.subscribe(room_pk)
+    sender = asyncio.ensure_future(_send_updates(websocket, subscriber, binary))
+    sender.add_done_callback(_count_send_error)
+    try:
+        await _receive_until_closed(websocket)
+    finally:
+        sender.cancel()
+        broadcaster.unsubscribe(subscriber)
+
+
+def _count_send_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        metrics.incr("broadcast.send_errors")
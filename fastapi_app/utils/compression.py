@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from importlib.util import find_spec
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from fastapi_app.utils.diagnostics import register_store
+from fastapi_app.utils.metrics import metrics
+
+# brotli is optional (gzip is always available) and imported on first use.
+HAVE_BROTLI = find_spec("brotli") is not None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (encoding, sha1 of the plain body).
+
+    Hashing a body is an order of magnitude cheaper than compressing it, so a
+    repeat ``get_game`` or ``/info/*`` response only pays for the hash.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        with self._lock:
+            return sum(len(body) for body in self._entries.values())
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class CompressionMiddleware:
+    """gzip/brotli response compression with a size threshold and type filter.
+
+    Only complete (non-streaming) bodies of compressible types above
+    ``minimum_size`` are touched; responses that already carry a
+    ``Content-Encoding`` (e.g. zstd MessagePack) pass through. Bodies of
+    successful responses under ``cacheable_paths`` are kept compressed in a
+    ``CompressedBodyCache``. Each compression records its ratio and CPU time.
+    """
+
+    def __init__(self, app, minimum_size=1024, cacheable_paths=(), cache_entries=256,
+                 gzip_level=6, brotli_quality=5, thread_threshold=256 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cacheable_paths = tuple(cacheable_paths)
+        self.cache = CompressedBodyCache(cache_entries)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_threshold = thread_threshold
+        metrics.gauge("compression.cache_entries", lambda: len(self.cache))
+        metrics.gauge("compression.cache_bytes", lambda: self.cache.size_bytes)
+        register_store("compression.cache", lambda: self.cache._entries)
+
+    def choose_encoding(self, scope):
+        accepted = Headers(scope=scope).get("accept-encoding", "").lower()
+        codings = {part.split(";")[0].strip() for part in accepted.split(",") if "q=0" not in part.replace(" ", "")}
+        if HAVE_BROTLI and "br" in codings:
+            return "br"
+        if "gzip" in codings:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        encoding = self.choose_encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if start_message is not None and not self.should_compress(start_message, message):
+                passthrough = True
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+            await self.send_compressed(scope, start_message, message["body"], encoding, send)
+            start_message = None
+
+        await self.app(scope, receive, send_wrapper)
+
+    def should_compress(self, start_message, message):
+        if message.get("more_body", False):
+            return False
+        headers = Headers(raw=start_message["headers"])
+        if "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        return len(message.get("body", b"")) >= self.minimum_size
+
+    def compress(self, body, encoding):
+        if encoding == "br":
+            import brotli
+
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def timed_compress(self, body, encoding):
+        started = time.thread_time()
+        compressed = self.compress(body, encoding)
+        return compressed, time.thread_time() - started
+
+    async def send_compressed(self, scope, start_message, body, encoding, send):
+        cacheable = start_message["status"] == 200 and scope["path"].startswith(self.cacheable_paths)
+        key = (encoding, hashlib.sha1(body).digest()) if cacheable else None
+        compressed = self.cache.get(key) if key else None
+        if compressed is not None:
+            metrics.incr("compression.cache_hits")
+        else:
+            if len(body) >= self.thread_threshold:
+                compressed, cpu_seconds = await run_in_threadpool(self.timed_compress, body, encoding)
+            else:
+                compressed, cpu_seconds = self.timed_compress(body, encoding)
+            metrics.observe("compression.cpu_seconds", cpu_seconds)
+            metrics.observe("compression.ratio", len(body) / max(len(compressed), 1))
+            metrics.incr(f"compression.{encoding}")
+            if key:
+                metrics.incr("compression.cache_misses")
+                self.cache.put(key, compressed)
+        metrics.incr("compression.bytes_in", len(body))
+        metrics.incr("compression.bytes_out", len(compressed))
+
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        await send(start_message)
+        await send({"type": "http.response.body", "body": compressed})
@@ -0,0 +1,175 @@
+import json
+import secrets
+import sys
+from array import array
+from collections import Counter
+
+from core.models import Room, RoomDeck
+
+
+class DeckError(ValueError):
+    """Raised for invalid deck operations (unknown deck, card not in hand...)."""
+
+
+def _pack(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode, data):
+    values = array(typecode)
+    values.frombytes(bytes(data or b''))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class DeckState:
+    """Server-side state of one deck as compact arrays of card indices.
+
+    Indices point into the room's immutable card list, so a draw moves one
+    small integer instead of rewriting the deck JSON. The top of the draw
+    pile is the end of the array: draw, peek and discard are O(1) per card.
+    """
+
+    __slots__ = ('key', 'size', 'typecode', 'draw_pile', 'discard_pile', 'hands')
+
+    def __init__(self, key, size, draw_pile=None, discard_pile=None, hands=None):
+        self.key = key
+        self.size = size
+        self.typecode = 'H' if size <= 0x10000 else 'I'
+        # Unshuffled decks deal card 0 first.
+        self.draw_pile = draw_pile if draw_pile is not None else array(self.typecode, range(size - 1, -1, -1))
+        self.discard_pile = discard_pile if discard_pile is not None else array(self.typecode)
+        self.hands = hands if hands is not None else {}
+
+    @classmethod
+    def from_row(cls, row, size):
+        typecode = 'H' if size <= 0x10000 else 'I'
+        hands = {player: array(typecode, cards) for player, cards in (row.hands or {}).items()}
+        return cls(row.deck_key, size, _unpack(typecode, row.draw_pile), _unpack(typecode, row.discard_pile), hands)
+
+    def to_row(self, room_pk):
+        return RoomDeck(
+            room_id=room_pk,
+            deck_key=self.key,
+            draw_pile=_pack(self.draw_pile),
+            discard_pile=_pack(self.discard_pile),
+            hands={player: cards.tolist() for player, cards in self.hands.items()},
+        )
+
+    def shuffle(self, include_discard=False):
+        """In-place Fisher-Yates shuffle of the draw pile using the OS CSPRNG."""
+        pile = self.draw_pile
+        if include_discard:
+            pile.extend(self.discard_pile)
+            del self.discard_pile[:]
+        for i in range(len(pile) - 1, 0, -1):
+            j = secrets.randbelow(i + 1)
+            pile[i], pile[j] = pile[j], pile[i]
+
+    def draw(self, count=1, player=None):
+        if count < 1:
+            raise DeckError("Draw count must be positive")
+        if count > len(self.draw_pile):
+            raise DeckError(f"Only {len(self.draw_pile)} cards left in deck '{self.key}'")
+        cards = self.draw_pile[-count:]
+        del self.draw_pile[-count:]
+        cards.reverse()
+        if player is not None:
+            self.hands.setdefault(str(player), array(self.typecode)).extend(cards)
+        return cards.tolist()
+
+    def peek(self, count=1):
+        return self.draw_pile[-count:][::-1].tolist() if count > 0 else []
+
+    def on_table(self):
+        """Cards drawn without a player: in no pile and in no hand."""
+        placed = set(self.draw_pile).union(self.discard_pile, *self.hands.values())
+        return set(range(self.size)) - placed
+
+    def discard(self, cards, player=None):
+        """Move ``cards`` from ``player``'s hand (or from the table) to the discard pile.
+
+        Every card is checked before anything moves, so a rejected discard
+        leaves the deck untouched.
+        """
+        wanted = Counter(cards)
+        for card in wanted:
+            if not 0 <= card < self.size:
+                raise DeckError(f"Card {card} is not part of deck '{self.key}'")
+        if player is not None:
+            hand = self.hands.get(str(player))
+            if hand is None:
+                raise DeckError(f"Player {player} holds no cards from deck '{self.key}'")
+            held = Counter(hand)
+            for card, count in wanted.items():
+                if held[card] < count:
+                    raise DeckError(f"Card {card} is not in the hand of player {player}")
+            for card in cards:
+                hand.remove(card)
+        else:
+            table = self.on_table()
+            for card, count in wanted.items():
+                if card not in table or count > 1:
+                    raise DeckError(f"Card {card} is not on the table")
+        self.discard_pile.extend(cards)
+
+    def deal(self, players, count):
+        if count * len(players) > len(self.draw_pile):
+            raise DeckError(f"Only {len(self.draw_pile)} cards left in deck '{self.key}'")
+        dealt = {str(player): [] for player in players}
+        for _ in range(count):
+            for player in players:
+                dealt[str(player)].extend(self.draw(1, player))
+        return dealt
+
+    def public_state(self):
+        return {
+            "remaining": len(self.draw_pile),
+            "discard_pile": self.discard_pile.tolist(),
+            "hands": {player: cards.tolist() for player, cards in self.hands.items()},
+        }
+
+    def summary(self):
+        return {
+            "deck": self.key,
+            "size": self.size,
+            "remaining": len(self.draw_pile),
+            "discarded": len(self.discard_pile),
+            "discard_top": self.discard_pile[-1] if self.discard_pile else None,
+            "hands": {player: len(cards) for player, cards in self.hands.items()},
+        }
+
+
+def card_lists(decks_json):
+    """Map deck key -> immutable card list from a ``Room.decks`` value.
+
+    Older rooms hold the metadata as a JSON string; decks are either
+    ``{"cards": [...], ...}`` objects or bare lists of cards.
+    """
+    if isinstance(decks_json, str):
+        decks_json = json.loads(decks_json or '{}')
+    result = {}
+    for key, deck in (decks_json or {}).items():
+        cards = deck.get('cards', []) if isinstance(deck, dict) else deck
+        result[str(key)] = cards if isinstance(cards, list) else []
+    return result
+
+
+def load_decks(room_pk):
+    """Return ``(cards_by_deck, states_by_deck)`` for a room, or None if missing."""
+    decks_json = Room.objects.filter(pk=room_pk).values_list('decks', flat=True).first()
+    if decks_json is None and not Room.objects.filter(pk=room_pk).exists():
+        return None
+    cards = card_lists(decks_json)
+    states = {}
+    for row in RoomDeck.objects.filter(room_id=room_pk):
+        if row.deck_key in cards:
+            states[row.deck_key] = DeckState.from_row(row, len(cards[row.deck_key]))
+    for key, deck_cards in cards.items():
+        if key not in states:
+            states[key] = DeckState(key, len(deck_cards))
+    return cards, states
@@ -0,0 +1,177 @@
+"""In-process memory diagnostics for a single worker.
+
+Everything here runs on demand from the admin-only ``/diagnostics`` routes
+(or ``SIGUSR1`` to the launcher, see ``fastapi_app.serve``). tracemalloc is
+off unless switched on, so a worker pays nothing for it until then.
+"""
+import gc
+import linecache
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from types import BuiltinFunctionType, FunctionType, ModuleType
+
+# Allocations made by tracemalloc itself, by formatting its tracebacks and
+# by imports are not leaks.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType)
+_MAX_SIZED_OBJECTS = 500_000
+
+_stores = {}
+_baseline = None
+
+
+def register_store(name, fn):
+    """Report the size of an in-process cache or store.
+
+    ``fn`` returns the container; it is only called when diagnostics are read.
+    """
+    _stores[name] = fn
+
+
+def deep_sizeof(obj):
+    """Approximate bytes reachable from ``obj`` (classes, modules and functions excluded).
+
+    Returns ``(bytes, complete)``; ``complete`` is False when the walk stopped
+    after ``_MAX_SIZED_OBJECTS`` objects.
+    """
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        if len(seen) >= _MAX_SIZED_OBJECTS:
+            return total, False
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        pending.extend(gc.get_referents(current))
+    return total, True
+
+
+def store_sizes():
+    sizes = {}
+    for name, fn in list(_stores.items()):
+        try:
+            store = fn()
+            size, complete = deep_sizeof(store)
+            sizes[name] = {"entries": len(store), "bytes": size, "complete": complete}
+        except Exception as e:
+            sizes[name] = {"error": str(e)}
+    return sizes
+
+
+def object_counts(top):
+    """The ``top`` most common types among objects tracked by the collector."""
+    counts = Counter(f"{type(obj).__module__}.{type(obj).__qualname__}" for obj in gc.get_objects())
+    return [{"type": name, "count": count} for name, count in counts.most_common(top)]
+
+
+def process_memory():
+    """RSS and private memory of this worker in MB (None where /proc is unavailable)."""
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        return {"rss_mb": None, "private_mb": None}
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss_mb": round(fields.get("Rss", 0) / 1024, 1), "private_mb": round(private / 1024, 1)}
+
+
+def tracing_status():
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "pid": os.getpid(),
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "baseline_taken_at": _baseline[0] if _baseline else None,
+    }
+
+
+def start_tracing(frames=1):
+    """Start tracemalloc; allocations made before this are not attributed."""
+    if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+        stop_tracing()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None  # its traces are gone with the tracer
+
+
+def toggle_tracing(*args):
+    """Signal handler: switch tracing on (one frame) or off."""
+    if tracemalloc.is_tracing():
+        stop_tracing()
+    else:
+        start_tracing()
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _stat_out(stat, size_diff=None, count_diff=None):
+    frames = stat.traceback.format(limit=tracemalloc.get_traceback_limit())
+    return {
+        "location": frames[0].strip() if frames else "<unknown>",
+        "traceback": [frame.strip() for frame in frames],
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "size_diff_bytes": size_diff,
+        "count_diff": count_diff,
+    }
+
+
+def top_allocations(top, group_by="lineno"):
+    """Largest live allocations by source line (or file / traceback) since tracing started."""
+    if not tracemalloc.is_tracing():
+        return []
+    return [_stat_out(stat) for stat in _snapshot().statistics(group_by)[:top]]
+
+
+def take_baseline():
+    """Keep a snapshot to diff later; replaces any earlier one."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not tracing")
+    _baseline = (time.time(), _snapshot())
+    return _baseline[0]
+
+
+def diff_baseline(top, group_by="lineno"):
+    """What grew (or shrank) most since ``take_baseline``."""
+    if not tracemalloc.is_tracing() or _baseline is None:
+        raise RuntimeError("No baseline snapshot; start tracing and take one first")
+    stats = _snapshot().compare_to(_baseline[1], group_by)
+    return [_stat_out(stat, stat.size_diff, stat.count_diff) for stat in stats[:top]]
+
+
+def _django_cache():
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    # Only the local-memory backend lives in the worker.
+    backend = caches["default"]
+    return backend._cache if isinstance(backend, LocMemCache) else {}
+
+
+register_store("django.cache", _django_cache)
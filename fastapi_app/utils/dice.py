@@ -0,0 +1,168 @@
+import hashlib
+import heapq
+import re
+import secrets
+import sys
+from array import array
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import DiceRoll, Room
+
+
+class DiceError(ValueError):
+    """Raised for malformed or oversized dice expressions."""
+
+
+# ``DiceRoll.total`` is a 32-bit integer column.
+MAX_TOTAL = 2 ** 31 - 1
+
+
+_WORDS = [
+    (re.compile(r'keep\s+lowest|keep\s+low'), 'kl'),
+    (re.compile(r'keep\s+highest|keep\s+high|keep'), 'kh'),
+    (re.compile(r'drop\s+highest|drop\s+high'), 'dh'),
+    (re.compile(r'drop\s+lowest|drop\s+low|drop'), 'dl'),
+]
+_TERM = re.compile(r'([+-]?)(?:(\d*)d(\d+|%)(?:(kh|kl|dh|dl|k)(\d+))?|(\d+))')
+
+
+def parse_expression(expression):
+    """Parse ``"10d6 keep highest 3 + 2"``-style text into a list of terms.
+
+    Dice terms are ``(sign, count, sides, keep_mode, keep_n)``; constant terms
+    are ``(sign, value)``. Supports ``k``/``kh``/``kl``/``dh``/``dl`` and the
+    spelled-out ``keep highest``/``keep lowest``/``drop lowest`` forms.
+    """
+    text = expression.lower()
+    for pattern, short in _WORDS:
+        text = pattern.sub(short, text)
+    text = re.sub(r'\s+', '', text)
+    if not text:
+        raise DiceError("Empty dice expression")
+    terms, pos, dice_total, bound = [], 0, 0, 0
+    while pos < len(text):
+        match = _TERM.match(text, pos)
+        if not match or match.end() == pos or (pos and not match.group(1)):
+            raise DiceError(f"Cannot parse dice expression near '{text[pos:]}'")
+        sign = -1 if match.group(1) == '-' else 1
+        if match.group(6) is not None:
+            value = int(match.group(6))
+            if value > settings.DICE_MAX_CONSTANT:
+                raise DiceError(f"Constants may be at most {settings.DICE_MAX_CONSTANT}")
+            bound += value
+            terms.append((sign, value))
+        else:
+            count = int(match.group(2) or 1)
+            sides = 100 if match.group(3) == '%' else int(match.group(3))
+            mode = {'k': 'kh'}.get(match.group(4), match.group(4))
+            keep_n = int(match.group(5)) if match.group(5) else None
+            if count < 1 or sides < 2:
+                raise DiceError("Dice need a positive count and at least two sides")
+            if sides > settings.DICE_MAX_SIDES:
+                raise DiceError(f"Dice may have at most {settings.DICE_MAX_SIDES} sides")
+            if keep_n is not None and keep_n > count:
+                raise DiceError(f"Cannot keep or drop {keep_n} of {count} dice")
+            dice_total += count
+            bound += count * sides
+            terms.append((sign, count, sides, mode, keep_n))
+        pos = match.end()
+    if dice_total > settings.DICE_MAX_DICE:
+        raise DiceError(f"At most {settings.DICE_MAX_DICE} dice per expression")
+    if bound > MAX_TOTAL:
+        raise DiceError("Dice expression total is too large")
+    return terms
+
+
+class DiceStream:
+    """Deterministic CSPRNG byte stream for one roll of one room.
+
+    SHAKE-256 keyed with the room's secret seed and the roll sequence number:
+    unpredictable without the seed, exactly replayable with it. The XOF output
+    of a longer digest extends the shorter one, so reading more bytes later
+    continues the same stream.
+    """
+
+    def __init__(self, seed, seq):
+        self._key = bytes(seed) + seq.to_bytes(8, 'big')
+        self._offset = 0
+
+    def read(self, n):
+        data = hashlib.shake_256(self._key).digest(self._offset + n)[self._offset:]
+        self._offset += n
+        return data
+
+
+def roll_pool(stream, count, sides):
+    """Roll ``count`` dice with ``sides`` faces in vectorized batches.
+
+    Bytes are pulled from the stream in one block per batch, reinterpreted as
+    unsigned 8/16/32-bit values, and mapped to faces with rejection sampling
+    so every face is exactly equally likely.
+    """
+    code, width = ('B', 1) if sides <= 0x100 else ('H', 2) if sides <= 0x10000 else ('I', 4)
+    space = 1 << (8 * width)
+    limit = space - space % sides
+    rolls = []
+    while len(rolls) < count:
+        need = count - len(rolls)
+        # Oversample a little so a single batch almost always suffices.
+        values = array(code, stream.read((need + need // 4 + 4) * width))
+        if width > 1 and sys.byteorder != 'little':
+            values.byteswap()
+        rolls.extend([v % sides + 1 for v in values if v < limit])
+    del rolls[count:]
+    return rolls
+
+
+def evaluate(terms, stream):
+    total, results = 0, []
+    for term in terms:
+        if len(term) == 2:
+            sign, value = term
+            total += sign * value
+            results.append({"constant": sign * value})
+            continue
+        sign, count, sides, mode, keep_n = term
+        rolls = roll_pool(stream, count, sides)
+        kept = range(count)
+        if mode:
+            order = heapq.nlargest if mode in ('kh', 'dl') else heapq.nsmallest
+            keep = keep_n if mode in ('kh', 'kl') else count - keep_n
+            kept = sorted(order(keep, range(count), key=rolls.__getitem__))
+        subtotal = sum(rolls[i] for i in kept)
+        total += sign * subtotal
+        label = f"{'-' if sign < 0 else ''}{count}d{sides}{f'{mode}{keep_n}' if mode else ''}"
+        term_result = {"dice": label, "rolls": rolls, "subtotal": sign * subtotal}
+        if mode:
+            term_result["kept"] = list(kept)
+        results.append(term_result)
+    return total, results
+
+
+def roll_for_room(room_pk, expressions, user_id=None):
+    """Roll every expression for a room and log each result as a ``DiceRoll``.
+
+    The room row is locked only long enough to reserve a block of sequence
+    numbers; all expressions of a request share one lock and one bulk insert.
+    Returns the created rolls, or None when the room does not exist.
+    """
+    parsed = [(expression, parse_expression(expression)) for expression in expressions]
+    with transaction.atomic():
+        room = Room.objects.select_for_update().filter(pk=room_pk).only('dice_seed', 'dice_counter').first()
+        if room is None:
+            return None
+        fields = ['dice_counter']
+        if not room.dice_seed:
+            room.dice_seed = secrets.token_bytes(32)
+            fields.append('dice_seed')
+        first_seq = room.dice_counter + 1
+        room.dice_counter += len(parsed)
+        room.save(update_fields=fields)
+        rolls = []
+        for seq, (expression, terms) in enumerate(parsed, start=first_seq):
+            total, result = evaluate(terms, DiceStream(room.dice_seed, seq))
+            rolls.append(DiceRoll(room_id=room_pk, seq=seq, user_id=user_id, expression=expression, result=result, total=total))
+        DiceRoll.objects.bulk_create(rolls)
+    return rolls
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from fastapi import Response
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+DICTIONARY_HEADER = "X-Zstd-Dictionary"
+DICTIONARY_ENCODING = "x-zstd-dict"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def _accepts(header, values):
+    for part in (header or "").lower().split(","):
+        media, _, params = part.strip().partition(";")
+        if media in values and "q=0" not in params.replace(" ", "").split(";"):
+            return True
+    return False
+
+
+def wants_msgpack(request):
+    return _accepts(request.headers.get("accept"), MSGPACK_TYPES)
+
+
+def wants_zstd(request):
+    return _accepts(request.headers.get("accept-encoding"), ("zstd",))
+
+
+def packb(payload):
+    import msgpack  # only MessagePack clients pay for the import
+
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+class SyncDictionaries:
+    """Per-game zstd dictionaries for room sync payloads, keyed by content hash.
+
+    Rooms copy their chips, decks and objects from the game, so every room of
+    a game hashes to the same id and shares one dictionary. The dictionary is
+    the game's own content packed exactly as it appears in payloads, used as
+    a raw-content (prefix) dictionary: a session body that repeats it shrinks
+    to a few dozen bytes, far better than a trainer can do from the handful of
+    samples a single game provides.
+    """
+
+    def __init__(self, max_entries, dictionary_size):
+        self.max_entries = max_entries
+        self.dictionary_size = dictionary_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def for_content(self, chips, decks, objects_json):
+        raw = packb({"chips": chips, "decks": decks, "objects_json": objects_json})
+        dict_id = hashlib.sha256(raw).hexdigest()[:16]
+        with self._lock:
+            if dict_id in self._entries:
+                self._entries.move_to_end(dict_id)
+                return dict_id, self._entries[dict_id]
+        import zstandard
+
+        # zstd only looks back this far, so keep the tail of the content.
+        dictionary = zstandard.ZstdCompressionDict(raw[-self.dictionary_size:], dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        with self._lock:
+            self._entries[dict_id] = dictionary
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict_id, dictionary
+
+    def get(self, dict_id):
+        with self._lock:
+            return self._entries.get(dict_id)
+
+
+sync_dictionaries = SyncDictionaries(
+    max_entries=settings.ZSTD_DICTIONARY_CACHE,
+    dictionary_size=settings.ZSTD_DICTIONARY_SIZE,
+)
+
+
+def negotiate(request, payload, dictionary_id=None):
+    """Encode ``payload`` the way the client asked for.
+
+    JSON stays the default: unless the client sends ``Accept:
+    application/msgpack`` the payload is returned untouched for FastAPI to
+    serialize. MessagePack bodies are zstd-compressed when the client accepts
+    ``zstd``; if it also names a dictionary it already holds (``X-Zstd-
+    Dictionary``) and that matches ``dictionary_id``, the dictionary is used
+    and the body is labelled ``Content-Encoding: x-zstd-dict``.
+    """
+    if not wants_msgpack(request):
+        return payload
+    body = packb(payload)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if wants_zstd(request):
+        requested = request.headers.get(DICTIONARY_HEADER)
+        dictionary = None
+        if requested and (dictionary_id is None or requested == dictionary_id):
+            dictionary = sync_dictionaries.get(requested)
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(
+            level=settings.ZSTD_LEVEL,
+            dict_data=dictionary,
+            write_checksum=False,
+            write_dict_id=False,
+        )
+        body = compressor.compress(body)
+        # A dictionary-compressed body is not plain zstd to intermediaries and
+        # generic HTTP clients, so it gets its own coding name.
+        headers["Content-Encoding"] = "zstd" if dictionary is None else DICTIONARY_ENCODING
+        if dictionary is not None:
+            headers[DICTIONARY_HEADER] = requested
+    return Response(content=body, media_type=MSGPACK_TYPES[0], headers=headers)
@@ -0,0 +1,30 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import RoomEvent, RoomSnapshot
+
+EVENT_FIELDS = ('seq', 'kind', 'user_id', 'payload', 'date_created')
+
+
+def catch_up(room_pk, since=None):
+    """Return what a (re)connecting client needs: a snapshot and/or an event tail.
+
+    A client that is at or past the latest snapshot only gets the events after
+    ``since``. Anyone further behind (or new, ``since=None``) gets the latest
+    snapshot plus the events after it, which is at most one snapshot interval.
+    """
+    snapshot = RoomSnapshot.objects.filter(room_id=room_pk).order_by('-seq').values('seq', 'state').first()
+    if since is not None and (snapshot is None or since >= snapshot['seq']):
+        start, snapshot = since, None
+    else:
+        start = snapshot['seq'] if snapshot else 0
+    events = list(RoomEvent.objects.filter(room_id=room_pk, seq__gt=start).order_by('seq').values(*EVENT_FIELDS))
+    return {"snapshot": snapshot, "events": events}
+
+
+def iter_replay(room_pk, chunk_size=500):
+    """Stream a room's full event log as newline-delimited JSON."""
+    events = RoomEvent.objects.filter(room_id=room_pk).order_by('seq').values(*EVENT_FIELDS)
+    for event in events.iterator(chunk_size=chunk_size):
+        yield json.dumps(event, cls=DjangoJSONEncoder) + "\n"
@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import tarfile
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from core.models import Game
+from fastapi_app.utils.game_assets import (
+    FILE_FIELDS, JSON_FIELDS, asset_path, extension, file_sha256, map_game_refs, store_stream,
+)
+
+ARCHIVE_FORMAT = "gameorbit-game"
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = "game.json"
+MANIFEST_MAX_BYTES = 32 * 1024 * 1024
+GAME_FIELDS = ('name', 'description', 'max_users', 'cube') + JSON_FIELDS + FILE_FIELDS
+
+_ASSET_MEMBER = re.compile(r'^assets/([0-9a-f]{64})(\.[a-z0-9]{1,8})?$')
+
+
+class ArchiveError(ValueError):
+    """Raised for archives that cannot be imported."""
+
+
+def build_manifest(game):
+    """Return ``(manifest, assets)`` for exporting ``game``.
+
+    Every locally stored asset is renamed to ``assets/<sha256><ext>`` inside
+    the manifest, so a file referenced by many cards is shipped once.
+    ``assets`` maps those archive names to paths on disk.
+    """
+    assets, by_path = {}, {}
+
+    def archive_name(ref):
+        path = asset_path(ref)
+        if path is None:
+            return None
+        if path not in by_path:
+            by_path[path] = f"assets/{file_sha256(path)}{extension(path)}"
+            assets[by_path[path]] = path
+        return by_path[path]
+
+    fields = map_game_refs({field: getattr(game, field) for field in GAME_FIELDS}, archive_name)
+    manifest = {
+        "format": ARCHIVE_FORMAT,
+        "version": ARCHIVE_VERSION,
+        "source_game_id": game.id,
+        "game": fields,
+        "assets": sorted(assets),
+    }
+    return manifest, assets
+
+
+def _header(name, size, mtime):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _padding(size):
+    return b'\0' * (-size % tarfile.BLOCKSIZE)
+
+
+def iter_export(game, chunk_size=None):
+    """Yield a tar archive of ``game``: ``game.json`` followed by its assets.
+
+    Entries are written by hand (header, data, padding) so memory use stays at
+    one chunk no matter how large the assets are.
+    """
+    chunk_size = chunk_size or settings.GAME_ARCHIVE_CHUNK_SIZE
+    manifest, assets = build_manifest(game)
+    now = int(time.time())
+    body = json.dumps(manifest, cls=DjangoJSONEncoder).encode()
+    yield _header(MANIFEST_NAME, len(body), now) + body + _padding(len(body))
+    for name, path in sorted(assets.items()):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            yield _header(name, size, int(os.path.getmtime(path)))
+            remaining = size
+            while remaining:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    # The file shrank underneath us; keep the entry well-formed.
+                    chunk = b'\0' * remaining
+                remaining -= len(chunk)
+                yield chunk
+        yield _padding(size)
+    yield b'\0' * (2 * tarfile.BLOCKSIZE)
+
+
+def import_archive(fileobj, user_id, max_bytes=None):
+    """Unpack a game archive from a stream and create the game.
+
+    The archive is read sequentially (gzip-compressed archives work too).
+    Assets go to the content-addressed store as they arrive; ones we already
+    hold are skipped unread. The game row is created in one transaction once
+    every asset is in place.
+    """
+    max_bytes = settings.GAME_ARCHIVE_MAX_BYTES if max_bytes is None else max_bytes
+    manifest, stored, total = None, {}, 0
+    try:
+        with tarfile.open(fileobj=fileobj, mode='r|*') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if member.name == MANIFEST_NAME:
+                    if member.size > MANIFEST_MAX_BYTES:
+                        raise ArchiveError("game.json is too large")
+                    manifest = json.load(tar.extractfile(member))
+                    continue
+                match = _ASSET_MEMBER.match(member.name)
+                if not match:
+                    continue
+                total += member.size
+                if total > max_bytes:
+                    raise ArchiveError(f"Archive assets exceed {max_bytes} bytes")
+                digest, ext = match.group(1), match.group(2) or ''
+                stored[member.name] = store_stream(tar.extractfile(member), ext, expected_digest=digest)
+    except (tarfile.TarError, EOFError, json.JSONDecodeError) as e:
+        raise ArchiveError(f"Invalid game archive: {e}")
+    if not isinstance(manifest, dict) or manifest.get("format") != ARCHIVE_FORMAT:
+        raise ArchiveError("Archive has no game.json")
+    if manifest.get("version", 0) > ARCHIVE_VERSION:
+        raise ArchiveError(f"Unsupported archive version {manifest.get('version')}")
+    data = manifest.get("game") or {}
+    fields = map_game_refs({field: data.get(field) for field in GAME_FIELDS if field in data}, stored.get)
+    if not fields.get("name"):
+        raise ArchiveError("Archive game has no name")
+    with transaction.atomic():
+        return Game.objects.create(user_id=user_id, **fields)
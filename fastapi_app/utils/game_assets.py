@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+
+# Game columns that hold a single stored file, and JSON columns whose
+# metadata points at stored files.
+FILE_FIELDS = ('picture', 'map', 'rules')
+JSON_FIELDS = ('chips', 'decks', 'objects_json')
+# Keys under which the game editor writes asset paths into that metadata,
+# e.g. chips ``{"value": path}`` and deck cards ``{"type": "file", "path": path}``.
+REF_KEYS = ('path', 'value')
+
+_EXTENSION = re.compile(r'\.[a-z0-9]{1,8}$')
+
+
+class AssetError(ValueError):
+    """Raised when an incoming asset does not match what it claims to be."""
+
+
+def storage_name(ref):
+    """Stored name for a file field value, stored path or ``/images/...`` URL."""
+    if isinstance(ref, FieldFile):
+        return ref.name or None
+    if not isinstance(ref, str) or not ref or '://' in ref:
+        return None
+    if ref.startswith(settings.MEDIA_URL):
+        ref = ref[len(settings.MEDIA_URL):]
+    return ref.lstrip('/')
+
+
+def asset_path(ref):
+    """Absolute path of a locally stored asset, or None for URLs and missing files.
+
+    Names written by the API are relative to ``BASE_DIR`` (``images/games/...``)
+    while admin uploads are relative to ``MEDIA_ROOT``; both are tried. Paths
+    that resolve outside ``MEDIA_ROOT`` are never returned.
+    """
+    name = storage_name(ref)
+    if not name:
+        return None
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    for base in (settings.BASE_DIR, settings.MEDIA_ROOT):
+        path = os.path.realpath(os.path.join(base, name))
+        if path.startswith(media_root + os.sep) and os.path.isfile(path):
+            return path
+    return None
+
+
+def extension(name):
+    ext = os.path.splitext(name or '')[1].lower()
+    return ext if _EXTENSION.match(ext) else ''
+
+
+def load_json(value):
+    """Return ``(data, was_string)``; older games store metadata as JSON text."""
+    if isinstance(value, str):
+        try:
+            return json.loads(value or 'null'), True
+        except json.JSONDecodeError:
+            return value, False
+    return value, False
+
+
+def dump_json(data, was_string):
+    return json.dumps(data) if was_string else data
+
+
+def map_refs(data, fn):
+    """Copy of ``data`` with each asset reference replaced by ``fn(ref)``.
+
+    ``fn`` returns the new reference, or None to keep the old one.
+    """
+    if isinstance(data, dict):
+        return {
+            key: ((fn(value) or value) if key in REF_KEYS and isinstance(value, str) else map_refs(value, fn))
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [map_refs(value, fn) for value in data]
+    return data
+
+
+def map_game_refs(fields, fn):
+    """Apply ``fn`` to every asset reference of a game's field values.
+
+    ``fields`` maps field names to values as stored on ``Game``; file fields
+    are passed as their stored name. Returns a new dict, keeping JSON text
+    columns as text.
+    """
+    result = dict(fields)
+    for field in FILE_FIELDS:
+        if field in result:
+            name = storage_name(result[field])
+            result[field] = (fn(name) or name) if name else None
+    for field in JSON_FIELDS:
+        if field in result:
+            data, was_string = load_json(result[field])
+            result[field] = dump_json(map_refs(data, fn), was_string)
+    return result
+
+
+def iter_game_refs(fields):
+    """Yield every asset reference of a game (possibly with repeats)."""
+    refs = []
+
+    def collect(ref):
+        refs.append(ref)
+        return None
+
+    map_game_refs(fields, collect)
+    return iter(refs)
+
+
+def file_sha256(path, chunk_size=None):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size or settings.GAME_ARCHIVE_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_name(digest, ext):
+    """Stored name of a content-addressed asset."""
+    return f"{settings.GAME_ASSET_DIR}/{digest}{ext}"
+
+
+def content_path(name):
+    return os.path.join(settings.BASE_DIR, name)
+
+
+def store_stream(fileobj, ext, expected_digest=None, chunk_size=None):
+    """Copy a stream into the content-addressed store and return its stored name.
+
+    With ``expected_digest`` an asset that is already stored is not read at
+    all; otherwise the stream is written to a temporary file while hashing and
+    moved into place, so identical content is only ever kept once.
+    """
+    if expected_digest:
+        name = content_name(expected_digest, ext)
+        if os.path.isfile(content_path(name)):
+            return name
+    directory = content_path(settings.GAME_ASSET_DIR)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as out:
+        try:
+            for chunk in iter(lambda: fileobj.read(chunk_size or settings.GAME_ARCHIVE_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        except BaseException:
+            os.unlink(out.name)
+            raise
+    actual = digest.hexdigest()
+    if expected_digest and actual != expected_digest:
+        os.unlink(out.name)
+        raise AssetError(f"Asset content does not match its hash {expected_digest}")
+    name = content_name(actual, ext)
+    if os.path.isfile(content_path(name)):
+        os.unlink(out.name)
+    else:
+        os.chmod(out.name, 0o644)
+        os.replace(out.name, content_path(name))
+    return name
@@ -0,0 +1,61 @@
+from django.db import transaction
+
+from core.models import Game
+from fastapi_app.utils.game_assets import FILE_FIELDS, JSON_FIELDS, map_game_refs, storage_name, store_stream
+
+CLONED_FIELDS = ('description', 'max_users', 'cube', 'picture', 'map', 'rules') + JSON_FIELDS
+
+
+def clone_game(source, user_id, name=None):
+    """Copy a game row for ``user_id``; the copy points at the same stored files.
+
+    Stored assets are never modified in place (edits always write a new file
+    and repoint the game), so sharing them between a game and its forks is
+    safe and cloning costs one INSERT, with no image processing at all.
+    """
+    fields = {field: getattr(source, field) for field in CLONED_FIELDS}
+    for field in FILE_FIELDS:
+        fields[field] = storage_name(fields[field])
+    return Game.objects.create(
+        user_id=user_id,
+        name=name or source.name,
+        forked_from=source,
+        **fields,
+    )
+
+
+def replace_asset(game_id, ref, fileobj, ext):
+    """Copy-on-write replacement of one asset of one game.
+
+    ``ref`` is a file field name (``picture``, ``map``, ``rules``) or an asset
+    path as it appears in the game metadata. The new content goes to the
+    content-addressed store and only this game's references are repointed;
+    forks sharing the old file keep it. Returns ``(game, new_name, replaced)``
+    or None when the game does not exist.
+    """
+    new_name = store_stream(fileobj, ext)
+    target = None if ref in FILE_FIELDS else storage_name(ref)
+    with transaction.atomic():
+        game = Game.objects.select_for_update().filter(pk=game_id).first()
+        if game is None:
+            return None
+        replaced = 0
+
+        def swap(old):
+            nonlocal replaced
+            if storage_name(old) == target:
+                replaced += 1
+                return new_name
+            return None
+
+        fields = {field: getattr(game, field) for field in FILE_FIELDS + JSON_FIELDS}
+        if ref in FILE_FIELDS:
+            fields[ref] = new_name
+            replaced = 1
+        else:
+            fields = map_game_refs(fields, swap)
+        if replaced:
+            for field, value in fields.items():
+                setattr(game, field, value)
+            game.save(update_fields=list(fields))
+    return game, new_name, replaced
@@ -0,0 +1,36 @@
+import io
+
+# Pillow is imported on first use: most workers never touch an image, and it
+# is one of the slower imports at startup.
+
+# How each kind of game image is normalized: longest side and output format.
+IMAGE_SPECS = {
+    'cover': ((512, 512), 'JPEG'),
+    'map': ((1024, 1024), 'JPEG'),
+    'chip': ((512, 512), 'PNG'),
+    'deck': ((512, 512), 'PNG'),
+    'profile': ((512, 512), 'JPEG'),
+}
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png'}
+
+
+def save_image(source, destination, max_size, image_format):
+    """Convert to RGB, shrink to fit ``max_size`` and save compressed.
+
+    ``source`` and ``destination`` are paths or file objects.
+    """
+    from PIL import Image
+
+    # Both the decoded source and its RGB copy are closed here, so their
+    # pixel buffers are freed now rather than whenever the collector runs.
+    with Image.open(source) as original, original.convert("RGB") as image:  # Ensure compatibility
+        image.thumbnail(max_size)  # Keeps aspect ratio
+        image.save(destination, format=image_format, quality=70, optimize=True)
+
+
+def process_image(source, kind):
+    """Return ``(data, extension)`` for ``source`` normalized as ``kind``."""
+    max_size, image_format = IMAGE_SPECS[kind]
+    out = io.BytesIO()
+    save_image(source, out, max_size, image_format)
+    return out.getvalue(), EXTENSIONS[image_format]
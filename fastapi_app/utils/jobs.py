@@ -0,0 +1,242 @@
+import ipaddress
+import json
+import os
+import shutil
+import socket
+import traceback
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from core.models import Job
+from fastapi_app.utils.images import IMAGE_SPECS, save_image
+from fastapi_app.utils.metrics import metrics
+
+PENDING = ('queued', 'running')
+
+# kind -> callable(payload); register with ``@job_handler('kind')``.
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job fails at once."""
+
+
+class CallbackURLError(ValueError):
+    """Raised for a callback URL the server will not post to."""
+
+
+def check_callback_url(url):
+    """Raise ``CallbackURLError`` unless ``url`` is an http(s) URL of a public host.
+
+    The host is resolved and every address it resolves to must be globally
+    routable, so a callback cannot be pointed at loopback, the private
+    network or cloud metadata endpoints. Called when the URL is accepted and
+    again right before posting, since DNS may have changed in between.
+    """
+    if len(url) > Job._meta.get_field('callback_url').max_length:
+        raise CallbackURLError("Callback URL is too long")
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except ValueError:
+        raise CallbackURLError("Callback URL is not a valid URL")
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise CallbackURLError("Callback URL must be an http or https URL")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise CallbackURLError(f"Cannot resolve callback host {parts.hostname}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackURLError(f"Callback host {parts.hostname} is not a public address")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect would skip check_callback_url; treat it as a failed callback.
+    def redirect_request(self, *args):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def enqueue(jobs, callback_url=None):
+    """Queue ``(kind, payload)`` pairs as one batch and return the batch id."""
+    batch = uuid.uuid4()
+    Job.objects.bulk_create([
+        Job(batch=batch, kind=kind, payload=payload, max_attempts=settings.JOB_MAX_ATTEMPTS, callback_url=callback_url or '')
+        for kind, payload in jobs
+    ])
+    metrics.incr("jobs.enqueued", len(jobs))
+    return batch
+
+
+def claim(worker_id):
+    """Lock the next runnable job for ``worker_id``, or return None.
+
+    ``SKIP LOCKED`` lets any number of workers poll the same table without
+    waiting on each other or handing out a job twice.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=timezone.now())
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.locked_by = worker_id
+        job.save(update_fields=['status', 'attempts', 'locked_at', 'locked_by', 'updated_at'])
+    return job
+
+
+def run(job):
+    """Run a claimed job and record the outcome; failures are retried with backoff."""
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind '{job.kind}'")
+        with metrics.timer(f"jobs.{job.kind}.seconds"):
+            handler(job.payload)
+    except Exception as e:
+        retry = not isinstance(e, PermanentJobError) and job.attempts < job.max_attempts
+        job.status = 'queued' if retry else 'failed'
+        job.error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+        if retry:
+            job.run_after = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        metrics.incr("jobs.retried" if retry else "jobs.failed")
+    else:
+        job.status = 'done'
+        job.error = ''
+        metrics.incr("jobs.done")
+    job.locked_at = None
+    job.locked_by = ''
+    job.save(update_fields=['status', 'error', 'run_after', 'locked_at', 'locked_by', 'updated_at'])
+    if job.status != 'queued':
+        notify_if_finished(job.batch)
+    return job.status
+
+
+def reap_stale(stale_seconds=None):
+    """Requeue running jobs whose worker died; fail them if out of attempts."""
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds or settings.JOB_STALE_SECONDS)
+    stale = Job.objects.filter(status='running', locked_at__lt=cutoff)
+    lost = "Worker stopped responding"
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status='queued', locked_at=None, locked_by='', error=lost, run_after=timezone.now(), updated_at=timezone.now(),
+    )
+    batches = list(stale.values_list('batch', flat=True).distinct())
+    failed = stale.update(status='failed', locked_at=None, locked_by='', error=lost, updated_at=timezone.now())
+    for batch in batches:
+        notify_if_finished(batch)
+    if requeued or failed:
+        metrics.incr("jobs.reaped", requeued + failed)
+    return requeued, failed
+
+
+def batch_status(batch):
+    """Progress of a batch, or None if it does not exist."""
+    counts = Job.objects.filter(batch=batch).aggregate(
+        total=Count('id'),
+        queued=Count('id', filter=Q(status='queued')),
+        running=Count('id', filter=Q(status='running')),
+        done=Count('id', filter=Q(status='done')),
+        failed=Count('id', filter=Q(status='failed')),
+    )
+    if not counts['total']:
+        return None
+    if counts['queued'] + counts['running']:
+        overall = 'running' if counts['running'] or counts['done'] or counts['failed'] else 'queued'
+    else:
+        overall = 'failed' if counts['failed'] else 'done'
+    return {
+        "job_id": str(batch),
+        "status": overall,
+        "progress": round((counts['done'] + counts['failed']) / counts['total'], 3),
+        **counts,
+    }
+
+
+def notify_if_finished(batch):
+    """POST the batch status to its callback URL once every job has finished.
+
+    Only the worker whose UPDATE actually clears the URL sends it, so a batch
+    is announced once even when its last jobs finish at the same time.
+    """
+    if Job.objects.filter(batch=batch, status__in=PENDING).exists():
+        return False
+    url = Job.objects.filter(batch=batch).exclude(callback_url='').values_list('callback_url', flat=True).first()
+    if not url or not Job.objects.filter(batch=batch).exclude(callback_url='').update(callback_url=''):
+        return False
+    body = json.dumps(batch_status(batch)).encode()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        check_callback_url(url)
+        with _callback_opener.open(request, timeout=settings.JOB_CALLBACK_TIMEOUT):
+            pass
+    except Exception as e:
+        metrics.incr("jobs.callback_errors")
+        print("Job callback failed:", url, str(e))
+        return False
+    return True
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def stage_file(fileobj, suffix=''):
+    """Copy an incoming file to the staging area so a job can process it later."""
+    os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_STAGING_DIR, f"job-{uuid.uuid4().hex}{suffix}")
+    with open(path, 'wb') as out:
+        shutil.copyfileobj(fileobj, out, 1024 * 1024)
+    return path
+
+
+@job_handler('save_image')
+def save_image_job(payload):
+    """Normalize a staged image into its final, already-referenced path."""
+    source = payload['source']
+    destination = os.path.join(settings.BASE_DIR, payload['destination'])
+    if not os.path.exists(source):
+        if os.path.exists(destination):
+            return  # Finished before a crash; nothing left to do.
+        raise PermanentJobError(f"Staged file {source} is gone")
+    from PIL import UnidentifiedImageError
+
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    partial = f"{destination}.partial"
+    try:
+        save_image(source, partial, *IMAGE_SPECS[payload['kind']])
+    except UnidentifiedImageError as e:
+        os.unlink(source)
+        raise PermanentJobError(str(e))
+    os.replace(partial, destination)
+    os.unlink(source)
+
+
+@job_handler('process_upload')
+def process_upload_job(payload):
+    from fastapi_app.utils.uploads import process_upload  # uploads enqueues jobs itself
+
+    process_upload(payload['upload_pk'])
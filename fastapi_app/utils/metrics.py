@@ -0,0 +1,85 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class MetricsRegistry:
+    """Process-local counters, histograms and gauges, served by ``/metrics``.
+
+    Gauges are callables evaluated at snapshot time, so registering one costs
+    nothing on the hot path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def gauge(self, name, fn):
+        self._gauges[name] = fn
+
+    def snapshot(self):
+        with self._lock:
+            data = {
+                "counters": dict(self._counters),
+                "histograms": {name: h.as_dict() for name, h in self._histograms.items()},
+            }
+        gauges = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+        data["gauges"] = gauges
+        return data
+
+
+metrics = MetricsRegistry()
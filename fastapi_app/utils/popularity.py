@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from core.models import GameStats, TrendingGame
+from fastapi_app.utils.diagnostics import register_store
+from fastapi_app.utils.metrics import metrics
+
+# ``trend_score`` decayed to now; the stored score is as of ``trend_updated_at``.
+DECAYED_SCORE = "trend_score * power(0.5, extract(epoch FROM now() - trend_updated_at) / %s)"
+
+
+class PopularityCounter:
+    """Sessions started per game, batched in memory and added to ``GameStats``.
+
+    ``incr`` is a dict update, so ``create_session`` never waits on a counter
+    row; each flush is one upsert for all games touched since the last one.
+    Counts pending in a worker that dies are lost, which is fine for ranking.
+    """
+
+    def __init__(self, flush_interval, half_life_hours):
+        self.flush_interval = flush_interval
+        self.half_life = half_life_hours * 3600
+        self._pending = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, game_id, count=1):
+        with self._lock:
+            self._pending[game_id] += count
+
+    def pending(self):
+        return sum(self._pending.values())
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+        rows = list(batch.items())
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO core_gamestats (game_id, sessions_count, trend_score, trend_updated_at)
+                    SELECT game_id, delta, delta, now()
+                    FROM unnest(%s::integer[], %s::bigint[]) AS batch(game_id, delta)
+                    WHERE EXISTS (SELECT 1 FROM core_game WHERE id = batch.game_id)
+                    ON CONFLICT (game_id) DO UPDATE SET
+                        sessions_count = core_gamestats.sessions_count + EXCLUDED.sessions_count,
+                        trend_score = core_gamestats.trend_score
+                            * power(0.5, extract(epoch FROM now() - core_gamestats.trend_updated_at) / %s)
+                            + EXCLUDED.trend_score,
+                        trend_updated_at = EXCLUDED.trend_updated_at
+                    """,
+                    [[game_id for game_id, _ in rows], [delta for _, delta in rows], self.half_life],
+                )
+        except Exception:
+            # Put the counts back so the next flush retries them.
+            with self._lock:
+                self._pending.update(batch)
+            raise
+        metrics.incr("popularity.flushed", sum(batch.values()))
+        return len(rows)
+
+    async def run(self):
+        """Background flusher; started from the app lifespan."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await sync_to_async(self.flush)()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("popularity.flush_errors")
+                print("Popularity flush failed:", str(e))
+
+
+popularity_counter = PopularityCounter(
+    flush_interval=settings.POPULARITY_FLUSH_INTERVAL,
+    half_life_hours=settings.TRENDING_HALF_LIFE_HOURS,
+)
+register_store("popularity.pending", lambda: popularity_counter._pending)
+
+
+def refresh_trending(size=None):
+    """Rebuild ``TrendingGame`` from the decayed scores; returns how many games it holds."""
+    size = size or settings.TRENDING_SIZE
+    top = list(
+        GameStats.objects.filter(trend_score__gt=0)
+        .annotate(score=RawSQL(DECAYED_SCORE, [settings.TRENDING_HALF_LIFE_HOURS * 3600]))
+        .order_by('-score', 'game_id')
+        .values_list('game_id', 'score')[:size]
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        TrendingGame.objects.all().delete()
+        TrendingGame.objects.bulk_create([
+            TrendingGame(rank=rank, game_id=game_id, score=score, refreshed_at=now)
+            for rank, (game_id, score) in enumerate(top, start=1)
+        ])
+    return len(top)
+
+
+_trending_cache = (0.0, None)
+register_store("popularity.trending", lambda: _trending_cache[1] or [])
+
+
+def trending_games():
+    """The materialized trending list, cached per worker for ``TRENDING_CACHE_SECONDS``.
+
+    Reads at most ``TRENDING_SIZE`` rows, and only when the cache expires, so
+    serving it costs the same however many rooms have been played.
+    """
+    global _trending_cache
+    expires, games = _trending_cache
+    if games is not None and time.monotonic() < expires:
+        return games
+    games = [
+        {
+            "rank": entry.rank,
+            "game_id": entry.game_id,
+            "name": entry.game.name,
+            "description": entry.game.description,
+            "picture": entry.game.picture,
+            "score": entry.score,
+            "sessions_count": entry.game.stats.sessions_count,
+        }
+        for entry in TrendingGame.objects.select_related('game__stats').only(
+            'rank', 'score', 'game__name', 'game__description', 'game__picture', 'game__stats__sessions_count',
+        )
+    ]
+    _trending_cache = (time.monotonic() + settings.TRENDING_CACHE_SECONDS, games)
+    return games
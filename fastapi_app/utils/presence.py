@@ -0,0 +1,272 @@
+import asyncio
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Room, RoomMember, User
+from fastapi_app.utils.diagnostics import register_store
+from fastapi_app.utils.metrics import metrics
+from fastapi_app.utils.room_state import room_state_store
+
+
+class RoomFull(ValueError):
+    """Raised when joining would take a room past its ``max_users``."""
+
+
+class TimerWheel:
+    """Hashed timing wheel of deadlines, ``tick`` seconds per slot.
+
+    Scheduling and cancelling are O(1); ``advance`` only visits the slots
+    whose time has come, so expiring members costs in proportion to the
+    members due, not to everyone present. A deadline further out than one
+    turn of the wheel stays in its slot and is skipped until its round.
+    """
+
+    def __init__(self, tick, slots):
+        self.tick = tick
+        self.slots = [set() for _ in range(slots)]
+        self._deadlines = {}
+        self._current = self._tick_of(time.monotonic())
+
+    def _tick_of(self, when):
+        return int(when // self.tick)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def schedule(self, key, when):
+        """(Re)schedule ``key`` to fire at monotonic time ``when``."""
+        self.cancel(key)
+        tick = max(self._tick_of(when), self._current + 1)
+        self._deadlines[key] = tick
+        self.slots[tick % len(self.slots)].add(key)
+
+    def cancel(self, key):
+        tick = self._deadlines.pop(key, None)
+        if tick is not None:
+            self.slots[tick % len(self.slots)].discard(key)
+
+    def advance(self, now=None):
+        """Remove and return the keys whose deadline has passed."""
+        target = self._tick_of(time.monotonic() if now is None else now)
+        if target <= self._current:
+            return []
+        due = []
+        # After a stall longer than a turn, each slot only needs one visit.
+        start = max(self._current + 1, target - len(self.slots) + 1)
+        for tick in range(start, target + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key in [key for key in slot if self._deadlines[key] <= target]:
+                slot.discard(key)
+                del self._deadlines[key]
+                due.append(key)
+        self._current = target
+        return due
+
+
+def claim_seat(room_pk, user_id, ttl):
+    """Seat ``user_id`` in the room for ``ttl`` seconds; returns ``(joined_at, new)``.
+
+    The room row is locked while lapsed seats are cleared and the rest are
+    counted against ``max_users``, so joins through different workers can
+    never both take the last seat. A user who already holds a seat just
+    renews it. Returns None if the room does not exist.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl)
+    with transaction.atomic():
+        room = Room.objects.select_for_update().filter(pk=room_pk).values_list('room_id', 'max_users').first()
+        if room is None:
+            return None
+        room_id, max_users = room
+        seats = RoomMember.objects.filter(room_id=room_pk)
+        lapsed = list(seats.filter(expires_at__lte=now).values_list('user_id', flat=True))
+        if lapsed:
+            seats.filter(user_id__in=lapsed).delete()
+            User.objects.leave_rooms(lapsed, [room_id])
+        if seats.filter(user_id=user_id).update(expires_at=expires_at):
+            return seats.get(user_id=user_id).joined_at, False
+        if max_users is not None and seats.count() >= max_users:
+            raise RoomFull(f"Room {room_id} is full ({max_users} players)")
+        RoomMember.objects.create(room_id=room_pk, user_id=user_id, joined_at=now, expires_at=expires_at)
+        User.objects.join_rooms([user_id], [room_id])
+    return now, True
+
+
+def renew_seat(room_pk, user_id, ttl):
+    """Extend a held seat; False if it lapsed and was given up."""
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    return bool(RoomMember.objects.filter(room_id=room_pk, user_id=user_id).update(expires_at=expires_at))
+
+
+def release_seats(room_pk, room_id, user_ids, lapsed_by=None):
+    """Free the seats of ``user_ids`` (only those lapsed by ``lapsed_by``, if given).
+
+    Returns ``(released, seated)``: the users whose seat this freed (the
+    room leaves their ``User.sessions`` in the same transaction) and those
+    who still hold one. Anyone in neither lost their seat earlier, to a join
+    clearing lapsed seats.
+    """
+    with transaction.atomic():
+        seats = RoomMember.objects.filter(room_id=room_pk, user_id__in=user_ids)
+        lapsed = seats if lapsed_by is None else seats.filter(expires_at__lte=lapsed_by)
+        released = list(lapsed.select_for_update().values_list('user_id', flat=True))
+        if released:
+            RoomMember.objects.filter(room_id=room_pk, user_id__in=released).delete()
+            User.objects.leave_rooms(released, [room_id])
+        seated = set(seats.values_list('user_id', flat=True))
+    return released, seated
+
+
+class RoomPresence:
+    __slots__ = ('room_pk', 'room_id', 'members')
+
+    def __init__(self, room_pk, room_id):
+        self.room_pk = room_pk
+        self.room_id = room_id
+        # user_id -> joined_at; dicts keep join order.
+        self.members = {}
+
+
+class PresenceRegistry:
+    """Who is in which room right now.
+
+    Clients join, heartbeat at least every ``ttl`` seconds and leave. Seats
+    are ``RoomMember`` rows, so ``max_users`` holds across workers (see
+    ``claim_seat``); this worker keeps the members it has seen in memory,
+    expires them with a ``TimerWheel`` and answers ``occupancy`` from there,
+    so room listings can show it without a query. ``User.sessions`` is kept
+    in step with the seats for reverse lookups from the database.
+    """
+
+    def __init__(self, ttl, tick):
+        self.ttl = ttl
+        self.wheel = TimerWheel(tick, slots=math.ceil(ttl / tick) + 1)
+        self._rooms = {}
+
+    def __len__(self):
+        return len(self.wheel)
+
+    def occupancy(self, room_pk):
+        room = self._rooms.get(room_pk)
+        return len(room.members) if room else 0
+
+    def members(self, room_pk):
+        room = self._rooms.get(room_pk)
+        return list(room.members.items()) if room else []
+
+    def _track(self, room_pk, room_id, user_id, joined_at):
+        room = self._rooms.get(room_pk)
+        if room is None:
+            room = self._rooms[room_pk] = RoomPresence(room_pk, room_id)
+        room.members.setdefault(user_id, joined_at)
+        self.wheel.schedule((room_pk, user_id), time.monotonic() + self.ttl)
+
+    async def join(self, live_room, user_id):
+        """Seat ``user_id`` in ``live_room``; False if they already held a seat (a heartbeat).
+
+        Raises ``RoomFull`` when every seat is taken.
+        """
+        seat = await sync_to_async(claim_seat)(live_room.room_pk, user_id, self.ttl)
+        if seat is None:
+            raise RoomFull(f"Room {live_room.room_id} is closed")
+        joined_at, joined = seat
+        self._track(live_room.room_pk, live_room.room_id, user_id, joined_at)
+        return joined
+
+    async def heartbeat(self, live_room, user_id):
+        """Extend ``user_id``'s seat; False if they are not (or no longer) in the room."""
+        if not await sync_to_async(renew_seat)(live_room.room_pk, user_id, self.ttl):
+            self.wheel.cancel((live_room.room_pk, user_id))
+            self._remove(live_room.room_pk, user_id)
+            return False
+        # The seat may have been taken through another worker.
+        self._track(live_room.room_pk, live_room.room_id, user_id, timezone.now())
+        return True
+
+    async def leave(self, live_room, user_id):
+        """Free ``user_id``'s seat; returns whether they held one."""
+        released, _ = await sync_to_async(release_seats)(live_room.room_pk, live_room.room_id, [user_id])
+        self.wheel.cancel((live_room.room_pk, user_id))
+        self._remove(live_room.room_pk, user_id)
+        return bool(released)
+
+    def _remove(self, room_pk, user_id):
+        room = self._rooms.get(room_pk)
+        if room is None or room.members.pop(user_id, None) is None:
+            return None
+        if not room.members:
+            del self._rooms[room_pk]
+        return room.room_id
+
+    def due(self, now=None):
+        """Members whose heartbeat lapsed, still in their rooms: ``{(room_pk, room_id): [user_id, ...]}``."""
+        due = defaultdict(list)
+        for room_pk, user_id in self.wheel.advance(now):
+            room = self._rooms.get(room_pk)
+            if room is not None and user_id in room.members:
+                due[room_pk, room.room_id].append(user_id)
+        return due
+
+    async def expire(self, room_pk, room_id, user_ids):
+        """Take lapsed ``user_ids`` out of the room: database first, then memory.
+
+        If the database update fails they stay members and are retried on
+        the next tick. Returns the users who lost their seat; one who renewed
+        it meanwhile keeps it, and if that was through another worker this
+        one just stops tracking them.
+        """
+        lapsed_by = timezone.now() + timedelta(seconds=self.wheel.tick)
+        try:
+            _, seated = await sync_to_async(release_seats)(room_pk, room_id, user_ids, lapsed_by)
+        except BaseException:
+            for user_id in user_ids:
+                self.wheel.schedule((room_pk, user_id), time.monotonic())
+            raise
+        expired = []
+        for user_id in user_ids:
+            if (room_pk, user_id) in self.wheel:
+                continue  # heartbeated here during the update
+            if self._remove(room_pk, user_id) is not None and user_id not in seated:
+                expired.append(user_id)
+        return expired
+
+    @staticmethod
+    async def announce(room_pk, kind, user_ids, payload=None):
+        """Log ``join``/``leave`` events for ``user_ids`` in the room's event log."""
+        live_room = await room_state_store.get(room_pk)
+        if live_room is None:
+            return
+        for user_id in user_ids:
+            await room_state_store.record(live_room, kind, payload, user_id)
+
+    async def run(self):
+        """Background expiry; started from the app lifespan."""
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            for (room_pk, room_id), user_ids in self.due().items():
+                try:
+                    expired = await self.expire(room_pk, room_id, user_ids)
+                    metrics.incr("presence.expired", len(expired))
+                    await self.announce(room_pk, 'leave', expired, {"reason": "timeout"})
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    metrics.incr("presence.expire_errors")
+                    print(f"Presence expiry failed for room {room_id}:", str(e))
+
+
+presence_registry = PresenceRegistry(ttl=settings.PRESENCE_TTL, tick=settings.PRESENCE_TICK)
+
+metrics.gauge("presence.members", lambda: len(presence_registry))
+metrics.gauge("presence.rooms", lambda: len(presence_registry._rooms))
+register_store("presence.rooms", lambda: presence_registry._rooms)
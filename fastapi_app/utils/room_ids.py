@@ -0,0 +1,85 @@
+import secrets
+import string
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from core.models import Room
+
+
+class RoomIdExhausted(Exception):
+    """Raised when no free room id could be inserted within the retry budget."""
+
+
+class RoomIdAllocator:
+    """Hands out short, unguessable room ids and inserts rooms under them.
+
+    Ids are drawn from ``secrets`` and prefetched in blocks: one query checks a
+    whole block against existing rooms, so under a burst each room creation is
+    a single INSERT. A concurrent worker can still grab the same id between the
+    check and the insert; that surfaces as an IntegrityError and is retried
+    with the next id, up to ``max_attempts`` times.
+    """
+
+    def __init__(self, length=8, alphabet=string.ascii_letters + string.digits,
+                 group_size=4, prefetch=32, max_attempts=5):
+        if length < 1 or len(set(alphabet)) < 2:
+            raise ValueError("Room id needs a positive length and at least two symbols")
+        self.length = length
+        self.alphabet = alphabet
+        self.group_size = group_size
+        self.prefetch = prefetch
+        self.max_attempts = max_attempts
+        self._pool = deque()
+        self._lock = threading.Lock()
+
+    def generate(self):
+        raw = ''.join(secrets.choice(self.alphabet) for _ in range(self.length))
+        if not self.group_size:
+            return raw
+        return '-'.join(raw[i:i + self.group_size] for i in range(0, len(raw), self.group_size))
+
+    def _refill(self):
+        block = {self.generate() for _ in range(self.prefetch)}
+        taken = set(Room.objects.filter(room_id__in=block).values_list('room_id', flat=True))
+        self._pool.extend(block - taken)
+
+    def next_id(self):
+        with self._lock:
+            if not self._pool:
+                self._refill()
+            if self._pool:
+                return self._pool.popleft()
+        # The whole block collided; the id space is nearly full, so fall back
+        # to a fresh unchecked candidate and let the insert decide.
+        return self.generate()
+
+    def create_room(self, **fields):
+        """Insert a ``Room`` under a fresh id, retrying on id collisions.
+
+        Must not be given ``room_id``. Inside an outer transaction each attempt
+        runs in a savepoint so a collision does not poison the transaction.
+        """
+        for _ in range(self.max_attempts):
+            room_id = self.next_id()
+            guard = transaction.atomic() if connection.in_atomic_block else nullcontext()
+            try:
+                with guard:
+                    return Room.objects.create(room_id=room_id, **fields)
+            except IntegrityError:
+                if Room.objects.filter(room_id=room_id).exists():
+                    continue
+                raise
+        raise RoomIdExhausted(f"Could not allocate a free room id in {self.max_attempts} attempts")
+
+
+room_id_allocator = RoomIdAllocator(
+    length=settings.ROOM_ID_LENGTH,
+    alphabet=settings.ROOM_ID_ALPHABET,
+    group_size=settings.ROOM_ID_GROUP_SIZE,
+    prefetch=settings.ROOM_ID_PREFETCH,
+    max_attempts=settings.ROOM_ID_MAX_ATTEMPTS,
+)
@@ -0,0 +1,360 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from django.db import InterfaceError, OperationalError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import Room, RoomDeck, RoomEvent, RoomSnapshot, RoomState
+from fastapi_app.utils.decks import load_decks
+from fastapi_app.utils.diagnostics import register_store
+from fastapi_app.utils.metrics import metrics
+
+
+class LiveRoom:
+    __slots__ = ('room_pk', 'room_id', 'max_users', 'durability', 'chips_coords', 'version', 'flushed_version',
+                 'last_access', 'cards', 'decks', 'dirty_decks', 'event_seq', 'pending_events', 'pending_snapshots',
+                 'failed_flushes')
+
+    def __init__(self, room_pk, room_id, max_users, durability, chips_coords, version, event_seq):
+        self.room_pk = room_pk
+        self.room_id = room_id
+        self.max_users = max_users
+        self.durability = durability
+        self.chips_coords = chips_coords
+        self.version = version
+        self.flushed_version = version
+        self.last_access = time.monotonic()
+        # Deck state is loaded on the first deck operation (see ``get_decks``).
+        self.cards = None
+        self.decks = None
+        self.dirty_decks = set()
+        # Event log: last assigned sequence number and rows not yet written.
+        self.event_seq = event_seq
+        self.pending_events = []
+        self.pending_snapshots = []
+        # Consecutive flushes whose rows the database rejected.
+        self.failed_flushes = 0
+
+    @property
+    def dirty(self):
+        return self.version != self.flushed_version
+
+
+class RoomStateStore:
+    """Write-behind cache for live table state (chip coordinates and decks).
+
+    Changes are applied in memory and coalesced: a room that moved a hundred
+    chips since the last flush is written once, as one upsert row in
+    ``RoomState`` plus one small ``RoomDeck`` row per deck that changed.
+    Flushes run every ``flush_interval`` seconds, or sooner once
+    ``dirty_threshold`` changes are pending. On first access after a restart
+    a room is rehydrated from its ``RoomState`` and ``RoomDeck`` rows.
+
+    Every change can also append a ``RoomEvent`` to the room's log. Events
+    get their sequence numbers here and are written in the same flush, so the
+    log adds no per-move round trips; every ``snapshot_every`` events a
+    ``RoomSnapshot`` of the public state is queued alongside them.
+
+    ``Room.durability`` picks the policy per room: ``volatile`` rooms are
+    never written, ``buffered`` rooms go through the write-behind path and
+    ``sync`` rooms are flushed before the change is acknowledged.
+
+    A flush writes all rooms in one transaction; if that fails, each room is
+    retried in its own, so a row the database rejects only holds back its own
+    room. After ``max_flush_failures`` such failures in a row the room's
+    unwritten changes are dropped and it is reloaded from the database on
+    next access, keeping its ``event_seq`` so sequence numbers are never
+    reused. Lost connections don't count: nothing is dropped while the
+    database is merely unreachable.
+
+    Listeners added with ``add_listener`` are called with every logged event
+    as it happens, whatever the durability (see ``fastapi_app.utils.broadcast``);
+    one that raises is counted and skipped, never failing the change.
+    """
+
+    def __init__(self, flush_interval, dirty_threshold, idle_eviction, snapshot_every, max_flush_failures):
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.dirty_threshold = dirty_threshold
+        self.idle_eviction = idle_eviction
+        self.max_flush_failures = max_flush_failures
+        self._rooms = {}
+        self._loading = {}
+        # Last seq handed out in rooms dropped with unwritten events; reloading
+        # from the log alone would hand those numbers out again.
+        self._dropped_seqs = {}
+        self._pending_changes = 0
+        self._wakeup = None
+        self._flush_lock = None
+        self._listeners = []
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def add_listener(self, fn):
+        """``fn(room, seq, kind, payload, user_id)``; must not block or raise."""
+        self._listeners.append(fn)
+
+    @property
+    def dirty_count(self):
+        return sum(1 for room in self._rooms.values() if room.dirty)
+
+    async def get(self, room_pk):
+        """Return the ``LiveRoom`` for ``room_pk``, loading it if needed, or None."""
+        room = self._rooms.get(room_pk)
+        if room is not None:
+            room.last_access = time.monotonic()
+            return room
+        pending = self._loading.get(room_pk)
+        if pending is None:
+            pending = self._loading[room_pk] = asyncio.ensure_future(self._load(room_pk))
+        try:
+            return await asyncio.shield(pending)
+        finally:
+            self._loading.pop(room_pk, None)
+
+    async def _load(self, room_pk):
+        row = await sync_to_async(self._fetch)(room_pk)
+        if row is None:
+            return None
+        # Another coroutine may have created the entry while we were loading.
+        room = self._rooms.get(room_pk)
+        if room is None:
+            room = self._rooms[room_pk] = LiveRoom(room_pk, *row)
+            room.event_seq = max(room.event_seq, self._dropped_seqs.pop(room_pk, 0))
+            metrics.incr("room_state.rehydrated")
+        return room
+
+    @staticmethod
+    def _fetch(room_pk):
+        room = Room.objects.filter(pk=room_pk).values_list('room_id', 'max_users', 'durability').first()
+        if room is None:
+            return None
+        state = RoomState.objects.filter(room_id=room_pk).values_list('chips_coords', 'version').first()
+        chips_coords, version = state if state else ({}, 0)
+        event_seq = RoomEvent.objects.filter(room_id=room_pk).aggregate(seq=Max('seq'))['seq'] or 0
+        return (*room, chips_coords, version, event_seq)
+
+    async def set_chip(self, room, idx, coords, user_id=None):
+        room.chips_coords[str(idx)] = coords
+        await self.mark_dirty(room, 'move', {"idx": str(idx), **coords}, user_id)
+
+    async def get_decks(self, room):
+        if room.decks is None:
+            loaded = await sync_to_async(load_decks)(room.room_pk)
+            if room.decks is None:
+                room.cards, room.decks = loaded or ({}, {})
+        return room.decks
+
+    async def mark_deck_dirty(self, room, deck_key, kind, payload, user_id=None):
+        room.dirty_decks.add(deck_key)
+        await self.mark_dirty(room, kind, {"deck": deck_key, **payload}, user_id)
+
+    async def record(self, room, kind, payload, user_id=None):
+        """Log an event that does not change the stored table state."""
+        await self.mark_dirty(room, kind, payload, user_id)
+
+    async def mark_dirty(self, room, kind=None, payload=None, user_id=None):
+        room.version += 1
+        room.last_access = time.monotonic()
+        if kind is not None:
+            await self._append_event(room, kind, payload, user_id)
+            for listener in self._listeners:
+                try:
+                    listener(room, room.event_seq, kind, payload, user_id)
+                except Exception as e:
+                    metrics.incr("room_state.listener_errors")
+                    print("Room event listener failed:", str(e))
+        if room.durability == 'volatile':
+            room.flushed_version = room.version
+            return
+        if room.durability == 'sync':
+            await self.flush([room.room_pk])
+            return
+        self._pending_changes += 1
+        if self._pending_changes >= self.dirty_threshold and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _append_event(self, room, kind, payload, user_id):
+        room.event_seq += 1
+        if room.durability == 'volatile':
+            return
+        room.pending_events.append(RoomEvent(
+            room_id=room.room_pk,
+            seq=room.event_seq,
+            kind=kind,
+            user_id=None if user_id is None else str(user_id),
+            payload=payload or {},
+            date_created=timezone.now(),
+        ))
+        if room.event_seq % self.snapshot_every == 0:
+            room.pending_snapshots.append(RoomSnapshot(
+                room_id=room.room_pk,
+                seq=room.event_seq,
+                state=await self.public_state(room),
+            ))
+
+    async def public_state(self, room):
+        """What a client needs to redraw the table (draw pile order stays hidden)."""
+        decks = await self.get_decks(room)
+        return {
+            "seq": room.event_seq,
+            "chips_coords": dict(room.chips_coords),
+            "decks": {key: deck.public_state() for key, deck in decks.items()},
+        }
+
+    async def flush(self, room_pks=None):
+        """Persist dirty rooms (all, or only ``room_pks``) in one upsert.
+
+        Rooms that could not be written keep their changes for the next
+        flush; the first error is raised once the others are accounted for.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            candidates = self._rooms.values() if room_pks is None else (self._rooms[pk] for pk in room_pks if pk in self._rooms)
+            batch = [
+                (room, room.version, dict(room.chips_coords), self._take_dirty_decks(room), self._take_log(room))
+                for room in candidates
+                if room.dirty and room.durability != 'volatile'
+            ]
+            if room_pks is None:
+                self._pending_changes = 0
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            rows = [(room.room_pk, version, coords, decks, log) for room, version, coords, decks, log in batch]
+            try:
+                gone, failed = await sync_to_async(self._write)(rows), {}
+            except (OperationalError, InterfaceError) as e:
+                gone, failed = set(), {room.room_pk: e for room, *_ in batch}
+            except Exception:
+                metrics.incr("room_state.batch_flush_errors")
+                gone, failed = await sync_to_async(self._write_each)(rows)
+            metrics.observe("room_state.flush_seconds", time.perf_counter() - start)
+            written = [entry for entry in batch if entry[0].room_pk not in failed]
+            metrics.incr("room_state.flushed_rooms", len(written))
+            metrics.incr("room_state.flushed_events", sum(len(log[0]) for _, _, _, _, log in written))
+            for room, version, _, _, _ in written:
+                room.flushed_version = max(room.flushed_version, version)
+                room.failed_flushes = 0
+                if room.room_pk in gone:
+                    # The room was archived or deleted underneath us.
+                    self._rooms.pop(room.room_pk, None)
+            for room, _, _, decks, log in batch:
+                if room.room_pk in failed:
+                    self._requeue(room, decks, log, failed[room.room_pk])
+            if failed:
+                raise next(iter(failed.values()))
+            return len(batch)
+
+    def _requeue(self, room, decks, log, error):
+        """Put a failed room's rows back for the next flush, or give up on them."""
+        if not isinstance(error, (OperationalError, InterfaceError)):
+            room.failed_flushes += 1
+        if room.failed_flushes >= self.max_flush_failures:
+            metrics.incr("room_state.quarantined")
+            print(f"Dropping unwritten changes of room {room.room_id} after "
+                  f"{room.failed_flushes} failed flushes:", str(error))
+            # Whatever was written last is what the room reloads as, except
+            # for seq: subscribers have already seen the dropped events.
+            room.flushed_version = room.version
+            self._dropped_seqs[room.room_pk] = room.event_seq
+            self._rooms.pop(room.room_pk, None)
+            return
+        events, snapshots = log
+        # Decks changed again since are already marked; the row is rebuilt from memory.
+        room.dirty_decks.update(deck.deck_key for deck in decks)
+        room.pending_events[:0] = events
+        room.pending_snapshots[:0] = snapshots
+
+    @staticmethod
+    def _take_dirty_decks(room):
+        decks = [room.decks[key].to_row(room.room_pk) for key in room.dirty_decks if room.decks and key in room.decks]
+        room.dirty_decks.clear()
+        return decks
+
+    @staticmethod
+    def _take_log(room):
+        log = (room.pending_events, room.pending_snapshots)
+        room.pending_events, room.pending_snapshots = [], []
+        return log
+
+    @staticmethod
+    def _write(rows):
+        existing = set(Room.objects.filter(pk__in=[row[0] for row in rows]).values_list('pk', flat=True))
+        gone = {row[0] for row in rows} - existing
+        rows = [row for row in rows if row[0] in existing]
+        with transaction.atomic():
+            RoomState.objects.bulk_create(
+                [RoomState(room_id=pk, version=version, chips_coords=coords) for pk, version, coords, _, _ in rows],
+                update_conflicts=True,
+                unique_fields=['room'],
+                update_fields=['chips_coords', 'version', 'updated_at'],
+            )
+            deck_rows = [deck for _, _, _, decks, _ in rows for deck in decks]
+            if deck_rows:
+                RoomDeck.objects.bulk_create(
+                    deck_rows,
+                    update_conflicts=True,
+                    unique_fields=['room', 'deck_key'],
+                    update_fields=['draw_pile', 'discard_pile', 'hands', 'updated_at'],
+                )
+            events = [event for _, _, _, _, (room_events, _) in rows for event in room_events]
+            if events:
+                RoomEvent.objects.bulk_create(events)
+            snapshots = [snapshot for _, _, _, _, (_, room_snapshots) in rows for snapshot in room_snapshots]
+            if snapshots:
+                RoomSnapshot.objects.bulk_create(snapshots)
+        return gone
+
+    @classmethod
+    def _write_each(cls, rows):
+        """Write rooms one transaction each; returns ``(gone, {room_pk: error})``."""
+        gone, failed = set(), {}
+        for row in rows:
+            try:
+                gone |= cls._write([row])
+            except Exception as e:
+                failed[row[0]] = e
+        return gone, failed
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_eviction
+        for pk in [pk for pk, room in self._rooms.items() if not room.dirty and room.last_access < cutoff]:
+            del self._rooms[pk]
+
+    async def run(self):
+        """Background flusher; started from the app lifespan."""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                self.evict_idle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("room_state.flush_errors")
+                print("Room state flush failed:", str(e))
+
+
+room_state_store = RoomStateStore(
+    flush_interval=settings.ROOM_STATE_FLUSH_INTERVAL,
+    dirty_threshold=settings.ROOM_STATE_DIRTY_THRESHOLD,
+    idle_eviction=settings.ROOM_STATE_IDLE_EVICTION,
+    snapshot_every=settings.ROOM_EVENT_SNAPSHOT_EVERY,
+    max_flush_failures=settings.ROOM_STATE_MAX_FLUSH_FAILURES,
+)
+
+metrics.gauge("room_state.rooms", lambda: len(room_state_store))
+metrics.gauge("room_state.dirty_rooms", lambda: room_state_store.dirty_count)
+register_store("room_state.rooms", lambda: room_state_store._rooms)
@@ -0,0 +1,99 @@
+"""Compare response serialization paths for the game payload.
+
+``legacy`` is what routes did before they declared response models: build a
+dict by hand, run it through ``jsonable_encoder`` and ``json.dumps`` (what
+``JSONResponse`` does). ``model`` is the current path: validate the Django
+instance into ``GameDetailOut`` and let pydantic-core write the JSON bytes,
+which is what FastAPI does for routes with a ``response_model``.
+
+    python -m fastapi_app.utils.serialization_bench --cards 5000
+    python -m fastapi_app.utils.serialization_bench --game-id 1
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gameorbit.settings')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import django
+django.setup()
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from core.models import Game
+from fastapi_app.schemas.game_schemas import GameDetailOut
+
+
+def synthetic_game(cards):
+    return Game(
+        id=1,
+        user_id=1,
+        name="Benchmark",
+        description="Synthetic game",
+        max_users=8,
+        picture="games/cover.jpg",
+        map="games/map.jpg",
+        chips=[{"value": f"images/games/chips/1_{i}.png"} for i in range(cards // 10 or 1)],
+        cube={"count": 2, "sides": 6},
+        decks={
+            f"deck{d}": {
+                "backImage": {"type": "file", "path": f"images/games/decks/back{d}.png"},
+                "cards": [{"type": "file", "path": f"images/games/decks/cards/{d}_{i}.png"} for i in range(cards // 4)],
+            }
+            for d in range(4)
+        },
+        objects_json={f"obj{i}": {"image": {"type": "url", "path": f"https://cdn.example/{i}.png"}, "copies": 1} for i in range(cards // 20 or 1)},
+        rules="rules/rules.pdf",
+    )
+
+
+def legacy(game):
+    payload = {
+        "game_id": game.id,
+        "user_id": game.user_id,
+        "title": game.name,
+        "description": game.description,
+        "max_users": game.max_users,
+        'cover_image': game.picture.url,
+        'field_image': game.map.url,
+        "chips": game.chips,
+        "cube": game.cube,
+        "decks": game.decks,
+        "objects_json": game.objects_json,
+        "rules_file": game.rules.url,
+    }
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+adapter = TypeAdapter(GameDetailOut)
+
+
+def model(game):
+    return adapter.dump_json(GameDetailOut.model_validate(game))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--game-id', type=int, help='Benchmark a stored game instead of a synthetic one')
+    parser.add_argument('--cards', type=int, default=2000, help='Cards in the synthetic game (default 2000)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    game = Game.objects.get(pk=args.game_id) if args.game_id else synthetic_game(args.cards)
+    if json.loads(legacy(game)) != json.loads(model(game)):
+        print("warning: the two paths produce different JSON")
+    print(f"payload: {len(model(game)) / 1024:.1f} KiB")
+    results = {}
+    for name, fn in (("legacy", legacy), ("model", model)):
+        best = min(timeit.repeat(lambda: fn(game), repeat=args.repeat, number=args.number)) / args.number
+        results[name] = best
+        print(f"{name:>8}: {best * 1000:8.3f} ms per response")
+    print(f" speedup: {results['legacy'] / results['model']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
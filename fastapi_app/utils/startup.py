@@ -0,0 +1,136 @@
+"""Startup timing for the API process.
+
+``startup_profile`` records how long each phase of importing
+``fastapi_app.main`` took and is reported once the app is serving. The
+per-module breakdown comes from ``python -X importtime`` and is available
+from the command line, which also enforces the cold-start budget::
+
+    python -m fastapi_app.utils.startup --top 20 --budget 2.5
+
+This module must stay stdlib-only: it is imported before Django is set up.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from importlib import import_module
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.ready_after = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def restart(self):
+        """Restart the clock in a forked worker; its imports were paid by the parent."""
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.ready_after = None
+
+    def mark_ready(self):
+        if self.ready_after is None:
+            self.ready_after = time.perf_counter() - self.started
+        return self.ready_after
+
+    def summary(self):
+        phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        return f"Started in {self.mark_ready() * 1000:.0f}ms ({phases or 'preloaded'})"
+
+
+startup_profile = StartupProfile()
+
+
+class LazyApp:
+    """ASGI app imported on its first request, e.g. the Django admin.
+
+    ``target`` is ``"module:attribute"``.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.app = None
+
+    async def __call__(self, scope, receive, send):
+        if self.app is None:
+            module, _, attribute = self.target.partition(":")
+            self.app = getattr(import_module(module), attribute)
+        await self.app(scope, receive, send)
+
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_times(module="fastapi_app.main"):
+    """Import ``module`` in a fresh interpreter under ``-X importtime``.
+
+    Returns ``(total_seconds, rows)`` where rows are ``(name, self_us,
+    cumulative_us, depth)`` in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    total = sum(cumulative_us for _, _, cumulative_us, depth in rows if depth == 0)
+    return total / 1e6, rows
+
+
+def report(rows, top):
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    lines = ["Import time by top-level package (self time):"]
+    for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {us / 1000:8.1f}ms  {package}")
+    lines.append("Slowest modules (self time):")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[1])[:top]:
+        lines.append(f"  {self_us / 1000:8.1f}ms  {name}  (cumulative {cumulative_us / 1000:.1f}ms)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time of the API app.")
+    parser.add_argument("--module", default="fastapi_app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the fastest of.")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Fail if the import takes longer (seconds); defaults to STARTUP_IMPORT_BUDGET.")
+    options = parser.parse_args(argv)
+    budget = options.budget
+    if budget is None:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gameorbit.settings")
+        from django.conf import settings
+
+        budget = settings.STARTUP_IMPORT_BUDGET
+    runs = [import_times(options.module) for _ in range(max(1, options.repeat))]
+    total, rows = min(runs, key=lambda run: run[0])
+    print(report(rows, options.top))
+    print(f"Import of {options.module}: {total:.3f}s (budget {budget:.3f}s)")
+    if budget and total > budget:
+        print("Over the startup budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
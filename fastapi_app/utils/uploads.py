@@ -0,0 +1,245 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from core.models import UploadSession
+from fastapi_app.utils.diagnostics import register_store
+from fastapi_app.utils.game_assets import extension, store_stream
+from fastapi_app.utils.images import IMAGE_SPECS, process_image
+from fastapi_app.utils.metrics import metrics
+
+TUS_VERSION = "1.0.0"
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+
+
+class UploadError(ValueError):
+    """Raised for upload requests that cannot be accepted."""
+
+
+class UploadConflict(UploadError):
+    """The client's offset does not match what the server holds."""
+
+
+class ChecksumMismatch(UploadError):
+    """A chunk did not match its ``Upload-Checksum``; it was discarded."""
+
+
+def staging_path(upload):
+    return os.path.join(settings.UPLOAD_STAGING_DIR, f"{upload.upload_id}.part")
+
+
+def create_upload(user_id, kind, filename, length):
+    if kind not in dict(UploadSession.KIND_CHOICES):
+        raise UploadError(f"Unknown upload kind: {kind}")
+    if length < 0 or length > settings.UPLOAD_MAX_BYTES:
+        raise UploadError(f"Upload-Length must be between 0 and {settings.UPLOAD_MAX_BYTES}")
+    upload = UploadSession.objects.create(user_id=user_id, kind=kind, filename=os.path.basename(filename or ''), length=length)
+    os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+
+def parse_checksum(header):
+    """``"sha256 <base64 digest>"`` -> ``(algorithm, digest)``; None if absent."""
+    if not header:
+        return None
+    algorithm, _, encoded = header.strip().partition(' ')
+    if algorithm.lower() not in CHECKSUM_ALGORITHMS:
+        raise UploadError(f"Unsupported checksum algorithm: {algorithm}")
+    try:
+        return algorithm.lower(), base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError("Upload-Checksum digest is not valid base64")
+
+
+# Per-upload locks (with a count of users) so two PATCHes never interleave writes.
+# They only cover this worker; _try_lock_upload covers the others.
+_locks = {}
+register_store("uploads.locks", lambda: _locks)
+
+
+def _try_lock_upload(upload_pk):
+    """Take a session advisory lock on the upload without waiting; False if held elsewhere.
+
+    Session locks are re-entrant per connection and every thread-sensitive
+    ``sync_to_async`` call shares one, so this only excludes other processes;
+    ``_locks`` excludes requests within the worker.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [upload_pk])
+        return cursor.fetchone()[0]
+
+
+def _unlock_upload(upload_pk):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [upload_pk])
+
+
+def _open_at(path, offset):
+    f = open(path, 'r+b')
+    f.seek(offset)
+    f.truncate()
+    return f
+
+
+async def receive_chunk(upload, offset, stream, checksum=None):
+    """Append one PATCH body at ``offset``; return the new offset.
+
+    A chunk with a checksum is all-or-nothing: if the connection drops or the
+    digest does not match, the file is cut back to ``offset``. Without one,
+    whatever arrived before a disconnect is kept and the client resumes from
+    the offset it gets back from HEAD.
+    """
+    entry = _locks.setdefault(upload.pk, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            if not await sync_to_async(_try_lock_upload)(upload.pk):
+                raise UploadConflict("Another request is writing to this upload")
+            try:
+                return await _write_chunk(upload, offset, stream, checksum)
+            finally:
+                await sync_to_async(_unlock_upload)(upload.pk)
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            _locks.pop(upload.pk, None)
+
+
+async def _write_chunk(upload, offset, stream, checksum):
+    # Called with the upload locked; file calls run in the threadpool so a
+    # slow disk never stalls the event loop.
+    await sync_to_async(upload.refresh_from_db)(fields=['offset', 'status'])
+    if upload.status != 'uploading':
+        raise UploadConflict(f"Upload is already {upload.status}")
+    if offset != upload.offset:
+        raise UploadConflict(f"Upload-Offset {offset} does not match {upload.offset}")
+    hasher = hashlib.new(checksum[0]) if checksum else None
+    remaining = upload.length - offset
+    written, disconnected = 0, False
+    f = await run_in_threadpool(_open_at, staging_path(upload), offset)
+    try:
+        try:
+            async for chunk in stream:
+                if written + len(chunk) > remaining:
+                    await run_in_threadpool(f.truncate, offset)
+                    raise UploadError("Chunk runs past Upload-Length")
+                await run_in_threadpool(f.write, chunk)
+                written += len(chunk)
+                if hasher:
+                    hasher.update(chunk)
+        except ClientDisconnect:
+            disconnected = True
+        if hasher and (disconnected or hasher.digest() != checksum[1]):
+            await run_in_threadpool(f.truncate, offset)
+            metrics.incr("uploads.checksum_mismatch")
+            raise ChecksumMismatch("Chunk checksum mismatch")
+    finally:
+        await run_in_threadpool(f.close)
+    new_offset = offset + written
+    done = new_offset == upload.length
+    updated = await sync_to_async(UploadSession.objects.filter(pk=upload.pk, offset=offset, status='uploading').update)(
+        offset=new_offset,
+        status='processing' if done else 'uploading',
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        raise UploadConflict("Upload changed while the chunk was being written")
+    metrics.incr("uploads.bytes", written)
+    upload.offset, upload.status = new_offset, 'processing' if done else 'uploading'
+    return new_offset
+
+
+def process_upload(upload_pk):
+    """Turn a complete staged upload into a stored asset.
+
+    Images are normalized like direct uploads; other files are stored as-is.
+    Either way the result lands in the content-addressed asset store, so a
+    retried upload of the same file does not take extra space.
+    """
+    upload = UploadSession.objects.get(pk=upload_pk)
+    path = staging_path(upload)
+    try:
+        if upload.kind in IMAGE_SPECS:
+            data, ext = process_image(path, upload.kind)
+            name = store_stream(io.BytesIO(data), ext)
+        else:
+            with open(path, 'rb') as f:
+                name = store_stream(f, extension(upload.filename))
+    except Exception as e:
+        UploadSession.objects.filter(pk=upload_pk).update(status='failed', error=str(e), updated_at=timezone.now())
+        metrics.incr("uploads.failed")
+        return None
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+    UploadSession.objects.filter(pk=upload_pk).update(status='ready', asset=name, updated_at=timezone.now())
+    metrics.incr("uploads.ready")
+    return name
+
+
+def collect_upload_ids(*values):
+    """Upload ids referenced as ``{"type": "upload", "upload_id": ...}`` in metadata.
+
+    An upload entry without an id is an ``UploadError``: it would otherwise
+    reach the lookup that swaps it for the stored asset.
+    """
+    ids = set()
+    stack = list(values)
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if value.get('type') == 'upload':
+                if not value.get('upload_id'):
+                    raise UploadError("Upload entry is missing its upload_id")
+                ids.add(str(value['upload_id']))
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return ids
+
+
+def resolve_uploads(upload_ids, user_id):
+    """Map upload id -> stored asset name; every upload must be ready and the user's."""
+    try:
+        canonical = {str(upload_id): str(uuid.UUID(str(upload_id))) for upload_id in upload_ids if upload_id}
+    except ValueError:
+        raise UploadError("Invalid upload id")
+    if not canonical:
+        return {}
+    rows = list(UploadSession.objects.filter(upload_id__in=set(canonical.values())).values_list('upload_id', 'user_id', 'status', 'asset'))
+    found = {}
+    for upload_id, owner_id, upload_status, asset in rows:
+        if owner_id is not None and str(owner_id) != str(user_id):
+            raise UploadError(f"Upload {upload_id} belongs to another user")
+        if upload_status != 'ready':
+            raise UploadError(f"Upload {upload_id} is {upload_status}")
+        found[str(upload_id)] = asset
+    missing = sorted(upload_id for upload_id, key in canonical.items() if key not in found)
+    if missing:
+        raise UploadError(f"Unknown upload: {missing[0]}")
+    return {upload_id: found[key] for upload_id, key in canonical.items()}
+
+
+def purge_expired(before):
+    """Delete unfinished uploads started before ``before`` and their staged files."""
+    stale = UploadSession.objects.filter(date_created__lt=before).exclude(status='ready')
+    count = 0
+    for upload in stale.iterator():
+        path = staging_path(upload)
+        if os.path.exists(path):
+            os.unlink(path)
+        count += 1
+    stale.delete()
+    return count
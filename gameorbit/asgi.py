@@ -3,10 +3,14 @@ ASGI config for gameorbit project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+``admin_application`` wraps it with a concurrency limit so the admin can be
+mounted inside the FastAPI app without competing with player-facing routes.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
 from django.core.asgi import get_asgi_application
@@ -14,3 +18,58 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gameorbit.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (settings are configured by get_asgi_application)
+
+
+class ConcurrencyLimitMiddleware:
+    """Cap the number of in-flight HTTP requests handled by ``app``.
+
+    Django's ASGI handler runs every sync view in its own per-request thread,
+    so admin traffic never borrows threads from the API pool; this limit keeps
+    a burst of heavy admin pages from spawning an unbounded number of them.
+    Requests over the limit wait up to ``queue_timeout`` seconds for a slot and
+    are answered with 503 after that.
+    """
+
+    def __init__(self, app, max_concurrency, queue_timeout):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
+
+    async def _reject(self, send):
+        body = b'Admin is busy, please retry shortly.'
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'text/plain; charset=utf-8'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', b'1'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+admin_application = ConcurrencyLimitMiddleware(
+    application,
+    max_concurrency=settings.ADMIN_MAX_CONCURRENCY,
+    queue_timeout=settings.ADMIN_QUEUE_TIMEOUT,
+)
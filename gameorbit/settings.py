@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'adminsortable2',
     'core',
 ]
@@ -77,6 +78,154 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'gameorbit.wsgi.application'
 
+ASGI_APPLICATION = 'gameorbit.asgi.application'
+
+# Admin is mounted inside the FastAPI app; these bound how many admin requests
+# run at once and how long extra ones wait before getting a 503.
+ADMIN_MAX_CONCURRENCY = env.int('ADMIN_MAX_CONCURRENCY', default=4)
+ADMIN_QUEUE_TIMEOUT = env.float('ADMIN_QUEUE_TIMEOUT', default=10.0)
+
+# Room ids: LENGTH random symbols from ALPHABET, dash-separated every GROUP_SIZE
+# symbols (0 disables grouping). PREFETCH ids are checked against the table in
+# one query; MAX_ATTEMPTS bounds retries when an insert still collides.
+ROOM_ID_LENGTH = env.int('ROOM_ID_LENGTH', default=8)
+ROOM_ID_ALPHABET = env('ROOM_ID_ALPHABET', default='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+ROOM_ID_GROUP_SIZE = env.int('ROOM_ID_GROUP_SIZE', default=4)
+ROOM_ID_PREFETCH = env.int('ROOM_ID_PREFETCH', default=32)
+ROOM_ID_MAX_ATTEMPTS = env.int('ROOM_ID_MAX_ATTEMPTS', default=5)
+
+# Room lifecycle: rooms idle longer than ROOM_IDLE_TTL_HOURS are moved to
+# RoomArchive by `manage.py archive_rooms`; archives are dropped after
+# ROOM_ARCHIVE_RETENTION_DAYS (0 keeps them). last_activity is bumped at most
+# once per ROOM_TOUCH_INTERVAL seconds per room.
+ROOM_IDLE_TTL_HOURS = env.float('ROOM_IDLE_TTL_HOURS', default=24)
+ROOM_ARCHIVE_RETENTION_DAYS = env.float('ROOM_ARCHIVE_RETENTION_DAYS', default=180)
+ROOM_TOUCH_INTERVAL = env.int('ROOM_TOUCH_INTERVAL', default=60)
+
+# Live room state write-behind: dirty rooms are flushed every
+# ROOM_STATE_FLUSH_INTERVAL seconds or once ROOM_STATE_DIRTY_THRESHOLD changes
+# are pending; clean rooms untouched for ROOM_STATE_IDLE_EVICTION seconds are
+# dropped from memory and rehydrated on next access. A room whose rows are
+# rejected ROOM_STATE_MAX_FLUSH_FAILURES flushes in a row (not counting lost
+# connections) has its unwritten changes dropped and is reloaded from the
+# database.
+ROOM_STATE_FLUSH_INTERVAL = env.float('ROOM_STATE_FLUSH_INTERVAL', default=2.0)
+ROOM_STATE_DIRTY_THRESHOLD = env.int('ROOM_STATE_DIRTY_THRESHOLD', default=500)
+ROOM_STATE_IDLE_EVICTION = env.float('ROOM_STATE_IDLE_EVICTION', default=600)
+ROOM_STATE_MAX_FLUSH_FAILURES = env.int('ROOM_STATE_MAX_FLUSH_FAILURES', default=5)
+# A RoomSnapshot is taken every ROOM_EVENT_SNAPSHOT_EVERY logged events, which
+# also bounds the tail a reconnecting client has to replay.
+ROOM_EVENT_SNAPSHOT_EVERY = env.int('ROOM_EVENT_SNAPSHOT_EVERY', default=200)
+
+# Presence: room members must heartbeat at least every PRESENCE_TTL seconds
+# or they are dropped; expiry runs every PRESENCE_TICK seconds.
+PRESENCE_TTL = env.float('PRESENCE_TTL', default=30.0)
+PRESENCE_TICK = env.float('PRESENCE_TICK', default=1.0)
+
+# Room broadcast (/game/session/<id>/ws/): each client queues at most
+# BROADCAST_QUEUE_SIZE updates; a client that overflows it gets a full resync.
+# A client that overflows again after BROADCAST_MAX_RESYNCS resyncs within
+# BROADCAST_RESYNC_WINDOW seconds, or cannot take a frame within
+# BROADCAST_SEND_TIMEOUT seconds, is disconnected.
+BROADCAST_QUEUE_SIZE = env.int('BROADCAST_QUEUE_SIZE', default=256)
+BROADCAST_MAX_RESYNCS = env.int('BROADCAST_MAX_RESYNCS', default=3)
+BROADCAST_RESYNC_WINDOW = env.float('BROADCAST_RESYNC_WINDOW', default=60.0)
+BROADCAST_SEND_TIMEOUT = env.float('BROADCAST_SEND_TIMEOUT', default=10.0)
+
+# Server-side dice: limits per rolled expression.
+DICE_MAX_DICE = env.int('DICE_MAX_DICE', default=1000)
+DICE_MAX_SIDES = env.int('DICE_MAX_SIDES', default=1000000)
+DICE_MAX_EXPRESSIONS = env.int('DICE_MAX_EXPRESSIONS', default=50)
+DICE_MAX_CONSTANT = env.int('DICE_MAX_CONSTANT', default=1000000)
+
+# MessagePack responses: zstd level, size of the per-game sync dictionaries
+# and how many of them each worker keeps.
+ZSTD_LEVEL = env.int('ZSTD_LEVEL', default=3)
+ZSTD_DICTIONARY_SIZE = env.int('ZSTD_DICTIONARY_SIZE', default=262144)
+ZSTD_DICTIONARY_CACHE = env.int('ZSTD_DICTIONARY_CACHE', default=64)
+
+# gzip/brotli response compression: bodies smaller than COMPRESSION_MIN_SIZE
+# bytes go out as-is; compressed bodies of successful responses under
+# COMPRESSION_CACHEABLE_PATHS are kept in a per-worker LRU.
+COMPRESSION_MIN_SIZE = env.int('COMPRESSION_MIN_SIZE', default=1024)
+COMPRESSION_CACHE_ENTRIES = env.int('COMPRESSION_CACHE_ENTRIES', default=256)
+COMPRESSION_CACHEABLE_PATHS = env.list('COMPRESSION_CACHEABLE_PATHS', default=['/game/game/', '/info/', '/images/'])
+
+# Game export/import archives: content-addressed assets are stored under
+# GAME_ASSET_DIR (relative to BASE_DIR, like the other game images); an import
+# may unpack at most GAME_ARCHIVE_MAX_BYTES of assets.
+GAME_ASSET_DIR = env('GAME_ASSET_DIR', default='images/games/assets')
+GAME_ARCHIVE_MAX_BYTES = env.int('GAME_ARCHIVE_MAX_BYTES', default=512 * 1024 * 1024)
+GAME_ARCHIVE_CHUNK_SIZE = env.int('GAME_ARCHIVE_CHUNK_SIZE', default=64 * 1024)
+
+# Resumable uploads: partial files are staged in UPLOAD_STAGING_DIR (not
+# served), a single upload may be at most UPLOAD_MAX_BYTES, and unfinished
+# uploads older than UPLOAD_EXPIRY_HOURS are removed by purge_uploads.
+UPLOAD_STAGING_DIR = env('UPLOAD_STAGING_DIR', default=os.path.join(BASE_DIR, 'uploads'))
+UPLOAD_MAX_BYTES = env.int('UPLOAD_MAX_BYTES', default=512 * 1024 * 1024)
+UPLOAD_EXPIRY_HOURS = env.int('UPLOAD_EXPIRY_HOURS', default=24)
+
+# Background jobs (run_jobs): failed jobs are retried up to JOB_MAX_ATTEMPTS
+# times with exponential backoff from JOB_RETRY_DELAY seconds; running jobs not
+# finished within JOB_STALE_SECONDS are assumed lost and requeued.
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=3)
+JOB_RETRY_DELAY = env.float('JOB_RETRY_DELAY', default=5.0)
+JOB_STALE_SECONDS = env.int('JOB_STALE_SECONDS', default=300)
+JOB_POLL_INTERVAL = env.float('JOB_POLL_INTERVAL', default=1.0)
+JOB_CALLBACK_TIMEOUT = env.float('JOB_CALLBACK_TIMEOUT', default=5.0)
+
+# Game search: pages hold at most SEARCH_MAX_LIMIT results and cannot reach
+# past SEARCH_MAX_OFFSET; names at least SEARCH_TRIGRAM_THRESHOLD similar to
+# the query match even when misspelled (needs pg_trgm).
+SEARCH_MAX_LIMIT = env.int('SEARCH_MAX_LIMIT', default=50)
+SEARCH_MAX_OFFSET = env.int('SEARCH_MAX_OFFSET', default=1000)
+SEARCH_TRIGRAM_THRESHOLD = env.float('SEARCH_TRIGRAM_THRESHOLD', default=0.3)
+
+# Popularity: sessions started per game are counted in memory and written
+# every POPULARITY_FLUSH_INTERVAL seconds. Trend scores halve every
+# TRENDING_HALF_LIFE_HOURS; `manage.py refresh_trending` keeps the top
+# TRENDING_SIZE games, which workers cache for TRENDING_CACHE_SECONDS.
+POPULARITY_FLUSH_INTERVAL = env.float('POPULARITY_FLUSH_INTERVAL', default=10.0)
+TRENDING_HALF_LIFE_HOURS = env.float('TRENDING_HALF_LIFE_HOURS', default=72)
+TRENDING_SIZE = env.int('TRENDING_SIZE', default=20)
+TRENDING_CACHE_SECONDS = env.float('TRENDING_CACHE_SECONDS', default=60)
+
+# Entitlements: users without an active subscription get the FREE_* limits
+# (unset means unlimited). Resolved entitlements are cached for
+# ENTITLEMENT_CACHE_SECONDS and dropped when the user or a tariff changes.
+FREE_MAX_GAMES = env.int('FREE_MAX_GAMES', default=None)
+FREE_MAX_PLAYERS = env.int('FREE_MAX_PLAYERS', default=None)
+FREE_FEATURES = env.list('FREE_FEATURES', default=[])
+ENTITLEMENT_CACHE_SECONDS = env.int('ENTITLEMENT_CACHE_SECONDS', default=300)
+# A subscription promocode grants (or extends by) this many days.
+PROMOCODE_SUBSCRIPTION_DAYS = env.int('PROMOCODE_SUBSCRIPTION_DAYS', default=30)
+
+# Startup: STARTUP_REPORT prints per-phase import times when a worker boots;
+# `python -m fastapi_app.utils.startup` fails if importing the app takes
+# longer than STARTUP_IMPORT_BUDGET seconds.
+STARTUP_REPORT = env.bool('STARTUP_REPORT', default=True)
+STARTUP_IMPORT_BUDGET = env.float('STARTUP_IMPORT_BUDGET', default=2.0)
+
+# Production server (`python -m fastapi_app.serve`): SERVER_WORKERS processes
+# (0 means one per available CPU). A worker is recycled after
+# SERVER_MAX_REQUESTS requests plus up to SERVER_MAX_REQUESTS_JITTER, or when
+# its private memory passes SERVER_MAX_MEMORY_MB (checked every
+# SERVER_MEMORY_CHECK_INTERVAL seconds); 0 disables either limit. Stopping
+# waits up to SERVER_GRACEFUL_TIMEOUT seconds for in-flight requests.
+SERVER_WORKERS = env.int('SERVER_WORKERS', default=0)
+SERVER_MAX_REQUESTS = env.int('SERVER_MAX_REQUESTS', default=10000)
+SERVER_MAX_REQUESTS_JITTER = env.int('SERVER_MAX_REQUESTS_JITTER', default=1000)
+SERVER_MAX_MEMORY_MB = env.int('SERVER_MAX_MEMORY_MB', default=512)
+SERVER_MEMORY_CHECK_INTERVAL = env.float('SERVER_MEMORY_CHECK_INTERVAL', default=10.0)
+SERVER_GRACEFUL_TIMEOUT = env.int('SERVER_GRACEFUL_TIMEOUT', default=30)
+SERVER_KEEPALIVE_TIMEOUT = env.int('SERVER_KEEPALIVE_TIMEOUT', default=5)
+
+# Diagnostics: staff-only /diagnostics routes for worker memory. tracemalloc
+# is off until switched on there (or with SIGUSR1 to the launcher), unless
+# DIAGNOSTICS_TRACEMALLOC_FRAMES > 0 starts it in every worker at boot.
+DIAGNOSTICS_ENABLED = env.bool('DIAGNOSTICS_ENABLED', default=True)
+DIAGNOSTICS_TRACEMALLOC_FRAMES = env.int('DIAGNOSTICS_TRACEMALLOC_FRAMES', default=0)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases